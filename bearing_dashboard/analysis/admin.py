@@ -1,3 +1,25 @@
 from django.contrib import admin
 
-# Register your models here.
+from . import models
+
+
+@admin.register(models.Bearing)
+class BearingAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'failure_label', 'failure_point_percentage']
+    list_filter = ['set']
+
+
+@admin.register(models.DegradationMetric)
+class DegradationMetricAdmin(admin.ModelAdmin):
+    list_display = ['channel', 'band', 'metric', 'stage', 'ratio_to_baseline', 'rate', 'stability']
+    list_filter = ['band', 'metric', 'stage']
+    list_select_related = ['channel__bearing__set']
+
+
+@admin.register(models.PredictionStage)
+class PredictionStageAdmin(admin.ModelAdmin):
+    list_display = ['prediction', 'life_stage', 'predicted_hours', 'actual_hours_remaining', 'accuracy_percentage']
+    list_select_related = ['prediction']
+
+
+admin.site.register([models.Set, models.Channel, models.BandChange, models.Prediction, models.ModelPerformance])
@@ -0,0 +1,296 @@
+"""
+Declarative alert rules evaluated as array operations over the whole fleet.
+
+Both artifacts are flattened into a ``FleetTable``. The table has one row per
+(set, bearing, channel) and one float array per field, with a named axis for
+every level of the JSON nesting:
+
+    band_change                 (rows, band)                  bearing_analysis_results.json
+    magnitude                   (rows, magnitude)
+    failure_point_percentage    (rows,)
+    ratios                      (rows, ratio, band, metric)   degradation_features.json
+    rates                       (rows, stage, band, metric)
+    stability                   (rows, stage, band, metric)
+
+A rule compares two operands:
+
+    stability.late.mid.Kurtosis > 5
+    high_band_change > mid_band_change
+    stability.late.*.RMS > 10 * stability.early.*.RMS
+
+An operand is a number, a field path or ``<number> * <path>``. Path parts
+select along the field's axes in order, and ``*`` (or leaving trailing
+parts off) keeps an axis. Operands broadcast against each other on their
+kept axes. A rule therefore yields one boolean mask over all rows and kept
+axes: a single numpy comparison, however large the fleet is. Values missing
+from the artifacts are NaN and never fire.
+"""
+import operator
+import re
+import threading
+from dataclasses import dataclass
+from itertools import zip_longest
+
+import numpy as np
+
+from . import features, repository, results
+
+
+LEVELS = ['info', 'warning', 'critical']
+
+AXES = {
+    'stage': features.STAGES,
+    'ratio': results.RATIOS,
+    'magnitude': results.MAGNITUDES,
+    'band': list(features.BANDS),
+    'metric': features.METRICS,
+}
+# kept axes of a rule mask are ordered like this
+AXIS_ORDER = ['stage', 'ratio', 'magnitude', 'band', 'metric']
+
+FIELDS = {
+    'band_change': ('band',),
+    'magnitude': ('magnitude',),
+    'failure_point_percentage': (),
+    'ratios': ('ratio', 'band', 'metric'),
+    'rates': ('stage', 'band', 'metric'),
+    'stability': ('stage', 'band', 'metric'),
+}
+# the key names used in bearing_analysis_results.json
+ALIASES = {f'{band}_band_change': f'band_change.{band}' for band in AXES['band']}
+
+OPERATORS = {
+    '>=': operator.ge,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '>': operator.gt,
+    '<': operator.lt,
+}
+CONDITION = re.compile(r'^\s*(.+?)\s*(>=|<=|==|!=|>|<)\s*(.+?)\s*$')
+SCALED = re.compile(r'^\s*([-+]?[0-9.]+(?:[eE][-+]?[0-9]+)?)\s*\*\s*(\S+)\s*$')
+
+
+class RuleError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Rule:
+    name: str
+    when: str
+    level: str = 'warning'
+    description: str = ''
+
+
+# the README's multi-stage warnings: band energy, kurtosis progression, channel stability
+DEFAULT_RULES = [
+    Rule('mid_band_energy_rise', 'mid_band_change > 100', 'warning',
+         'Mid band (1-3 kHz) energy more than doubled: early warning of damage'),
+    Rule('high_band_energy_rise', 'high_band_change > 200', 'critical',
+         'High band (3-5 kHz) energy tripled: critical damage signature'),
+    Rule('high_band_dominant', 'high_band_change > mid_band_change', 'info',
+         'Energy growth has moved into the high band'),
+    Rule('kurtosis_progression', 'ratios.late_to_baseline.*.Kurtosis > 5', 'warning',
+         'Late-stage kurtosis above five times its baseline: impulsive impacts'),
+    Rule('mid_kurtosis_unstable', 'stability.late.mid.Kurtosis > 5', 'critical',
+         'Mid band kurtosis fluctuates strongly in the late stage'),
+    Rule('stability_loss', 'stability.late.*.RMS > 10 * stability.early.*.RMS', 'warning',
+         'Late-stage RMS varies ten times more than in the early stage'),
+]
+
+
+class Operand:
+    """A number, or a scaled selection from one table field."""
+
+    def __init__(self, text):
+        self.text = text
+        self.field = None
+        self.index = ()
+        self.axes = ()
+        self.factor = 1.0
+
+        try:
+            self.factor = float(text)
+            return
+        except ValueError:
+            pass
+
+        scaled = SCALED.match(text)
+        if scaled is not None:
+            self.factor = float(scaled.group(1))
+            path = scaled.group(2)
+        else:
+            path = text.strip()
+        path = ALIASES.get(path, path)
+
+        self.field, *parts = path.split('.')
+        if self.field not in FIELDS:
+            raise RuleError(f'Unknown field {self.field!r} in {text!r}, expected one of {", ".join(FIELDS)}')
+        field_axes = FIELDS[self.field]
+        if len(parts) > len(field_axes):
+            raise RuleError(f'{self.field} has only {len(field_axes)} levels: {text!r}')
+
+        index = []
+        axes = []
+        for axis, part in zip_longest(field_axes, parts):
+            if part is None or part == '*':
+                index.append(slice(None))
+                axes.append(axis)
+            elif part in AXES[axis]:
+                index.append(AXES[axis].index(part))
+            else:
+                raise RuleError(f'Unknown {axis} {part!r} in {text!r}, expected one of {", ".join(AXES[axis])}')
+        self.index = (slice(None),) + tuple(index)
+        self.axes = tuple(axes)
+
+    def values(self, table, axes):
+        """The operand broadcast to (rows, *axes)."""
+        if self.field is None:
+            return self.factor
+        values = table.arrays[self.field][self.index]
+        shape = (len(table),) + tuple(len(AXES[axis]) if axis in self.axes else 1 for axis in axes)
+        values = values.reshape(shape)
+        return values * self.factor if self.factor != 1.0 else values
+
+
+class CompiledRule:
+    def __init__(self, rule):
+        if rule.level not in LEVELS:
+            raise RuleError(f'Rule {rule.name}: level must be one of {", ".join(LEVELS)}')
+        match = CONDITION.match(rule.when)
+        if match is None:
+            raise RuleError(f'Rule {rule.name}: expected "<operand> <comparison> <operand>", got {rule.when!r}')
+        self.rule = rule
+        self.left = Operand(match.group(1))
+        self.compare = OPERATORS[match.group(2)]
+        self.right = Operand(match.group(3))
+        kept = set(self.left.axes) | set(self.right.axes)
+        self.axes = tuple(axis for axis in AXIS_ORDER if axis in kept)
+
+    def evaluate(self, table):
+        """Boolean mask of shape (rows, *self.axes)."""
+        with np.errstate(invalid='ignore'):
+            mask = self.compare(self.left.values(table, self.axes), self.right.values(table, self.axes))
+        return np.broadcast_to(mask, (len(table),) + tuple(len(AXES[axis]) for axis in self.axes))
+
+
+def compile_rules(rules):
+    compiled = [CompiledRule(rule) for rule in rules]
+    names = [rule.rule.name for rule in compiled]
+    if len(set(names)) != len(names):
+        raise RuleError('Rule names must be unique')
+    return compiled
+
+
+class FleetTable:
+    """Feature arrays of every (set, bearing, channel) row; see the module docstring."""
+
+    def __init__(self, rows, arrays, labels=None):
+        self.rows = rows
+        self.labels = labels or [None] * len(rows)
+        self.arrays = arrays
+
+    def __len__(self):
+        return len(self.rows)
+
+    @classmethod
+    def empty(cls, rows, labels=None):
+        shapes = {field: tuple(len(AXES[axis]) for axis in axes) for field, axes in FIELDS.items()}
+        arrays = {field: np.full((len(rows),) + shape, np.nan) for field, shape in shapes.items()}
+        return cls(rows, arrays, labels)
+
+    @classmethod
+    def from_artifacts(cls, degradation, bearing_analysis, failures=features.FAILURES):
+        """Table of a results.DegradationFeatures and a results.BearingAnalysis."""
+        failure_bearings = {failure['label']: (failure['set'], failure['bearing']) for failure in failures}
+
+        keys = {}
+        labels = {}
+        analysis_rows = []
+        for bearing in bearing_analysis.bearings:
+            for channel in bearing.channels:
+                analysis_rows.append(keys.setdefault((bearing.set_number, bearing.number, channel.number), len(keys)))
+        degradation_rows = []
+        for channel in degradation.channels:
+            set_number, bearing = failure_bearings.get(channel.label, (None, channel.label))
+            row = keys.setdefault((set_number, bearing, channel.number), len(keys))
+            labels[row] = channel.label
+            degradation_rows.append(row)
+
+        rows = list(keys)
+        table = cls.empty(rows, [labels.get(i) for i in range(len(rows))])
+        arrays = table.arrays
+        # both artifacts are already arrays in row order, so this is a scatter per field
+        arrays['band_change'][analysis_rows] = bearing_analysis.band_changes
+        arrays['magnitude'][analysis_rows] = bearing_analysis.magnitudes
+        arrays['failure_point_percentage'][analysis_rows] = [
+            bearing.failure_point_percentage for bearing in bearing_analysis.bearings for _ in bearing.channels
+        ]
+        for field in ['ratios', 'rates', 'stability']:
+            arrays[field][degradation_rows] = getattr(degradation, field)
+        return table
+
+
+class AlertEngine:
+    def __init__(self, rules=DEFAULT_RULES):
+        self.rules = compile_rules(rules)
+
+    def evaluate(self, table):
+        """(compiled rule, mask) for every rule."""
+        return [(rule, rule.evaluate(table)) for rule in self.rules]
+
+    def counts(self, table):
+        return {rule.rule.name: int(np.count_nonzero(mask)) for rule, mask in self.evaluate(table)}
+
+    def alerts(self, table):
+        """One dict per firing (rule, row, kept axis labels), most severe first."""
+        result = []
+        for rule, mask in self.evaluate(table):
+            for hit in np.argwhere(mask):
+                set_number, bearing, channel = table.rows[hit[0]]
+                alert = {
+                    'rule': rule.rule.name,
+                    'level': rule.rule.level,
+                    'description': rule.rule.description,
+                    'set': set_number,
+                    'bearing': bearing,
+                    'channel': channel,
+                    'failure': table.labels[hit[0]],
+                }
+                alert.update({axis: AXES[axis][i] for axis, i in zip(rule.axes, hit[1:])})
+                result.append(alert)
+        result.sort(key=lambda alert: -LEVELS.index(alert['level']))
+        return result
+
+
+def synthetic_table(bearings, channels_per_bearing=2, seed=0):
+    """A random fleet of ``bearings`` bearings, for benchmarks."""
+    rng = np.random.default_rng(seed)
+    rows = [(1 + b // 4, 1 + b % 4, c + 1) for b in range(bearings) for c in range(channels_per_bearing)]
+    table = FleetTable.empty(rows)
+    for field, values in table.arrays.items():
+        values[...] = rng.lognormal(mean=1.0, sigma=1.5, size=values.shape)
+    return table
+
+
+default_engine = AlertEngine()
+
+_lock = threading.Lock()
+_current = {'versions': None, 'table': None}
+
+
+def current_table():
+    """Fleet table of the current artifacts, rebuilt only when one of them changes."""
+    degradation = repository.get_artifact('degradation_features')
+    bearing_analysis = repository.get_artifact('bearing_analysis_results')
+    versions = (repository.ARTIFACTS['degradation_features'].version, repository.ARTIFACTS['bearing_analysis_results'].version)
+    with _lock:
+        if _current['versions'] != versions:
+            _current['table'] = FleetTable.from_artifacts(degradation, bearing_analysis)
+            _current['versions'] = versions
+        return _current['table']
+
+
+def current_alerts(engine=None):
+    return (engine or default_engine).alerts(current_table())
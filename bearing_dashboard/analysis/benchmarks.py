@@ -0,0 +1,210 @@
+"""
+Benchmarks of the dashboard request path.
+
+A plain ``pytest`` run doesn't collect this file because its name doesn't
+match python_files. Run it explicitly from bearing_dashboard/:
+
+    pytest analysis/benchmarks.py
+
+Each fleet scale is a synthetic dataset with that many times today's
+bearings (see synthetic.py). For every scale the suite times these phases
+separately:
+
+- loading each JSON artifact
+- the plot directory scans
+- the dashboard version check
+- the dashboard.html render
+
+It also measures end-to-end ``client.get('')`` latency, cold (nothing
+cached) and warm (cached page), and the response size.
+
+Results go to BENCHMARK_OUTPUT and are compared against the stored
+baseline. A timing regresses when its median exceeds the baseline median by
+more than BENCHMARK_TIME_THRESHOLD times. Timings under BENCHMARK_MIN_MS
+are treated as noise. A response size regresses when it grows by more than
+BENCHMARK_SIZE_THRESHOLD times. Timings from another environment aren't
+comparable, so when the Python, Django or numpy version, the CPU count, the
+operating system or the CPU architecture differs from the baseline's the
+comparison is skipped with the differences; record the baseline with the
+versions pinned in requirements.txt, on the hardware it is compared on.
+
+Environment:
+    BENCHMARK_SCALES            comma separated scales (default 1,10,100,1000)
+    BENCHMARK_ROUNDS            samples per timing at scale 1, fewer for larger scales (default 30)
+    BENCHMARK_OUTPUT            results file (default benchmark_results.json)
+    BENCHMARK_BASELINE          baseline file (default analysis/benchmark_baseline.json)
+    BENCHMARK_TIME_THRESHOLD    default 2.0
+    BENCHMARK_SIZE_THRESHOLD    default 1.2
+    BENCHMARK_MIN_MS            default 1.0
+    BENCHMARK_UPDATE_BASELINE   set to 1 to store this run as the new baseline
+"""
+import json
+import math
+import os
+import platform
+import sys
+import time
+
+import django
+import numpy as np
+import pytest
+from django.conf import settings
+from django.core.cache import cache
+from django.test import RequestFactory
+
+from analysis import caching, plots, repository, synthetic, views
+
+
+SCALES = [int(scale) for scale in os.environ.get('BENCHMARK_SCALES', '1,10,100,1000').split(',')]
+ROUNDS = int(os.environ.get('BENCHMARK_ROUNDS', 30))
+MIN_ROUNDS = 5
+OUTPUT = os.environ.get('BENCHMARK_OUTPUT', os.path.join(settings.BASE_DIR, 'benchmark_results.json'))
+BASELINE = os.environ.get('BENCHMARK_BASELINE', os.path.join(settings.BASE_DIR, 'analysis', 'benchmark_baseline.json'))
+TIME_THRESHOLD = float(os.environ.get('BENCHMARK_TIME_THRESHOLD', 2.0))
+SIZE_THRESHOLD = float(os.environ.get('BENCHMARK_SIZE_THRESHOLD', 1.2))
+MIN_MS = float(os.environ.get('BENCHMARK_MIN_MS', 1.0))
+
+
+def rounds_for(scale):
+    # keeps the 1000x run to a few samples per phase
+    return max(MIN_ROUNDS, int(ROUNDS / math.sqrt(scale)))
+
+
+def measure(func, rounds, setup=None):
+    """Latency summary in milliseconds of ``rounds`` calls; ``setup`` runs untimed before each."""
+    samples = []
+    for _ in range(rounds):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {
+        'p50': round(float(p50), 4),
+        'p95': round(float(p95), 4),
+        'p99': round(float(p99), 4),
+        'mean': round(float(np.mean(samples)), 4),
+        'rounds': rounds,
+    }
+
+
+def compare(results, baseline, time_threshold=TIME_THRESHOLD, size_threshold=SIZE_THRESHOLD, min_ms=MIN_MS):
+    """Regression messages for the scales and metrics present in both runs."""
+    regressions = []
+    for scale, metrics in results.items():
+        for metric, value in metrics.items():
+            base = baseline.get(scale, {}).get(metric)
+            if base is None:
+                continue
+            if isinstance(value, dict):
+                if max(value['p50'], base['p50']) >= min_ms and value['p50'] > base['p50'] * time_threshold:
+                    regressions.append(f'{scale} {metric}: median {value["p50"]:.2f} ms vs baseline {base["p50"]:.2f} ms')
+            elif metric.endswith('_bytes') and value > base * size_threshold:
+                regressions.append(f'{scale} {metric}: {value} bytes vs baseline {base} bytes')
+    return regressions
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'system': platform.system(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'argv': sys.argv[1:],
+    }
+
+
+def environment_differences(current, baseline):
+    """
+    Messages for what differs between two environments that makes their
+    timings incomparable: versions (Python by minor version) and hardware.
+    The kernel release in 'platform' is left out, it changes with updates.
+    """
+    differences = []
+    for name in ['python', 'django', 'numpy', 'cpus', 'system', 'machine']:
+        ours, theirs = current.get(name), baseline.get(name)
+        if name == 'python':
+            ours, theirs = (version and '.'.join(version.split('.')[:2]) for version in (ours, theirs))
+        if ours != theirs:
+            differences.append(f'{name} {ours} vs baseline {theirs}')
+    return differences
+
+
+def load_baseline(path=BASELINE):
+    """The baseline's environment and scales, empty without a baseline."""
+    try:
+        with open(path) as file:
+            baseline = json.load(file)
+    except FileNotFoundError:
+        return {'environment': {}, 'scales': {}}
+    return {'environment': baseline.get('environment', {}), 'scales': baseline['scales']}
+
+
+@pytest.fixture(scope='module')
+def report():
+    report = {'environment': environment(), 'scales': {}}
+    yield report
+    payload = json.dumps(report, indent=2, sort_keys=True)
+    with open(OUTPUT, 'w') as file:
+        file.write(payload)
+    if os.environ.get('BENCHMARK_UPDATE_BASELINE') == '1':
+        with open(BASELINE, 'w') as file:
+            file.write(payload)
+
+
+@pytest.fixture
+def scaled_data(request, tmp_path, monkeypatch):
+    # points the artifacts and the version check at a synthetic data folder
+    paths = synthetic.write_artifacts(tmp_path, request.param)
+    for name, path in paths.items():
+        monkeypatch.setattr(repository.ARTIFACTS[name], 'path', path)
+    monkeypatch.setattr(caching, 'DATA_DIR', str(tmp_path))
+    repository.clear_cache()
+    plots.clear_manifest()
+    cache.clear()
+    yield request.param
+    repository.clear_cache()
+    cache.clear()
+
+
+def cold():
+    repository.clear_cache()
+    cache.clear()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('scaled_data', SCALES, indirect=True, ids=[f'{scale}x' for scale in SCALES])
+def test_dashboard_request_path(scaled_data, client, report):
+    scale = scaled_data
+    rounds = rounds_for(scale)
+    metrics = {'bearings': len(repository.get_artifact('bearing_analysis_results').bearings)}
+
+    for name in repository.ARTIFACTS:
+        metrics[f'load_{name}'] = measure(lambda: repository.get_artifact(name), rounds, setup=repository.clear_cache)
+        metrics[f'{name}_bytes'] = os.path.getsize(repository.ARTIFACTS[name].path)
+
+    metrics['directory_scan'] = measure(lambda: [plots.list_plots(group) for group in plots.PLOT_GROUPS], rounds)
+    metrics['version_check'] = measure(caching.dashboard_version, rounds)
+
+    request = RequestFactory().get('/')
+    metrics['render'] = measure(lambda: views._render_dashboard(request), rounds)
+
+    responses = []
+    metrics['request_cold'] = measure(lambda: responses.append(client.get('')), rounds, setup=cold)
+    metrics['request_warm'] = measure(lambda: responses.append(client.get('')), rounds)
+    assert all(response.status_code == 200 for response in responses)
+    metrics['response_bytes'] = len(responses[-1].content)
+
+    key = f'{scale}x'
+    report['scales'][key] = metrics
+    baseline = load_baseline()
+    if baseline['scales'] and os.environ.get('BENCHMARK_UPDATE_BASELINE') != '1':
+        differences = environment_differences(report['environment'], baseline['environment'])
+        if differences:
+            pytest.skip('Not compared with a baseline from another environment: ' + ', '.join(differences))
+    regressions = compare({key: metrics}, baseline['scales'])
+    assert not regressions, 'Performance regressions:\n' + '\n'.join(regressions)
@@ -0,0 +1,110 @@
+"""
+Content versioning and response caching for the dashboard page.
+
+The rendered dashboard only changes when one of its inputs changes: the JSON
+artifacts under static/analysis/data, the dashboard template, or the set of
+plot fragments it links to (and their hashed URLs, see plots.py). ``dashboard_version`` fingerprints those inputs so
+the page can be served with a strong ETag and Last-Modified, answered with a
+304 when the client is up to date, and otherwise served from Django's cache
+framework without rendering the template again.
+"""
+import hashlib
+import os
+import threading
+from dataclasses import dataclass
+
+from django.conf import settings
+
+from .plots import PLOT_GROUPS, TEMPLATE_DIR, list_plots, manifest_digest
+from .repository import DATA_DIR
+from .timing import timed
+
+
+_digest_lock = threading.Lock()
+_file_digests = {}
+
+
+@dataclass(frozen=True)
+class ContentVersion:
+    digest: str
+    last_modified: int
+    namespace: str = 'dashboard'
+
+    @property
+    def etag(self):
+        return f'"{self.digest}"'
+
+    @property
+    def cache_key(self):
+        return f'analysis:{self.namespace}:{self.digest}'
+
+
+def _list_dir(path):
+    try:
+        return sorted(os.listdir(path))
+    except FileNotFoundError:
+        return []
+
+
+def dashboard_inputs():
+    # every file whose content can change the rendered dashboard
+    inputs = [os.path.join(DATA_DIR, name) for name in _list_dir(DATA_DIR)]
+    inputs.append(os.path.join(TEMPLATE_DIR, 'dashboard.html'))
+    # hashed static file names end up in the page through {% static %}
+    manifest = os.path.join(settings.STATIC_ROOT, 'staticfiles.json')
+    if os.path.exists(manifest):
+        inputs.append(manifest)
+    return inputs
+
+
+def file_digest(path, stat=None):
+    """sha256 of a file, recomputed only when its mtime or size changes."""
+    stat = stat or os.stat(path)
+    stat_key = (stat.st_mtime_ns, stat.st_size)
+    with _digest_lock:
+        cached = _file_digests.get(path)
+        if cached and cached[0] == stat_key:
+            return cached[1]
+
+    sha = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+
+    with _digest_lock:
+        _file_digests[path] = (stat_key, digest)
+    return digest
+
+
+def dashboard_version():
+    """Fingerprint of all dashboard inputs, or None if one of them can't be read."""
+    with timed('version'):
+        return _dashboard_version()
+
+
+def _dashboard_version():
+    sha = hashlib.sha256()
+    # the page only links to plot fragments, so only their names and URLs matter here
+    for group in PLOT_GROUPS:
+        sha.update(f'{group}:{",".join(list_plots(group))};'.encode())
+    sha.update(manifest_digest().encode())
+
+    last_modified = 0
+    for path in dashboard_inputs():
+        try:
+            stat = os.stat(path)
+            digest = file_digest(path, stat)
+        except FileNotFoundError:
+            continue
+        except OSError:
+            return None
+        sha.update(os.path.relpath(path, settings.BASE_DIR).encode())
+        sha.update(digest.encode())
+        last_modified = max(last_modified, int(stat.st_mtime))
+    return ContentVersion(digest=sha.hexdigest()[:32], last_modified=last_modified)
+
+
+def clear_digests():
+    with _digest_lock:
+        _file_digests.clear()
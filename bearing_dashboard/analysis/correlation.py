@@ -0,0 +1,155 @@
+"""
+Correlation matrix of the degradation features, kept in streaming
+covariance accumulators.
+
+An observation is one channel in one band at one life stage of
+degradation_features.json. Its features (FEATURES) are the ratio to
+baseline, the rate and the stability of every metric. Observations are
+accumulated per (failure label, band) group in a ``Covariance``: count,
+mean and co-moment matrix, combined with Chan's parallel formulas.
+
+Adding observations costs O(features²) each, without revisiting earlier
+ones. The matrix of a subset (some failure types, some bands) merges the
+accumulators of its groups, O(groups × features²). When the artifact
+changes, a group that only gained channels has the new observations merged
+into its accumulator; a group where an existing channel changed (its run
+grew, so its stage statistics moved) or disappeared is accumulated again.
+"""
+import hashlib
+import threading
+
+import numpy as np
+
+from . import features, repository
+
+
+KINDS = ['ratio', 'rate', 'stability']
+FEATURES = [f'{metric.lower()}_{kind}' for metric in features.METRICS for kind in KINDS]
+BANDS = list(features.BANDS)
+
+
+class Covariance:
+    """Count, mean and co-moment matrix of observations with ``size`` features."""
+
+    __slots__ = ('count', 'mean', 'comoment')
+
+    def __init__(self, size, count=0, mean=None, comoment=None):
+        self.count = count
+        self.mean = np.zeros(size) if mean is None else mean
+        self.comoment = np.zeros((size, size)) if comoment is None else comoment
+
+    @classmethod
+    def of(cls, rows):
+        rows = np.asarray(rows, dtype=np.float64)
+        if len(rows) == 0:
+            return cls(rows.shape[1])
+        mean = rows.mean(axis=0)
+        centred = rows - mean
+        return cls(rows.shape[1], len(rows), mean, centred.T @ centred)
+
+    def merge(self, other):
+        """A new accumulator over the observations of both."""
+        if other.count == 0:
+            return Covariance(len(self.mean), self.count, self.mean, self.comoment)
+        if self.count == 0:
+            return Covariance(len(other.mean), other.count, other.mean, other.comoment)
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        return Covariance(
+            len(self.mean),
+            total,
+            self.mean + delta * other.count / total,
+            self.comoment + other.comoment + np.outer(delta, delta) * self.count * other.count / total,
+        )
+
+    def correlation(self):
+        """Pearson correlation matrix; NaN where a feature doesn't vary."""
+        deviation = np.sqrt(np.diag(self.comoment))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            matrix = self.comoment / np.outer(deviation, deviation)
+        matrix[np.outer(deviation, deviation) == 0] = np.nan
+        return np.clip(matrix, -1.0, 1.0)
+
+
+def observations(degradation):
+    """(channels, bands, stages, FEATURES) array of a results.DegradationFeatures."""
+    # the early stage is the baseline: its ratio is 1 by definition
+    ratios = np.concatenate([np.ones_like(degradation.ratios[:, :1]), degradation.ratios], axis=1)
+    # (channels, stage, band, metric, kind) -> (channels, band, stage, metric * kind)
+    values = np.stack([ratios, degradation.rates, degradation.stability], axis=-1)
+    return values.transpose(0, 2, 1, 3, 4).reshape(values.shape[0], len(BANDS), len(features.STAGES), len(FEATURES))
+
+
+class CorrelationIndex:
+    """
+    Accumulators per (failure label, band), refreshed from the artifact group
+    by group. Each group remembers a digest of every channel's observations,
+    so a refresh can tell new channels from changed ones.
+    """
+
+    def __init__(self):
+        self.groups = {}
+        self.labels = []
+
+    def refresh(self, degradation):
+        """Update the groups that changed; returns how many were rebuilt and how many appended to."""
+        values = observations(degradation)
+        groups = {}
+        rebuilt = appended = 0
+        for label in degradation.labels:
+            members = [(row, channel.name) for row, channel in enumerate(degradation.channels) if channel.label == label]
+            for b, band in enumerate(BANDS):
+                digests = {name: hashlib.sha256(np.ascontiguousarray(values[row, b]).tobytes()).hexdigest() for row, name in members}
+                # a new group starts empty, and all its channels are new
+                current = self.groups.get((label, band), ({}, Covariance(len(FEATURES))))
+                if all(digests.get(name) == digest for name, digest in current[0].items()):
+                    covariance = current[1]
+                    added = [row for row, name in members if name not in current[0]]
+                    if added:
+                        # merged into a new accumulator, not in place: requests may be reading the old one
+                        covariance = covariance.merge(Covariance.of(values[added, b].reshape(-1, len(FEATURES))))
+                        appended += 1
+                else:
+                    rows = [row for row, _ in members]
+                    covariance = Covariance.of(values[rows, b].reshape(-1, len(FEATURES)))
+                    rebuilt += 1
+                groups[(label, band)] = (digests, covariance)
+        self.groups = groups
+        self.labels = degradation.labels
+        return rebuilt, appended
+
+    def covariance(self, failures=None, bands=None):
+        """Merged accumulator of the groups in ``failures`` and ``bands`` (all when None)."""
+        merged = Covariance(len(FEATURES))
+        for (label, band), (_, covariance) in self.groups.items():
+            if (failures is None or label in failures) and (bands is None or band in bands):
+                merged = merged.merge(covariance)
+        return merged
+
+
+_lock = threading.Lock()
+_current = {'version': None, 'index': CorrelationIndex()}
+
+
+def current_index():
+    """Index of the current degradation features, refreshed when the artifact changes."""
+    degradation = repository.get_artifact('degradation_features')
+    version = repository.ARTIFACTS['degradation_features'].version
+    with _lock:
+        if _current['version'] != version:
+            _current['index'].refresh(degradation)
+            _current['version'] = version
+        return _current['index']
+
+
+def heatmap(index, failures=None, bands=None):
+    """JSON-ready heatmap of the correlation between FEATURES over the selected groups."""
+    covariance = index.covariance(failures, bands)
+    matrix = covariance.correlation()
+    return {
+        'features': FEATURES,
+        'matrix': [[None if np.isnan(value) else round(float(value), 4) for value in row] for row in matrix],
+        'observations': covariance.count,
+        'failures': failures or index.labels,
+        'bands': bands or BANDS,
+    }
@@ -0,0 +1,199 @@
+"""
+Relationships between the channels of one bearing, from its raw signals.
+
+For every pair of channels, over sliding windows of ``window`` samples
+hopping by half a window:
+
+- correlation: the peak of the normalised cross-correlation, signed
+- lag: where that peak is, positive when the second channel lags the first
+- RMS ratio: first channel over second
+- phase lag of the second channel behind the first in each band, from the
+  cross spectrum summed over the band
+
+and over all windows the magnitude-squared coherence, Welch's estimate
+|mean cross spectrum|² / (mean auto spectra), per frequency and averaged
+per band weighted by power, with the phase lag of the averaged cross
+spectrum.
+
+Every window of every channel is detrended, Hann-tapered and zero-padded to
+twice its length, so that the circular correlation of one batched FFT is
+the linear one. Cross spectra of all pairs and windows are one broadcast
+product and their correlations one inverse FFT. Windows are processed
+BATCH at a time, so long recordings from the signal store stay within a
+fixed amount of memory.
+
+Results are cached per (set, bearing, window, data version).
+"""
+import functools
+
+import numpy as np
+
+from . import features, signals, spectra
+
+
+WINDOWS = [256, 512, 1024, 2048, 4096, 8192]
+DEFAULT_WINDOW = 2048
+BATCH = 256
+COHERENCE_POINTS = 500
+
+
+def windows(values, window):
+    """(windows, window) views of each of the equally long 1-D arrays ``values``, hopping by half a window."""
+    length = min(len(channel) for channel in values)
+    if length < window:
+        raise ValueError(f'{length} samples are fewer than one window of {window}')
+    return [np.lib.stride_tricks.sliding_window_view(channel[:length], window)[::window // 2] for channel in values]
+
+
+def pair_indices(channels):
+    return np.triu_indices(channels, 1)
+
+
+def analyse(values, sample_rate, window=DEFAULT_WINDOW, bands=features.BANDS):
+    """
+    Cross-channel measures of ``values``, a (channels, samples) array or a
+    list of 1-D arrays such as memmaps: per pair and window, and over all
+    windows. Returns arrays; see ``pair_results``.
+    """
+    frames = windows(values, window)
+    channels, count = len(frames), len(frames[0])
+    first, second = pair_indices(channels)
+    taper = np.hanning(window + 1)[:-1]
+    frequencies = np.fft.rfftfreq(2 * window, d=1 / sample_rate)
+    masks = np.stack([(frequencies >= lo) & (frequencies < hi) for lo, hi in bands.values()]).astype(np.float64)
+    # lag of each inverse FFT index: 0, 1, ..., window - 1, then -window, ..., -1
+    lags = np.concatenate([np.arange(window), np.arange(-window, 0)])
+
+    correlation = np.empty((len(first), count))
+    lag = np.empty((len(first), count), dtype=np.int64)
+    rms_ratio = np.empty((len(first), count))
+    band_cross = np.empty((len(first), count, len(bands)), dtype=np.complex128)
+    cross_sum = np.zeros((len(first), len(frequencies)), dtype=np.complex128)
+    auto_sum = np.zeros((channels, len(frequencies)))
+
+    for start in range(0, count, BATCH):
+        batch = np.stack([np.asarray(channel[start:start + BATCH], dtype=np.float64) for channel in frames])
+        batch = batch - batch.mean(axis=-1, keepdims=True)
+        rms = np.sqrt(np.mean(batch ** 2, axis=-1))
+        tapered = batch * taper
+        energy = np.sum(tapered ** 2, axis=-1)
+        spectrum = np.fft.rfft(tapered, n=2 * window, axis=-1)
+
+        # r[k] = sum x_second[n + k] x_first[n]: peaks at k = d when the second lags by d
+        cross = spectrum[second] * spectrum[first].conj()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            normalised = np.fft.irfft(cross, n=2 * window, axis=-1) / np.sqrt(energy[first] * energy[second])[..., None]
+            rms_ratio[:, start:start + BATCH] = rms[first] / rms[second]
+        normalised = np.nan_to_num(normalised)
+        peak = np.abs(normalised).argmax(axis=-1)
+        correlation[:, start:start + BATCH] = np.take_along_axis(normalised, peak[..., None], axis=-1)[..., 0]
+        lag[:, start:start + BATCH] = lags[peak]
+        band_cross[:, start:start + BATCH] = cross @ masks.T
+        cross_sum += cross.sum(axis=1)
+        auto_sum += (spectrum.real ** 2 + spectrum.imag ** 2).sum(axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        coherence = np.nan_to_num(np.abs(cross_sum) ** 2 / (auto_sum[first] * auto_sum[second]))
+        # bins weighted by their power, so a band isn't judged by the bins where neither channel has any
+        weights = np.sqrt(auto_sum[first] * auto_sum[second])
+        band_coherence = np.nan_to_num((coherence * weights) @ masks.T / (weights @ masks.T))
+    return {
+        'pairs': list(zip(first.tolist(), second.tolist())),
+        'starts': np.arange(count) * (window // 2) / sample_rate,
+        'correlation': correlation,
+        'lag_seconds': lag / sample_rate,
+        'rms_ratio': rms_ratio,
+        # the cross spectrum's angle is the second channel's phase minus the first's
+        'phase_lag': -np.degrees(np.angle(band_cross)),
+        'frequencies': frequencies,
+        'coherence': coherence,
+        'band_coherence': band_coherence,
+        'band_phase_lag': -np.degrees(np.angle(cross_sum @ masks.T)),
+        'windows': count,
+    }
+
+
+def _rounded(values, digits=4):
+    return np.round(np.nan_to_num(values, nan=0.0, posinf=0.0, neginf=0.0), digits).tolist()
+
+
+def pair_results(result, channel_numbers, points=COHERENCE_POINTS):
+    """JSON-ready entries of every pair of an ``analyse`` result, named by channel number."""
+    bands = list(features.BANDS)
+    pairs = []
+    for p, (i, j) in enumerate(result['pairs']):
+        frequencies, coherence = spectra.reduce(result['frequencies'], result['coherence'][p:p + 1], points)
+        pairs.append({
+            'channels': [channel_numbers[i], channel_numbers[j]],
+            'windows': {
+                'correlation': _rounded(result['correlation'][p]),
+                'lag_ms': _rounded(result['lag_seconds'][p] * 1000),
+                'rms_ratio': _rounded(result['rms_ratio'][p]),
+                'phase_lag': {band: _rounded(result['phase_lag'][p, :, b], 2) for b, band in enumerate(bands)},
+            },
+            'coherence': {
+                'frequencies': np.round(frequencies, 3).tolist(),
+                'values': _rounded(coherence[0]),
+                'bands': dict(zip(bands, _rounded(result['band_coherence'][p]))),
+            },
+            'phase_lag': dict(zip(bands, _rounded(result['band_phase_lag'][p], 2))),
+            'summary': {
+                'correlation': round(float(np.median(result['correlation'][p])), 4),
+                'lag_ms': round(float(np.median(result['lag_seconds'][p]) * 1000), 4),
+                'rms_ratio': round(float(np.median(result['rms_ratio'][p])), 4),
+            },
+        })
+    return pairs
+
+
+@functools.lru_cache(maxsize=64)
+def _bearing_pairs(set_number, bearing, window, data_version):
+    # data_version is only part of the cache key: a new version computes afresh
+    numbers = sorted(signals.bearings(set_number).get(bearing, []))
+    channels = [signals.get_signal(set_number, bearing, number) for number in numbers]
+    sample_rate = channels[0].sample_rate
+    result = {
+        'set': set_number,
+        'bearing': bearing,
+        'channels': numbers,
+        'sample_rate': sample_rate,
+        'window': window,
+        'window_seconds': window / sample_rate,
+        'bands': {band: list(limits) for band, limits in features.BANDS.items()},
+        'starts': [],
+        'pairs': [],
+    }
+    if len(channels) > 1:
+        analysed = analyse([channel.values for channel in channels], sample_rate, window)
+        result['starts'] = np.round(analysed['starts'] + channels[0].start_time, 6).tolist()
+        result['pairs'] = pair_results(analysed, numbers)
+    return result
+
+
+def bearing_pairs(set_number, bearing, window=DEFAULT_WINDOW):
+    """
+    Cross-channel measures of every channel pair of a bearing, JSON-ready;
+    raises LookupError for an unknown bearing and ValueError when the
+    signals are shorter than a window. Treat the result as read-only.
+    """
+    if not signals.bearings(set_number).get(bearing):
+        raise LookupError(f'Set {set_number} has no bearing {bearing}')
+    try:
+        data_version, _ = signals.data_version(set_number)
+    except FileNotFoundError:
+        raise LookupError(f'No raw signals for set {set_number}')
+    return _bearing_pairs(set_number, bearing, window, data_version)
+
+
+def multichannel_bearings():
+    """(set, bearing, channels) of every bearing with more than one channel and signals to read."""
+    found = []
+    for set_number, info in signals.signal_index().items():
+        for bearing, channels in info['bearings'].items():
+            if len(channels) > 1:
+                found.append((int(set_number), int(bearing), channels))
+    return found
+
+
+def clear_cache():
+    _bearing_pairs.cache_clear()
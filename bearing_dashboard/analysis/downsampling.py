@@ -0,0 +1,76 @@
+"""
+Shape-preserving downsampling of evenly ordered (x, y) series for plotting.
+
+``minmax`` keeps the smallest and largest sample of every bucket, so spikes
+and the vibration envelope survive any zoom level. ``lttb`` (Largest Triangle
+Three Buckets) keeps one visually significant point per bucket and gives
+smoother lines for slowly varying series.
+"""
+import numpy as np
+
+
+METHODS = ('minmax', 'lttb')
+
+
+def _bucket_edges(start, stop, buckets):
+    return np.linspace(start, stop, buckets + 1).astype(np.int64)
+
+
+def minmax(x, y, points):
+    """Reduce to at most ``points`` samples, keeping each bucket's min and max."""
+    n = len(y)
+    if points >= n or points < 2:
+        return x, y
+
+    width = -(-n // (points // 2))
+    buckets = -(-n // width)
+    # pad the last bucket with NaN so every bucket has the same width
+    padded = np.full(buckets * width, np.nan)
+    padded[:n] = y
+    shaped = padded.reshape(buckets, width)
+    offsets = np.arange(buckets) * width
+    lo = np.nanargmin(shaped, axis=1) + offsets
+    hi = np.nanargmax(shaped, axis=1) + offsets
+
+    # keep both extremes per bucket in their original order
+    index = np.sort(np.stack([lo, hi], axis=1), axis=1).ravel()
+    index = index[np.concatenate(([True], np.diff(index) != 0))]
+    return x[index], y[index]
+
+
+def lttb(x, y, points):
+    """Largest Triangle Three Buckets; keeps the first and last sample."""
+    n = len(y)
+    if points >= n or points < 3:
+        return x, y
+
+    xf = np.asarray(x, dtype=np.float64)
+    yf = np.asarray(y, dtype=np.float64)
+    edges = _bucket_edges(1, n - 1, points - 2)
+
+    index = np.empty(points, dtype=np.int64)
+    index[0] = 0
+    index[-1] = n - 1
+    selected = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # average of the next bucket (or the last point) is the third vertex
+        if i + 2 < len(edges):
+            nxt = slice(edges[i + 1], edges[i + 2])
+            avg_x, avg_y = xf[nxt].mean(), yf[nxt].mean()
+        else:
+            avg_x, avg_y = xf[-1], yf[-1]
+
+        ax, ay = xf[selected], yf[selected]
+        area = np.abs((ax - avg_x) * (yf[lo:hi] - ay) - (ax - xf[lo:hi]) * (avg_y - ay))
+        selected = lo + int(area.argmax())
+        index[i + 1] = selected
+    return x[index], y[index]
+
+
+def downsample(x, y, points, method='minmax'):
+    if method == 'minmax':
+        return minmax(x, y, points)
+    if method == 'lttb':
+        return lttb(x, y, points)
+    raise ValueError(f'Unknown downsampling method: {method}')
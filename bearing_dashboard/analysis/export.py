@@ -0,0 +1,214 @@
+"""
+Flat row exports of the analysis artifacts, streamed as CSV, NDJSON or,
+when pyarrow is installed, Parquet.
+
+Each dataset is a generator yielding one tuple of COLUMNS at a time from
+the typed artifact in memory (see results.py):
+
+- band_changes: one row per channel of bearing_analysis_results.json
+- degradation: one row per channel, band and metric of degradation_features.json
+- predictions: one row per timeline stage of prediction_analysis.json
+
+Rows are encoded as they are generated and sent in chunks of about
+CHUNK_BYTES, and Parquet row groups are flushed every ROW_GROUP rows, so
+the memory used doesn't grow with the number of rows. Degradation
+features map to a set and bearing through features.FAILURES, predictions
+through the "(Set N, Bearing M)" in their label, and rows that can't be
+mapped are left out by set or bearing filters.
+"""
+import csv
+import io
+import json
+import math
+
+from . import features, loading, repository, results
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+CHUNK_BYTES = 64 * 1024
+ROW_GROUP = 10000
+FILTERS = ['set', 'bearing', 'channel']
+# the other columns are numbers
+TEXT_COLUMNS = ['failure', 'band', 'metric', 'label', 'life_stage']
+
+BAND_CHANGE_COLUMNS = ['set', 'bearing', 'channel', 'failure_point_percentage'] + results.CHANNEL_COLUMNS
+DEGRADATION_COLUMNS = ['failure', 'set', 'bearing', 'channel', 'band', 'metric'] + results.RATIOS + [
+    f'{field}_{stage}' for field in ['rate', 'stability'] for stage in features.STAGES
+]
+PREDICTION_COLUMNS = ['label', 'set', 'bearing', 'average_accuracy', 'life_stage'] + results.STAGE_COLUMNS
+
+
+def _matches(filters, set_number, bearing, channel=None):
+    return all(
+        filters.get(name) is None or filters[name] == value
+        for name, value in [('set', set_number), ('bearing', bearing), ('channel', channel)]
+    )
+
+
+def band_change_rows(analysis, filters):
+    for bearing in analysis.bearings:
+        if not _matches(filters, bearing.set_number, bearing.number):
+            continue
+        for channel in bearing.channels:
+            if _matches(filters, bearing.set_number, bearing.number, channel.number):
+                yield (bearing.set_number, bearing.number, channel.number, bearing.failure_point_percentage, *channel.values.tolist())
+
+
+def degradation_rows(degradation, filters, failures=features.FAILURES):
+    by_label = {failure['label']: (failure['set'], failure['bearing']) for failure in failures}
+    for channel in degradation.channels:
+        set_number, bearing = by_label.get(channel.label, (None, None))
+        if not _matches(filters, set_number, bearing, channel.number):
+            continue
+        ratios, rates, stability = channel.ratios.tolist(), channel.rates.tolist(), channel.stability.tolist()
+        for b, band in enumerate(features.BANDS):
+            for m, metric in enumerate(features.METRICS):
+                yield (
+                    channel.label, set_number, bearing, channel.number, band, metric,
+                    *[ratio[b][m] for ratio in ratios],
+                    *[stage[b][m] for stage in rates],
+                    *[stage[b][m] for stage in stability],
+                )
+
+
+def prediction_rows(predictions, filters):
+    for bearing in predictions.bearings:
+        match = loading.PREDICTION_BEARING.search(bearing.label)
+        set_number, number = (int(match.group(1)), int(match.group(2))) if match else (None, None)
+        if not _matches(filters, set_number, number):
+            continue
+        for stage in bearing.timeline:
+            yield (bearing.label, set_number, number, bearing.average_accuracy, stage.life_stage, *stage.values.tolist())
+
+
+# dataset: (artifact, columns, row generator, filters it supports)
+DATASETS = {
+    'band_changes': ('bearing_analysis_results', BAND_CHANGE_COLUMNS, band_change_rows, FILTERS),
+    'degradation': ('degradation_features', DEGRADATION_COLUMNS, degradation_rows, FILTERS),
+    'predictions': ('prediction_analysis', PREDICTION_COLUMNS, prediction_rows, ['set', 'bearing']),
+}
+
+
+def parse_filters(dataset, params):
+    """set, bearing and channel filters of a GET query; raises ValueError with a message for the client."""
+    supported = DATASETS[dataset][3]
+    filters = {}
+    for name in FILTERS:
+        if not params.get(name):
+            continue
+        if name not in supported:
+            raise ValueError(f'{dataset} can be filtered by {", ".join(supported)} only')
+        try:
+            filters[name] = int(params[name])
+        except ValueError:
+            raise ValueError(f'{name} must be an integer')
+    return filters
+
+
+def rows(dataset, filters, artifact=None):
+    """Columns and row generator of ``dataset``, from the current artifact unless one is given."""
+    name, columns, generate, _ = DATASETS[dataset]
+    if artifact is None:
+        artifact = repository.get_artifact(name)
+    return columns, generate(artifact, filters)
+
+
+def _chunks(pieces, size=CHUNK_BYTES):
+    # joins encoded rows into chunks of about ``size`` bytes
+    buffer, length = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        length += len(piece)
+        if length >= size:
+            yield ''.join(buffer).encode()
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer).encode()
+
+
+class _Line:
+    # csv.writer target that hands back the line instead of storing it
+    def write(self, value):
+        return value
+
+
+def csv_stream(columns, rows):
+    writer = csv.writer(_Line())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_stream(columns, rows):
+    for row in rows:
+        # NaN and infinities aren't JSON
+        values = [None if isinstance(value, float) and not math.isfinite(value) else value for value in row]
+        yield json.dumps(dict(zip(columns, values))) + '\n'
+
+
+class _Sink(io.RawIOBase):
+    # write-only file for pyarrow that keeps the bytes until they are drained
+    def __init__(self):
+        self._pieces = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._pieces.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._pieces)
+        self._pieces = []
+        return data
+
+
+def arrow_schema(columns):
+    types = {name: pyarrow.int64() for name in FILTERS}
+    types.update({name: pyarrow.string() for name in TEXT_COLUMNS})
+    return pyarrow.schema([(name, types.get(name, pyarrow.float64())) for name in columns])
+
+
+def parquet_stream(columns, rows, row_group=ROW_GROUP):
+    """Parquet file bytes written one row group at a time; needs pyarrow."""
+    schema = arrow_schema(columns)
+    sink = _Sink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema)
+
+    def table(batch):
+        values = list(zip(*batch)) or [()] * len(columns)
+        return pyarrow.Table.from_arrays([pyarrow.array(column, type=field.type) for column, field in zip(values, schema)], schema=schema)
+
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= row_group:
+            writer.write_table(table(batch))
+            batch = []
+            yield sink.drain()
+    if batch:
+        writer.write_table(table(batch))
+    writer.close()
+    yield sink.drain()
+
+
+def formats():
+    """Available formats: (content type, file extension, stream)."""
+    available = {
+        'csv': ('text/csv; charset=utf-8', 'csv', lambda columns, rows: _chunks(csv_stream(columns, rows))),
+        'ndjson': ('application/x-ndjson', 'ndjson', lambda columns, rows: _chunks(ndjson_stream(columns, rows))),
+    }
+    if pyarrow is not None:
+        available['parquet'] = ('application/vnd.apache.parquet', 'parquet', parquet_stream)
+    return available
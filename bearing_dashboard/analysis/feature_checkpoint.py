@@ -0,0 +1,296 @@
+"""
+Checkpoint for incremental feature extraction (``build_features --incremental``).
+
+The checkpoint folder holds a ``manifest.json`` listing every processed
+snapshot file (path, size, mtime, sha256) per set, and one ``set<N>.npz``
+per set with the per-snapshot feature rows and, for every feature array and
+stage, a Welford/Chan accumulator (count, mean, M2 and the co-moment with
+the snapshot index).
+
+Only snapshot files missing from the manifest are extracted. The stage
+statistics of the artifacts come from the accumulators: as the run grows
+the stage edges move forward, so each stage drops the rows at its start and
+takes those at its end, and only the rows crossing an edge are touched. The
+failure point still scans the total power series, one number per snapshot
+and channel. If a processed file changes or disappears, or a new one sorts
+before the processed ones, the set is rebuilt.
+"""
+import io
+import json
+import os
+import zipfile
+
+import numpy as np
+from django.conf import settings
+
+from . import features
+from .caching import file_digest
+from .repository import atomic_write
+
+
+MANIFEST_FILE = 'manifest.json'
+MANIFEST_VERSION = 2
+FEATURE_KEYS = ['band_metrics', 'band_energy', 'spectrum']
+
+
+def checkpoint_dir():
+    return str(settings.FEATURE_CHECKPOINT_DIR)
+
+
+def snapshot_names(raw):
+    """Processed snapshot file names of every set, in time order, from the bytes of a manifest."""
+    manifest = json.loads(raw)
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {}
+    return {
+        int(set_number): sorted(os.path.basename(record['path']) for record in entry['files'])
+        for set_number, entry in manifest['sets'].items() if entry['files']
+    }
+
+
+class RunningStats:
+    """
+    Welford/Chan accumulator over axis 0 of consecutive snapshot rows: the
+    element-wise count, mean, M2 and co-moment with the snapshot index, from
+    which the mean, variance and least-squares slope per snapshot follow.
+    Rows are added at the end and removed from the start.
+    """
+
+    __slots__ = ('count', 'mean', 'm2', 'comoment')
+
+    def __init__(self, count=0, mean=None, m2=None, comoment=None):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.comoment = comoment
+
+    @staticmethod
+    def _moments(batch):
+        n = batch.shape[0]
+        mean = batch.mean(axis=0)
+        centred = batch - mean
+        index = (np.arange(n) - (n - 1) / 2).reshape((n,) + (1,) * (batch.ndim - 1))
+        return mean, (centred ** 2).sum(axis=0), (index * centred).sum(axis=0)
+
+    def update(self, batch):
+        """Add the rows following the last one."""
+        batch = np.asarray(batch, dtype=np.float64)
+        n = batch.shape[0]
+        if n == 0:
+            return
+        mean, m2, comoment = self._moments(batch)
+        if self.count == 0:
+            self.count, self.mean, self.m2, self.comoment = n, mean, m2, comoment
+            return
+        total = self.count + n
+        delta = mean - self.mean
+        weight = self.count * n / total
+        self.mean = self.mean + delta * n / total
+        self.m2 = self.m2 + m2 + delta ** 2 * weight
+        # the index means of two adjacent runs are half their total count apart
+        self.comoment = self.comoment + comoment + delta * (total / 2) * weight
+        self.count = total
+
+    def remove(self, batch):
+        """Remove the first rows; ``batch`` must be exactly those rows."""
+        batch = np.asarray(batch, dtype=np.float64)
+        n = batch.shape[0]
+        if n == 0:
+            return
+        if n >= self.count:
+            self.count, self.mean, self.m2, self.comoment = 0, None, None, None
+            return
+        mean, m2, comoment = self._moments(batch)
+        rest = self.count - n
+        rest_mean = (self.count * self.mean - n * mean) / rest
+        delta = rest_mean - mean
+        weight = n * rest / self.count
+        self.m2 = self.m2 - m2 - delta ** 2 * weight
+        self.comoment = self.comoment - comoment - delta * (self.count / 2) * weight
+        self.mean = rest_mean
+        self.count = rest
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else None
+
+    @property
+    def rate(self):
+        """Least-squares slope per snapshot, as features.slope."""
+        if self.count < 2:
+            return np.zeros_like(self.mean)
+        # sum of squared deviations of 0, 1, ..., count - 1 from their mean
+        return self.comoment / (self.count * (self.count ** 2 - 1) / 12)
+
+    def to_arrays(self, prefix):
+        if not self.count:
+            return {f'{prefix}_count': np.array(0)}
+        return {
+            f'{prefix}_count': np.array(self.count),
+            f'{prefix}_mean': self.mean,
+            f'{prefix}_m2': self.m2,
+            f'{prefix}_comoment': self.comoment,
+        }
+
+    @classmethod
+    def from_arrays(cls, data, prefix):
+        count = int(data[f'{prefix}_count'])
+        if not count:
+            return cls()
+        return cls(count, data[f'{prefix}_mean'], data[f'{prefix}_m2'], data[f'{prefix}_comoment'])
+
+
+class SetCheckpoint:
+    """Processed files, feature rows and stage accumulators of one test set."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.reset()
+        self.dirty = False
+
+    def __len__(self):
+        return len(self.files)
+
+    def pending(self, paths):
+        """(paths still to process, whether already processed input changed)."""
+        names = {os.path.basename(path) for path in paths}
+        if any(name not in names for name in self.files):
+            return paths, True
+
+        new = []
+        for path in paths:
+            record = self.files.get(os.path.basename(path))
+            if record is None:
+                new.append(path)
+                continue
+            stat = os.stat(path)
+            if stat.st_size != record['size']:
+                return paths, True
+            if stat.st_mtime_ns != record['mtime_ns'] and file_digest(path) != record['sha256']:
+                return paths, True
+        # stages are ranges of snapshots in time order, so new ones have to come last
+        if new and self.names and os.path.basename(new[0]) < self.names[-1]:
+            return paths, True
+        return new, False
+
+    def reset(self):
+        self.files = {}
+        self.names = []
+        self.rows = {}
+        self.stages = {key: [RunningStats() for _ in features.STAGES] for key in FEATURE_KEYS}
+        self.edges = features.stage_edges(0)
+        self.dirty = True
+
+    def add(self, paths, names, digests, stacked):
+        """Record new snapshots, which follow the processed ones in time, and move the stage edges."""
+        if not names:
+            return
+        for path, name, digest in zip(paths, names, digests):
+            stat = os.stat(path)
+            self.files[name] = {'path': path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest}
+        for key in FEATURE_KEYS:
+            self.rows[key] = stacked[key] if key not in self.rows else np.concatenate([self.rows[key], stacked[key]])
+        self.names.extend(names)
+
+        edges = features.stage_edges(len(self.names))
+        for key, stages in self.stages.items():
+            rows = self.rows[key]
+            for i, stats in enumerate(stages):
+                if edges[i] >= self.edges[i + 1]:
+                    # the stage moved past everything it held
+                    stages[i] = stats = RunningStats()
+                    stats.update(rows[edges[i]:edges[i + 1]])
+                    continue
+                stats.remove(rows[self.edges[i]:edges[i]])
+                stats.update(rows[self.edges[i + 1]:edges[i + 1]])
+        self.edges = edges
+        self.dirty = True
+
+    def summary(self):
+        """The input of features.build_artifacts, from the stage accumulators; ValueError for a run too short."""
+        features.check_run_length(len(self.names))
+        summary = {}
+        for key, stages in self.stages.items():
+            summary[key] = {
+                'mean': np.stack([stats.mean for stats in stages]),
+                'rate': np.stack([stats.rate for stats in stages]),
+                'stability': np.stack([np.sqrt(np.maximum(stats.variance, 0)) for stats in stages]),
+            }
+        summary['total_power'] = self.rows['spectrum'][..., 2]
+        return summary
+
+    def to_npz(self):
+        arrays = {'names': np.array(self.names), 'edges': self.edges}
+        for key in FEATURE_KEYS:
+            arrays[key] = self.rows[key]
+            for stage, stats in zip(features.STAGES, self.stages[key]):
+                arrays.update(stats.to_arrays(f'{key}_{stage}'))
+        buffer = io.BytesIO()
+        np.savez(buffer, **arrays)
+        return buffer.getvalue()
+
+    def load_npz(self, path):
+        with np.load(path) as data:
+            self.names = data['names'].tolist()
+            self.edges = data['edges']
+            for key in FEATURE_KEYS:
+                self.rows[key] = data[key]
+                self.stages[key] = [RunningStats.from_arrays(data, f'{key}_{stage}') for stage in features.STAGES]
+
+
+class Checkpoint:
+    def __init__(self, root):
+        self.root = root
+        self.sets = {}
+
+    @classmethod
+    def load(cls, root=None):
+        checkpoint = cls(root or checkpoint_dir())
+        try:
+            with open(os.path.join(checkpoint.root, MANIFEST_FILE)) as file:
+                manifest = json.load(file)
+        except FileNotFoundError:
+            return checkpoint
+        if manifest.get('version') != MANIFEST_VERSION:
+            return checkpoint
+
+        for set_number, entry in manifest['sets'].items():
+            state = SetCheckpoint(entry['directory'])
+            state.files = {os.path.basename(record['path']): record for record in entry['files']}
+            try:
+                state.load_npz(os.path.join(checkpoint.root, f'set{set_number}.npz'))
+            except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+                # missing or unreadable rows: the set is processed again from scratch
+                state.reset()
+            # rows written by a run that died before its manifest: start the set over
+            if set(state.names) != set(state.files):
+                state.reset()
+            checkpoint.sets[int(set_number)] = state
+        return checkpoint
+
+    def set_state(self, set_number, directory):
+        state = self.sets.get(set_number)
+        if state is None or state.directory != directory:
+            state = SetCheckpoint(directory)
+            state.dirty = True
+            self.sets[set_number] = state
+        return state
+
+    def save(self):
+        os.makedirs(self.root, exist_ok=True)
+        # feature rows first, the manifest last; load() discards rows the manifest doesn't cover
+        for set_number, state in self.sets.items():
+            if state.dirty and len(state):
+                atomic_write(os.path.join(self.root, f'set{set_number}.npz'), state.to_npz())
+
+        manifest = {'version': MANIFEST_VERSION, 'sets': {}}
+        for set_number, state in sorted(self.sets.items()):
+            if not len(state):
+                continue
+            manifest['sets'][str(set_number)] = {
+                'directory': state.directory,
+                'snapshots': len(state),
+                'stage_edges': state.edges.tolist(),
+                'files': sorted(state.files.values(), key=lambda record: record['path']),
+            }
+        atomic_write(os.path.join(self.root, MANIFEST_FILE), json.dumps(manifest, indent=2).encode())
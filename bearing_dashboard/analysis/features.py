@@ -0,0 +1,285 @@
+"""
+Feature extraction for IMS-style bearing run-to-failure snapshots.
+
+A test run is a folder of snapshot files named by their timestamp
+(e.g. ``2003.10.22.12.06.24``), each holding 20480 whitespace separated rows
+with one column per channel, sampled at 20 kHz.
+
+Per snapshot, all channels are transformed in one FFT and every band is
+isolated by masking the spectrum, giving for each (band, channel):
+RMS, Peak, Crest factor and (excess) Kurtosis of the band-limited signal plus
+the band energy, and for each channel the peak, mean and total spectral power.
+
+Across a run the snapshots are split into three equal stages (early, mid,
+late), so a run needs at least three snapshots. The early stage is the
+baseline:
+
+- ratios: stage mean / baseline mean (``mid_to_baseline``, ``late_to_baseline``)
+- rates: least-squares slope per snapshot within each stage
+- stability: standard deviation within each stage
+- changes (bearing_analysis_results.json): late vs baseline in percent
+- failure point: first snapshot from which the spectral energy stays above
+  baseline mean + 3 standard deviations, as a percentage of the run
+"""
+import hashlib
+import os
+import re
+
+import numpy as np
+
+
+SAMPLE_RATE = 20000
+
+BANDS = {
+    'low': (20, 1000),
+    'mid': (1000, 3000),
+    'high': (3000, 5000),
+}
+METRICS = ['RMS', 'Peak', 'Crest', 'Kurtosis']
+STAGES = ['early', 'mid', 'late']
+
+# failures in the IMS data set and the channels mounted on the failed bearing
+FAILURES = [
+    {'label': 'Inner Race', 'set': 1, 'bearing': 3, 'channels': [5, 6]},
+    {'label': 'Roller', 'set': 1, 'bearing': 4, 'channels': [7, 8]},
+    {'label': 'Outer Race Set2', 'set': 2, 'bearing': 1, 'channels': [1]},
+    {'label': 'Outer Race Set3', 'set': 3, 'bearing': 3, 'channels': [3]},
+]
+
+FAILURE_SIGMA = 3
+FAILURE_PERSISTENCE = 5
+
+
+def list_snapshots(directory):
+    # IMS file names are zero padded timestamps, so name order is time order
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if not name.startswith('.') and os.path.isfile(os.path.join(directory, name))
+    )
+
+
+def read_snapshot(path):
+    """(samples, channels) float64 array of one snapshot file."""
+    with open(path, 'rb') as file:
+        return parse_snapshot(file.read())
+
+
+def parse_snapshot(text):
+    first_line = text[:text.index(b'\n')] if b'\n' in text else text
+    columns = len(first_line.split())
+    return np.array(text.split(), dtype=np.float64).reshape(-1, columns)
+
+
+def band_masks(samples, sample_rate=SAMPLE_RATE):
+    freqs = np.fft.rfftfreq(samples, d=1 / sample_rate)
+    return np.stack([(freqs >= lo) & (freqs < hi) for lo, hi in BANDS.values()])
+
+
+def snapshot_features(data, sample_rate=SAMPLE_RATE):
+    """
+    Features of one snapshot as fixed-shape arrays:
+
+    ``band_metrics`` (bands, channels, metrics), ``band_energy`` (bands, channels)
+    and ``spectrum`` (channels, 3) holding peak magnitude, mean and total power.
+    """
+    signals = np.asarray(data, dtype=np.float64).T
+    samples = signals.shape[1]
+    spectrum = np.fft.rfft(signals, axis=-1)
+    power = np.abs(spectrum) ** 2
+    masks = band_masks(samples, sample_rate)
+
+    # every band of every channel in one inverse FFT
+    banded = np.fft.irfft(spectrum[None, :, :] * masks[:, None, :], n=samples, axis=-1)
+    rms = np.sqrt(np.mean(banded ** 2, axis=-1))
+    peak = np.max(np.abs(banded), axis=-1)
+    centered = banded - banded.mean(axis=-1, keepdims=True)
+    variance = np.mean(centered ** 2, axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        crest = np.where(rms > 0, peak / rms, 0.0)
+        kurtosis = np.where(variance > 0, np.mean(centered ** 4, axis=-1) / variance ** 2 - 3, 0.0)
+
+    return {
+        'band_metrics': np.stack([rms, peak, crest, kurtosis], axis=-1),
+        'band_energy': np.einsum('bf,cf->bc', masks.astype(np.float64), power),
+        'spectrum': np.stack([np.sqrt(power.max(axis=-1)), power.mean(axis=-1), power.sum(axis=-1)], axis=-1),
+    }
+
+
+def process_snapshot(path):
+    # process pool entry point: returns plain arrays so results pickle cheaply
+    with open(path, 'rb') as file:
+        text = file.read()
+    return os.path.basename(path), hashlib.sha256(text).hexdigest(), snapshot_features(parse_snapshot(text))
+
+
+def stack_features(results):
+    """Stack ``process_snapshot`` results into names, digests and (snapshots, ...) arrays."""
+    results = list(results)
+    names = [name for name, _, _ in results]
+    digests = [digest for _, digest, _ in results]
+    stacked = {key: np.stack([features[key] for _, _, features in results]) for key in results[0][2]}
+    return names, digests, stacked
+
+
+def stage_edges(count):
+    """First snapshot of every stage and the snapshot count, e.g. [0, 4, 8, 12]."""
+    return np.linspace(0, count, len(STAGES) + 1).astype(int)
+
+
+def check_run_length(count):
+    """Raises ValueError for a run too short to give every stage a snapshot."""
+    if count < len(STAGES):
+        raise ValueError(f'{count} snapshots are too few for the {len(STAGES)} stages of a run; at least {len(STAGES)} are needed')
+
+
+def stage_slices(count):
+    check_run_length(count)
+    edges = stage_edges(count)
+    return [slice(edges[i], edges[i + 1]) for i in range(len(STAGES))]
+
+
+def slope(values):
+    """Least-squares slope along axis 0, per snapshot."""
+    n = values.shape[0]
+    if n < 2:
+        return np.zeros(values.shape[1:])
+    x = np.arange(n, dtype=np.float64) - (n - 1) / 2
+    x = x.reshape((n,) + (1,) * (values.ndim - 1))
+    return np.sum(x * (values - values.mean(axis=0)), axis=0) / np.sum(x ** 2)
+
+
+def stage_statistics(series):
+    """Stage means, slopes and standard deviations of a (snapshots, ...) array."""
+    stages = stage_slices(series.shape[0])
+    return {
+        'mean': np.stack([series[s].mean(axis=0) for s in stages]),
+        'rate': np.stack([slope(series[s]) for s in stages]),
+        'stability': np.stack([series[s].std(axis=0) for s in stages]),
+    }
+
+
+def summarize(stacked):
+    """
+    What the artifacts are built from: the stage statistics of every feature
+    array and the (snapshots, channels) total spectral power series.
+    """
+    summary = {key: stage_statistics(stacked[key]) for key in ['band_metrics', 'band_energy', 'spectrum']}
+    summary['total_power'] = stacked['spectrum'][..., 2]
+    return summary
+
+
+def _ratio(numerator, denominator):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator != 0, numerator / denominator, 0.0)
+
+
+def _percent_change(late, baseline):
+    return _ratio(late - baseline, baseline) * 100
+
+
+def failure_point(health, sigma=FAILURE_SIGMA, persistence=FAILURE_PERSISTENCE):
+    """Percentage of the run at which ``health`` leaves the baseline band for good."""
+    count = len(health)
+    baseline = health[stage_slices(count)[0]]
+    above = health > baseline.mean() + sigma * baseline.std()
+    # a point counts once it starts a run of `persistence` exceedances
+    window = min(persistence, count)
+    runs = np.convolve(above.astype(int), np.ones(window, dtype=int), mode='valid') == window
+    hits = np.flatnonzero(runs)
+    index = hits[0] if len(hits) else count - 1
+    return float(index / max(count - 1, 1) * 100)
+
+
+def degradation_features(summary, channels):
+    """degradation_features.json entries for the given (0-based column, channel number) pairs."""
+    stats = summary['band_metrics']
+    ratios = _ratio(stats['mean'], stats['mean'][0])
+
+    result = {}
+    for column, channel in channels:
+        bands = {}
+        for b, band in enumerate(BANDS):
+            metrics = {}
+            for m, metric in enumerate(METRICS):
+                metrics[metric] = {
+                    'ratios': {
+                        'mid_to_baseline': float(ratios[1, b, column, m]),
+                        'late_to_baseline': float(ratios[2, b, column, m]),
+                    },
+                    'rates': {stage: float(stats['rate'][i, b, column, m]) for i, stage in enumerate(STAGES)},
+                    'stability': {stage: float(stats['stability'][i, b, column, m]) for i, stage in enumerate(STAGES)},
+                }
+            bands[band] = metrics
+        result[f'Ch{channel}'] = bands
+    return result
+
+
+def bearing_analysis(summary, channels):
+    """bearing_analysis_results.json entry of one bearing."""
+    energy = summary['band_energy']['mean']
+    spectrum = summary['spectrum']['mean']
+    band_change = _percent_change(energy[2], energy[0])
+    spectrum_change = _percent_change(spectrum[2], spectrum[0])
+
+    columns = [column for column, _ in channels]
+    health = summary['total_power'][:, columns].sum(axis=1)
+
+    result = {'failure_point_percentage': failure_point(health), 'channels': {}}
+    for column, channel in channels:
+        result['channels'][f'channel {channel}'] = {
+            'changes': {
+                'magnitude': {
+                    'peak': float(spectrum_change[column, 0]),
+                    'mean': float(spectrum_change[column, 1]),
+                    'total_energy': float(spectrum_change[column, 2]),
+                },
+                'frequency_bands': {
+                    f'{band}_band_change': float(band_change[b, column]) for b, band in enumerate(BANDS)
+                },
+            }
+        }
+    return result
+
+
+def build_artifacts(summaries_by_set, failures=FAILURES):
+    """
+    degradation_features and bearing_analysis_results for every configured
+    failure whose set has been processed. ``summaries_by_set`` maps set
+    numbers to ``summarize`` results or their incremental equivalent
+    (feature_checkpoint.SetCheckpoint.summary).
+    """
+    degradation = {}
+    analysis = {}
+    for failure in failures:
+        summary = summaries_by_set.get(failure['set'])
+        if summary is None:
+            continue
+        channels = [(channel - 1, channel) for channel in failure['channels']]
+        degradation[failure['label']] = degradation_features(summary, channels)
+        analysis.setdefault(f'set {failure["set"]}', {})[f'bearing {failure["bearing"]}'] = bearing_analysis(summary, channels)
+    return degradation, analysis
+
+
+def merge_artifacts(previous, built, sets, failures=FAILURES):
+    """
+    ``built`` artifacts (build_artifacts over ``sets``) laid over the
+    ``previous`` ones, so a run over some sets keeps the entries of the
+    others. Both are (degradation_features, bearing_analysis_results) pairs.
+    """
+    (old_degradation, old_analysis), (degradation, analysis) = previous, built
+    set_of = {failure['label']: failure['set'] for failure in failures}
+
+    def set_number(name):
+        # "set 2" -> 2; names without a number sort last
+        digits = re.search(r'\d+$', name)
+        return int(digits.group()) if digits else float('inf')
+
+    merged = {label: values for label, values in old_degradation.items() if set_of.get(label) not in sets}
+    merged.update(degradation)
+    order = [failure['label'] for failure in failures]
+    degradation = dict(sorted(merged.items(), key=lambda item: order.index(item[0]) if item[0] in order else len(order)))
+
+    merged = {name: bearings for name, bearings in old_analysis.items() if set_number(name) not in sets}
+    merged.update(analysis)
+    analysis = dict(sorted(merged.items(), key=lambda item: set_number(item[0])))
+    return degradation, analysis
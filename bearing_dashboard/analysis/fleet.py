@@ -0,0 +1,148 @@
+"""
+Paginated listing of every bearing in the fleet, from the Bearing rows that
+``load_analysis_results`` writes (see analysis/loading.py).
+
+Filters and sort keys are plain columns of the bearing table, precomputed
+at load time, and each sort order has an index ending in the primary key
+(models.Bearing.Meta.indexes). A page is therefore an index walk with a
+LIMIT, and its cost doesn't grow with the fleet beyond the offset and the
+total count. Set numbers are looked up for the rows of the page only, as
+joining the set table would cost a lookup per counted or skipped row.
+"""
+import numpy as np
+from django.core.paginator import EmptyPage, Paginator
+from django.db.models import F
+
+from . import models
+
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+HEALTH = [value for value, _ in models.HEALTH_CHOICES]
+# sort parameter: column, prefixed with '-' for descending
+SORTS = {
+    'failure_point': 'failure_point_percentage',
+    'predicted_hours': 'predicted_hours',
+}
+DEFAULT_SORT = '-failure_point'
+FIELDS = ['set_id', 'number', 'failure_label', 'failure_point_percentage', 'health', 'predicted_hours', 'accuracy']
+
+
+def parse_query(params):
+    """
+    Filters, sort and page of a GET query (a QueryDict or dict); raises
+    ValueError with a message for the client on a bad parameter.
+    """
+    query = {'set': None, 'failure': params.get('failure') or None, 'health': None, 'min_accuracy': None, 'max_accuracy': None}
+    try:
+        if params.get('set'):
+            query['set'] = int(params['set'])
+        for name in ['min_accuracy', 'max_accuracy']:
+            if params.get(name):
+                query[name] = float(params[name])
+        query['page'] = int(params.get('page') or 1)
+        query['size'] = int(params.get('size') or PAGE_SIZE)
+    except ValueError:
+        raise ValueError('set, page and size must be integers, min_accuracy and max_accuracy numbers')
+    if params.get('health'):
+        if params['health'] not in HEALTH:
+            raise ValueError(f'health must be one of {", ".join(HEALTH)}')
+        query['health'] = params['health']
+    query['sort'] = params.get('sort') or DEFAULT_SORT
+    if query['sort'].lstrip('-') not in SORTS:
+        raise ValueError(f'sort must be one of {", ".join(SORTS)}, prefixed with - for descending')
+    if not 1 <= query['size'] <= MAX_PAGE_SIZE:
+        raise ValueError(f'size must be between 1 and {MAX_PAGE_SIZE}')
+    if query['page'] < 1:
+        raise ValueError('page must be at least 1')
+    return query
+
+
+def bearings(set_number=None, failure=None, health=None, min_accuracy=None, max_accuracy=None, sort=DEFAULT_SORT):
+    """Bearing rows matching the filters, as dicts of FIELDS, in ``sort`` order."""
+    rows = models.Bearing.objects.all()
+    if set_number is not None:
+        rows = rows.filter(set__in=models.Set.objects.filter(number=set_number))
+    if failure is not None:
+        rows = rows.filter(failure_label=failure)
+    if health is not None:
+        rows = rows.filter(health=health)
+    if min_accuracy is not None:
+        rows = rows.filter(accuracy__gte=min_accuracy)
+    if max_accuracy is not None:
+        rows = rows.filter(accuracy__lte=max_accuracy)
+
+    column = F(SORTS[sort.lstrip('-')])
+    # bearings without the value go last either way
+    if sort.startswith('-'):
+        order = [column.desc(nulls_last=True), F('id').desc()]
+    else:
+        order = [column.asc(nulls_last=True), F('id').asc()]
+    return rows.order_by(*order).values(*FIELDS)
+
+
+def page(query):
+    """One page of the listing for a ``parse_query`` result."""
+    filters = {name: query[name] for name in ['set', 'failure', 'health', 'min_accuracy', 'max_accuracy', 'sort']}
+    rows = bearings(query['set'], query['failure'], query['health'], query['min_accuracy'], query['max_accuracy'], query['sort'])
+    paginator = Paginator(rows, query['size'])
+    try:
+        current = paginator.page(query['page'])
+    except EmptyPage:
+        # past the end: an empty page that still reports the totals
+        rows, has_next = [], False
+    else:
+        rows, has_next = list(current.object_list), current.has_next()
+    set_numbers = dict(models.Set.objects.filter(id__in={row['set_id'] for row in rows}).values_list('id', 'number'))
+    return {
+        'bearings': [
+            {
+                'set': set_numbers[row['set_id']],
+                'bearing': row['number'],
+                'failure': row['failure_label'],
+                'failure_point_percentage': row['failure_point_percentage'],
+                'health': row['health'],
+                'predicted_hours': row['predicted_hours'],
+                'accuracy': row['accuracy'],
+            }
+            for row in rows
+        ],
+        'page': query['page'],
+        'size': query['size'],
+        'pages': paginator.num_pages,
+        'count': paginator.count,
+        'has_next': has_next,
+        'has_previous': query['page'] > 1,
+        'filters': filters,
+    }
+
+
+def failure_labels():
+    return list(models.Bearing.objects.exclude(failure_label='').order_by('failure_label').values_list('failure_label', flat=True).distinct())
+
+
+def synthetic_fleet(count, seed=0):
+    """Replace the stored fleet with ``count`` random bearings, for benchmarks."""
+    rng = np.random.default_rng(seed)
+    labels = ['', 'Inner Race', 'Outer Race', 'Roller']
+    label_index = rng.integers(len(labels), size=count).tolist()
+    health_index = rng.integers(len(HEALTH), size=count).tolist()
+    failure_points = rng.uniform(0, 100, count).tolist()
+    predicted_hours = rng.uniform(0, 1000, count).tolist()
+    accuracy = rng.uniform(40, 100, count).tolist()
+    models.Bearing.objects.all().delete()
+    models.Set.objects.all().delete()
+    sets = models.Set.objects.bulk_create([models.Set(number=number) for number in range(1, count // 4 + 2)])
+    models.Bearing.objects.bulk_create([
+        models.Bearing(
+            set=sets[i // 4],
+            number=i % 4 + 1,
+            failure_label=labels[label_index[i]],
+            failure_point_percentage=failure_points[i],
+            health=HEALTH[health_index[i]],
+            predicted_hours=predicted_hours[i],
+            accuracy=accuracy[i],
+        )
+        for i in range(count)
+    ], batch_size=2000)
+    return count
@@ -0,0 +1,99 @@
+"""
+Liveness and readiness for the load balancer's health checks.
+
+``/healthz`` answers as soon as the process can run a view and does no I/O.
+``/readyz`` answers 200 once ``warm_up`` has run in this process and the
+artifacts are still held in memory, which it checks without touching disk.
+
+``warm_up`` loads everything with preload.preload() and renders the
+dashboard once, so the page cache holds the current render and the first
+real request is a cache hit. Under gunicorn it runs in the master before
+the workers are forked, and again in each worker before it accepts
+connections, where the master's work leaves only a cache hit to do (see
+gunicorn.conf.py). Under other servers, or when that warm-up failed, the
+first ``/readyz`` probe starts it in a background thread and reports not
+ready, with the last error, until it has succeeded.
+"""
+import threading
+import time
+
+from django.http import HttpRequest
+
+from . import preload, repository
+
+
+_lock = threading.Lock()
+_state = {'ready': False, 'thread': None, 'warm_up': None, 'error': None}
+
+
+def _dashboard_request():
+    # a bare GET of /, as the first visitor sends it
+    request = HttpRequest()
+    request.method = 'GET'
+    request.path = request.path_info = '/'
+    return request
+
+
+def warm_up():
+    """
+    Load the dashboard data and render the page into the cache; returns what
+    was loaded. A failure is kept for /readyz and raised.
+    """
+    from . import views
+
+    started = time.perf_counter()
+    try:
+        loaded = preload.preload()
+        response = views.dashboard(_dashboard_request())
+        if response.status_code != 200:
+            raise RuntimeError(f'The dashboard answered {response.status_code} while warming up')
+    except Exception as e:
+        with _lock:
+            _state['error'] = f'{type(e).__name__}: {e}'
+        raise
+    loaded['dashboard_bytes'] = len(response.content)
+    loaded['seconds'] = round(time.perf_counter() - started, 3)
+    with _lock:
+        _state.update(ready=True, warm_up=loaded, error=None)
+    return loaded
+
+
+def _warm_up_in_background():
+    try:
+        warm_up()
+    except Exception:
+        # kept in _state for /readyz
+        pass
+    finally:
+        with _lock:
+            _state['thread'] = None
+
+
+def start_warm_up():
+    """Run ``warm_up`` in a background thread unless one is running; returns the thread."""
+    with _lock:
+        if _state['thread'] is None:
+            _state['thread'] = threading.Thread(target=_warm_up_in_background, name='warm-up', daemon=True)
+            _state['thread'].start()
+        return _state['thread']
+
+
+def is_ready():
+    # artifact versions are set once the content is held in memory and cleared with it
+    return _state['ready'] and all(artifact.version is not None for artifact in repository.ARTIFACTS.values())
+
+
+def readiness():
+    """(ready, details); starts a warm-up when the process isn't ready."""
+    if is_ready():
+        return True, {'status': 'ready'}
+    start_warm_up()
+    details = {'status': 'warming up'}
+    if _state['error'] is not None:
+        details['error'] = _state['error']
+    return False, details
+
+
+def reset():
+    with _lock:
+        _state.update(ready=False, warm_up=None, error=None)
@@ -0,0 +1,144 @@
+"""
+Per-snapshot feature history of every channel over the whole run.
+
+``build_features --history`` writes one FeatureSample row per (set, bearing,
+channel, feature, snapshot time). FEATURES lists the features, whose index
+is what gets stored:
+
+- the RMS, peak, crest factor and kurtosis of every band
+- the energy of every band
+- the spectrum peak magnitude, mean power and total power
+
+Rows are upserted with ``executemany`` in large batches inside one
+transaction. A range query groups the samples into at most ``buckets``
+equal time intervals in SQL, returning min, max and mean per interval, so
+a chart over a months-long run gets a few hundred points however many
+snapshots it covers.
+"""
+import calendar
+import math
+import time
+from itertools import repeat
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import Avg, Count, F, Max, Min
+
+from . import features, models, signals
+
+
+FEATURES = [
+    *(f'{band}_{metric.lower()}' for band in features.BANDS for metric in features.METRICS),
+    *(f'{band}_energy' for band in features.BANDS),
+    'peak_magnitude', 'mean_power', 'total_power',
+]
+
+# IMS snapshot file names, e.g. 2003.10.22.12.06.24
+TIME_FORMAT = '%Y.%m.%d.%H.%M.%S'
+BATCH_SIZE = 5000
+DEFAULT_BUCKETS = 300
+MAX_BUCKETS = 5000
+
+
+def snapshot_time(name):
+    """Epoch seconds (UTC) of a snapshot file name."""
+    return calendar.timegm(time.strptime(name, TIME_FORMAT))
+
+
+def feature_matrix(stacked):
+    """(snapshots, channels, features) array of stacked ``snapshot_features`` in FEATURES order."""
+    band_metrics = stacked['band_metrics']
+    snapshots, bands, channels, metrics = band_metrics.shape
+    return np.concatenate([
+        band_metrics.transpose(0, 2, 1, 3).reshape(snapshots, channels, bands * metrics),
+        stacked['band_energy'].transpose(0, 2, 1),
+        stacked['spectrum'],
+    ], axis=2)
+
+
+def history_rows(set_number, names, stacked):
+    """
+    (set, bearing, channel, feature, timestamp, value) tuples for the given
+    snapshots. Raises LookupError for a channel signals.CHANNEL_MAP doesn't
+    assign to a bearing.
+    """
+    values = feature_matrix(stacked)
+    snapshots, channels, count = values.shape
+    bearing_of = {channel: bearing for bearing, numbers in signals.CHANNEL_MAP.get(set_number, {}).items() for channel in numbers}
+    channel_numbers = np.arange(1, channels + 1)
+    unmapped = [str(channel) for channel in channel_numbers if channel not in bearing_of]
+    if unmapped:
+        raise LookupError(f'No bearing is mapped to channel {", ".join(unmapped)} of set {set_number}')
+    bearing_numbers = np.array([bearing_of[channel] for channel in channel_numbers])
+    times = np.array([snapshot_time(name) for name in names], dtype=np.int64)
+
+    shape = values.shape
+    return list(zip(
+        repeat(set_number),
+        np.broadcast_to(bearing_numbers[None, :, None], shape).ravel().tolist(),
+        np.broadcast_to(channel_numbers[None, :, None], shape).ravel().tolist(),
+        np.broadcast_to(np.arange(count)[None, None, :], shape).ravel().tolist(),
+        np.broadcast_to(times[:, None, None], shape).ravel().tolist(),
+        values.ravel().tolist(),
+    ))
+
+
+def ingest(rows, batch_size=BATCH_SIZE):
+    """Insert or update samples; returns the number of rows written."""
+    quote = connection.ops.quote_name
+    columns = ['set_number', 'bearing', 'channel', 'feature', 'timestamp', 'value']
+    sql = (
+        f'INSERT INTO {quote(models.FeatureSample._meta.db_table)} ({", ".join(map(quote, columns))}) '
+        f'VALUES ({", ".join(["%s"] * len(columns))}) '
+        f'ON CONFLICT ({", ".join(map(quote, columns[:-1]))}) DO UPDATE SET {quote("value")} = excluded.{quote("value")}'
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        for offset in range(0, len(rows), batch_size):
+            cursor.executemany(sql, rows[offset:offset + batch_size])
+    return len(rows)
+
+
+def series(set_number, bearing, channel, feature, start=None, end=None, buckets=DEFAULT_BUCKETS):
+    """
+    Samples of one feature between ``start`` and ``end`` (epoch seconds, both
+    optional) grouped into at most ``buckets`` intervals of equal width.
+    """
+    if feature not in FEATURES:
+        raise LookupError(f'Unknown feature {feature!r}')
+    samples = models.FeatureSample.objects.filter(
+        set_number=set_number, bearing=bearing, channel=channel, feature=FEATURES.index(feature),
+    )
+    if start is not None:
+        samples = samples.filter(timestamp__gte=start)
+    if end is not None:
+        samples = samples.filter(timestamp__lte=end)
+
+    bounds = samples.aggregate(first=Min('timestamp'), last=Max('timestamp'))
+    if bounds['first'] is None:
+        return {'feature': feature, 'width': None, 'buckets': []}
+    low = start if start is not None else bounds['first']
+    high = end if end is not None else bounds['last']
+    width = max(1, math.ceil((high - low + 1) / buckets))
+
+    rows = (
+        samples.annotate(bucket=(F('timestamp') - low) / width)
+        .values('bucket')
+        .annotate(first=Min('timestamp'), last=Max('timestamp'), min=Min('value'), max=Max('value'), mean=Avg('value'), count=Count('id'))
+        .order_by('bucket')
+    )
+    return {
+        'feature': feature,
+        'width': width,
+        'buckets': [
+            {
+                'start': low + row['bucket'] * width,
+                'first': row['first'],
+                'last': row['last'],
+                'min': row['min'],
+                'max': row['max'],
+                'mean': row['mean'],
+                'count': row['count'],
+            }
+            for row in rows
+        ],
+    }
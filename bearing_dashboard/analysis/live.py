@@ -0,0 +1,182 @@
+"""
+Live dashboard updates pushed over Server-Sent Events.
+
+The live state is a flat ``{key: value}`` view of what operators watch:
+prediction accuracies, alert states (accuracy thresholds and the rules in
+alerts.py) and frequency band changes. One watcher task per event loop polls
+the cached artifacts (a stat call each, see repository.py) and pushes only
+the keys that changed to every subscriber queue. Connected clients are
+coroutines waiting on their queue, so hundreds of idle streams cost no
+threads when served through ASGI.
+"""
+import asyncio
+import json
+import weakref
+
+from asgiref.sync import sync_to_async
+
+from . import alerts, repository
+
+
+POLL_INTERVAL = 2.0
+HEARTBEAT_INTERVAL = 15.0
+QUEUE_SIZE = 16
+
+# reconnect delay sent to clients; without ASGI it makes EventSource poll
+RETRY_MS = 5000
+WSGI_RETRY_MS = 30000
+
+
+def accuracy_state(value):
+    # same thresholds as the accuracy cells in dashboard.html
+    if value < 60:
+        return 'low-accuracy'
+    if value > 90:
+        return 'high-accuracy'
+    return 'normal'
+
+
+def live_state():
+    """Flat snapshot of the values the dashboard updates in place."""
+    state = {}
+
+    try:
+        predictions = repository.get_artifact('prediction_analysis')
+    except Exception:
+        predictions = None
+    if predictions is not None:
+        state['accuracy/average'] = predictions.average_accuracy
+        state['accuracy/average_error_days'] = predictions.average_error_days
+        for bearing in predictions.bearings:
+            state[f'accuracy/{bearing.label}'] = bearing.average_accuracy
+            for stage in bearing.timeline:
+                state[f'accuracy/{bearing.label}/{stage.life_stage}'] = stage.accuracy_percentage
+                state[f'alerts/{bearing.label}/{stage.life_stage}'] = accuracy_state(stage.accuracy_percentage)
+
+    try:
+        bearing_analysis = repository.get_artifact('bearing_analysis_results')
+    except Exception:
+        bearing_analysis = None
+    for bearing in bearing_analysis.bearings if bearing_analysis is not None else []:
+        for channel in bearing.channels:
+            for band, value in channel.band_changes().items():
+                state[f'bands/{bearing.set_name}/{bearing.name}/{channel.name}/{band}'] = value
+
+    # rule alerts show up as new keys when they fire and as None when they clear
+    try:
+        fired = alerts.current_alerts()
+    except Exception:
+        fired = []
+    for alert in fired:
+        parts = [alert['rule'], f'set {alert["set"]}', f'bearing {alert["bearing"]}', f'channel {alert["channel"]}']
+        parts += [alert[axis] for axis in alerts.AXIS_ORDER if axis in alert]
+        state['rules/' + '/'.join(parts)] = alert['level']
+
+    return state
+
+
+def diff(old, new):
+    """Keys whose value changed; removed keys map to None."""
+    changed = {key: value for key, value in new.items() if old.get(key) != value}
+    changed.update({key: None for key in old if key not in new})
+    return changed
+
+
+class Broadcaster:
+    """Polls ``state_func`` while anyone listens and fans out the deltas."""
+
+    def __init__(self, state_func=live_state, interval=POLL_INTERVAL):
+        self.state_func = state_func
+        self.interval = interval
+        self.state = None
+        self.version = 0
+        self._subscribers = set()
+        self._task = None
+
+    async def current(self):
+        if self.state is None:
+            self.state = await sync_to_async(self.state_func, thread_sensitive=False)()
+        return self.version, self.state
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._watch())
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.discard(queue)
+        if not self._subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def publish(self, delta):
+        self.version += 1
+        for queue in list(self._subscribers):
+            if queue.full():
+                # a client that fell this far behind gets a full resync instead, and none of the
+                # deltas it hasn't read: the snapshot already includes them
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait((self.version, 'snapshot', self.state))
+            else:
+                queue.put_nowait((self.version, 'delta', delta))
+
+    async def poll(self):
+        await self.current()
+        new = await sync_to_async(self.state_func, thread_sensitive=False)()
+        delta = diff(self.state, new)
+        self.state = new
+        if delta:
+            self.publish(delta)
+        return delta
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.poll()
+
+
+_broadcasters = weakref.WeakKeyDictionary()
+
+
+def broadcaster():
+    # queues and tasks belong to one event loop, so keep one broadcaster per loop
+    loop = asyncio.get_running_loop()
+    if loop not in _broadcasters:
+        _broadcasters[loop] = Broadcaster()
+    return _broadcasters[loop]
+
+
+def format_event(event, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data, separators=(",", ":"))}')
+    return '\n'.join(lines) + '\n\n'
+
+
+async def event_stream(source, heartbeat=HEARTBEAT_INTERVAL):
+    """SSE stream: the full state first, then deltas as they happen."""
+    queue = source.subscribe()
+    try:
+        version, state = await source.current()
+        yield f'retry: {RETRY_MS}\n\n'
+        yield format_event('snapshot', state, version)
+        while True:
+            try:
+                version, event, data = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                # keeps proxies and the load balancer from closing idle streams
+                yield ': keep-alive\n\n'
+                continue
+            yield format_event(event, data, version)
+    finally:
+        source.unsubscribe(queue)
+
+
+def single_snapshot():
+    # WSGI fallback: one snapshot per connection, EventSource reconnects after the retry delay
+    return f'retry: {WSGI_RETRY_MS}\n\n' + format_event('snapshot', live_state())
@@ -0,0 +1,340 @@
+"""
+Load generator for sizing the service: requests per second one container
+sustains, and at what latency, for a given number of workers.
+
+Clients are asyncio tasks. Each sends its next request as soon as the last
+one is answered, for a fixed time or number of requests, cycling through the
+paths from its own offset so the mix stays even. The default mix is the
+dashboard, every plot section and the JSON APIs (``default_paths``).
+
+Targets:
+
+- ``http://host:port``: a running server, e.g. gunicorn.conf.py. Every
+  client keeps one HTTP/1.1 connection open with asyncio streams and
+  reconnects when the server closes it.
+- ``wsgi``: the application of bearing_dashboard/wsgi.py, called in-process
+  from a thread per client, like a threaded WSGI worker.
+- ``asgi``: the application of bearing_dashboard/asgi.py, awaited
+  in-process on the event loop. It serves whichever dashboard view the
+  settings chose when they were loaded (DASHBOARD_ASYNC).
+
+In-process targets warm up first (health.warm_up) and, for more than one
+worker, fork that many processes after it, like gunicorn's preload, each
+running its share of the clients. Their samples are merged into one report.
+
+A report has the number of requests, throughput, p50/p95/p99 latency in
+milliseconds, the error rate (exceptions and statuses of 400 and above),
+body bytes per second, the statuses seen and the same figures per path.
+"""
+import asyncio
+import contextvars
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from wsgiref.util import setup_testing_defaults
+
+import numpy as np
+
+from . import plots
+
+
+IN_PROCESS = ['wsgi', 'asgi']
+DEFAULT_DURATION = 10.0
+READ_SIZE = 64 * 1024
+
+
+def default_paths():
+    # the page, every plot fragment it loads and the JSON endpoints; not /api/live/, which streams forever under ASGI
+    paths = ['/']
+    for group in plots.PLOT_GROUPS:
+        paths += [plots.plot_url(group, name) for name in plots.list_plots(group)]
+    return paths + [
+        '/api/alerts/', '/api/fleet/', '/api/predictions/', '/api/correlation/',
+        '/api/signals/1/3/5', '/api/spectra/1', '/api/cross-channel/1/3', '/healthz',
+    ]
+
+
+class HttpConnection:
+    """One keep-alive HTTP/1.1 connection to ``host:port``, reopened when the server closes it."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def get(self, path):
+        """Status and body size of a GET of ``path``."""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        request = f'GET {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\nAccept-Encoding: identity\r\n\r\n'
+        try:
+            self.writer.write(request.encode('latin-1'))
+            await self.writer.drain()
+            status, size, keep_alive = await self._response()
+        except BaseException:
+            await self.close()
+            raise
+        if not keep_alive:
+            await self.close()
+        return status, size
+
+    async def _response(self):
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError('Connection closed by the server')
+        version, status = status_line.split()[:2]
+        status = int(status)
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip().lower()
+        keep_alive = headers.get('connection') != 'close' and version == b'HTTP/1.1'
+
+        if headers.get('transfer-encoding') == 'chunked':
+            size = 0
+            while True:
+                length = int((await self.reader.readline()).split(b';')[0], 16)
+                if length == 0:
+                    while await self.reader.readline() not in (b'\r\n', b'\n', b''):
+                        pass
+                    return status, size, keep_alive
+                size += await self._skip(length)
+                await self.reader.readexactly(2)
+        if 'content-length' in headers:
+            return status, await self._skip(int(headers['content-length'])), keep_alive
+        if status in (204, 304) or status < 200:
+            return status, 0, keep_alive
+        # delimited by the server closing the connection
+        size = 0
+        while chunk := await self.reader.read(READ_SIZE):
+            size += len(chunk)
+        return status, size, False
+
+    async def _skip(self, length):
+        # reads and drops ``length`` bytes without holding a large body
+        remaining = length
+        while remaining:
+            chunk = await self.reader.read(min(remaining, READ_SIZE))
+            if not chunk:
+                raise ConnectionError('Connection closed in the middle of a response')
+            remaining -= len(chunk)
+        return length
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+
+def call_wsgi(application, path):
+    """Status and body size of a GET of ``path`` from a WSGI application."""
+    route, _, query = path.partition('?')
+    environ = {'PATH_INFO': route, 'QUERY_STRING': query, 'REQUEST_METHOD': 'GET'}
+    setup_testing_defaults(environ)
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started['status'] = int(status.split()[0])
+
+    body = application(environ, start_response)
+    try:
+        size = sum(len(chunk) for chunk in body)
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+    return started['status'], size
+
+
+async def call_asgi(application, path):
+    """Status and body size of a GET of ``path`` from an ASGI application."""
+    route, _, query = path.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': route, 'raw_path': route.encode(), 'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', b'testserver')], 'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+    }
+    response = {'status': 0, 'size': 0}
+    done = asyncio.Event()
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # the client stays connected until the whole response is sent
+        await done.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+        elif message['type'] == 'http.response.body':
+            response['size'] += len(message.get('body', b''))
+            if not message.get('more_body', False):
+                done.set()
+
+    await application(scope, receive, send)
+    done.set()
+    return response['status'], response['size']
+
+
+def _application(target):
+    if target == 'wsgi':
+        from bearing_dashboard.wsgi import application
+    else:
+        from bearing_dashboard.asgi import application
+    return application
+
+
+async def drive(target, paths, clients, duration=None, requests=None, application=None):
+    """
+    Run ``clients`` concurrent clients against ``target`` until ``duration``
+    seconds have passed or each has sent ``requests``; returns the samples as
+    (path index, seconds, status, bytes) and the seconds taken.
+    """
+    samples = []
+    application = application if application is not None or target not in IN_PROCESS else _application(target)
+    loop = asyncio.get_running_loop()
+    pool = ThreadPoolExecutor(clients) if target == 'wsgi' else None
+    connections = []
+
+    def sender():
+        if target == 'wsgi':
+            return lambda path: loop.run_in_executor(pool, call_wsgi, application, path)
+        if target == 'asgi':
+            # each request in a fresh context, as a server starts it, not in whatever asgiref state the caller holds
+            return lambda path: loop.create_task(call_asgi(application, path), context=contextvars.Context())
+        url = urlsplit(target)
+        connection = HttpConnection(url.hostname, url.port or 80)
+        connections.append(connection)
+        return connection.get
+
+    async def client(offset, send):
+        sent = 0
+        while (requests is None or sent < requests) and (deadline is None or time.perf_counter() < deadline):
+            index = (offset + sent) % len(paths)
+            sent += 1
+            started = time.perf_counter()
+            try:
+                status, size = await send(paths[index])
+            except Exception:
+                status, size = 0, 0
+            samples.append((index, time.perf_counter() - started, status, size))
+
+    started = time.perf_counter()
+    deadline = None if duration is None else started + duration
+    try:
+        await asyncio.gather(*(client(offset * len(paths) // clients, sender()) for offset in range(clients)))
+    finally:
+        for connection in connections:
+            await connection.close()
+        if pool is not None:
+            pool.shutdown()
+    return samples, time.perf_counter() - started
+
+
+def run_workers(target, paths, clients, workers, duration=None, requests=None):
+    """
+    ``drive`` in ``workers`` forked processes, with the clients split between
+    them and started together; returns the merged samples and the seconds taken.
+    """
+    if workers == 1:
+        return asyncio.run(drive(target, paths, clients, duration, requests))
+    from django.db import connections
+
+    application = _application(target) if target in IN_PROCESS else None
+    # every process opens its own database connection, as under gunicorn
+    connections.close_all()
+    release_read, release_write = os.pipe()
+    children = []
+    for worker in range(workers):
+        share = clients // workers + (worker < clients % workers)
+        report_read, report_write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                os.close(release_write)
+                os.read(release_read, 1)
+                result = asyncio.run(drive(target, paths, max(share, 1), duration, requests, application))
+                with os.fdopen(report_write, 'wb') as report:
+                    report.write(json.dumps(result).encode())
+            except BaseException:
+                status = 1
+            finally:
+                os._exit(status)
+        os.close(report_write)
+        children.append((pid, report_read))
+
+    os.close(release_read)
+    # one byte per child starts them all at once
+    os.write(release_write, b'x' * workers)
+    os.close(release_write)
+    samples, seconds = [], 0.0
+    for pid, report_read in children:
+        with os.fdopen(report_read, 'rb') as report:
+            payload = report.read()
+        os.waitpid(pid, 0)
+        if not payload:
+            raise RuntimeError(f'Load test worker {pid} failed')
+        worker_samples, worker_seconds = json.loads(payload)
+        samples += [tuple(sample) for sample in worker_samples]
+        seconds = max(seconds, worker_seconds)
+    return samples, seconds
+
+
+def _latencies(seconds):
+    p50, p95, p99 = np.percentile(np.asarray(seconds) * 1000, [50, 95, 99])
+    return {'p50': round(float(p50), 3), 'p95': round(float(p95), 3), 'p99': round(float(p99), 3)}
+
+
+def summarize(samples, seconds, paths):
+    """Throughput, latency percentiles, error rate and bytes/s of ``drive`` samples."""
+    if not samples:
+        return {'requests': 0, 'seconds': round(seconds, 3)}
+    index, latency, status, size = (np.array(column) for column in zip(*samples))
+    errors = (status == 0) | (status >= 400)
+    summary = {
+        'requests': len(samples),
+        'seconds': round(seconds, 3),
+        'throughput': round(len(samples) / seconds, 2),
+        **_latencies(latency),
+        'error_rate': round(float(errors.mean()), 4),
+        'bytes_per_second': round(float(size.sum()) / seconds, 1),
+        'statuses': {str(code): count for code, count in sorted(Counter(status.tolist()).items())},
+        'paths': {},
+    }
+    for i, path in enumerate(paths):
+        selected = index == i
+        if selected.any():
+            summary['paths'][path] = {
+                'requests': int(selected.sum()),
+                **_latencies(latency[selected]),
+                'error_rate': round(float(errors[selected].mean()), 4),
+                'bytes': int(size[selected].sum()),
+            }
+    return summary
+
+
+def run(target, paths, clients, workers=1, duration=None, requests=None):
+    """One untimed pass over ``paths``, then the timed run; returns its summary."""
+    if duration is None and requests is None:
+        duration = DEFAULT_DURATION
+    if target in IN_PROCESS:
+        from . import health
+
+        health.warm_up()
+    asyncio.run(drive(target, paths, 1, requests=len(paths)))
+    samples, seconds = run_workers(target, paths, clients, workers, duration, requests)
+    return dict(summarize(samples, seconds, paths), target=target, workers=workers, clients=clients)
@@ -0,0 +1,156 @@
+"""
+Bulk loader from the three JSON artifacts into the models in models.py.
+
+A load replaces everything in one transaction with one bulk insert per
+table, so readers never see a half-loaded fleet. Failure labels in
+degradation_features.json are mapped to their set and bearing through
+features.FAILURES, and prediction labels through their "(Set N, Bearing M)"
+suffix. Entries that can't be placed are skipped and reported.
+
+Each bearing also gets the keys the fleet listing filters and sorts on:
+its health (the most severe alert of the default rules on any of its
+channels) and the predicted hours and accuracy of its prediction.
+"""
+import re
+
+from django.db import transaction
+
+from . import alerts, features, models, repository, results
+
+
+PREDICTION_BEARING = re.compile(r'\(Set (\d+), Bearing (\d+)\)')
+BATCH_SIZE = 2000
+
+
+@transaction.atomic
+def load_results(degradation, bearing_analysis, predictions, failures=features.FAILURES):
+    """
+    Replace the stored results with the given artifacts (the results.py
+    models); returns row counts and skipped entries.
+    """
+    for model in [models.PredictionStage, models.Prediction, models.DegradationMetric, models.BandChange,
+                  models.Channel, models.Bearing, models.Set, models.ModelPerformance]:
+        model.objects.all().delete()
+
+    failure_bearings = {failure['label']: (failure['set'], failure['bearing']) for failure in failures}
+    labels = {key: label for label, key in failure_bearings.items() if label in degradation.labels}
+    bearing_keys = {(bearing.set_number, bearing.number) for bearing in bearing_analysis.bearings} | set(labels)
+    analysed = {(bearing.set_number, bearing.number): bearing for bearing in bearing_analysis.bearings}
+
+    health = {}
+    # most severe first, so the first alert of a bearing is its health
+    for alert in alerts.default_engine.alerts(alerts.FleetTable.from_artifacts(degradation, bearing_analysis, failures)):
+        health.setdefault((alert['set'], alert['bearing']), alert['level'])
+    predicted = {}
+    for data in predictions.bearings:
+        match = PREDICTION_BEARING.search(data.label)
+        if match:
+            predicted.setdefault((int(match.group(1)), int(match.group(2))), data)
+
+    sets = {number: models.Set(number=number) for number in sorted({s for s, _ in bearing_keys})}
+    models.Set.objects.bulk_create(sets.values())
+
+    bearings = {}
+    for key in sorted(bearing_keys):
+        data = analysed.get(key)
+        prediction = predicted.get(key)
+        bearings[key] = models.Bearing(
+            set=sets[key[0]],
+            number=key[1],
+            failure_label=labels.get(key, ''),
+            failure_point_percentage=data.failure_point_percentage if data is not None else None,
+            health=health.get(key, 'healthy'),
+            predicted_hours=prediction.timeline[-1].predicted_hours if prediction is not None and prediction.timeline else None,
+            accuracy=prediction.average_accuracy if prediction is not None else None,
+        )
+    models.Bearing.objects.bulk_create(bearings.values(), batch_size=BATCH_SIZE)
+
+    channels = {}
+    band_changes = []
+    for data in bearing_analysis.bearings:
+        bearing = bearings[(data.set_number, data.number)]
+        for channel_data in data.channels:
+            channel = channels[(data.set_number, data.number, channel_data.number)] = models.Channel(
+                bearing=bearing,
+                number=channel_data.number,
+                peak_change=channel_data.peak,
+                mean_change=channel_data.mean,
+                total_energy_change=channel_data.total_energy,
+            )
+            for key, change in channel_data.band_changes().items():
+                band_changes.append(models.BandChange(channel=channel, band=key.replace('_band_change', ''), change=change))
+
+    skipped = [f'degradation_features: {label}' for label in degradation.labels if label not in failure_bearings]
+    metrics = []
+    for channel_data in degradation.channels:
+        if channel_data.label not in failure_bearings:
+            continue
+        set_number, bearing_number = failure_bearings[channel_data.label]
+        key = (set_number, bearing_number, channel_data.number)
+        if key not in channels:
+            channels[key] = models.Channel(bearing=bearings[(set_number, bearing_number)], number=key[2])
+        ratios, rates, stability = channel_data.ratios.tolist(), channel_data.rates.tolist(), channel_data.stability.tolist()
+        for b, band in enumerate(features.BANDS):
+            for m, metric in enumerate(features.METRICS):
+                for s, stage in enumerate(features.STAGES):
+                    metrics.append(models.DegradationMetric(
+                        channel=channels[key],
+                        band=band,
+                        metric=metric,
+                        stage=stage,
+                        ratio_to_baseline=1.0 if stage == 'early' else ratios[results.RATIOS.index(f'{stage}_to_baseline')][b][m],
+                        rate=rates[s][b][m],
+                        stability=stability[s][b][m],
+                    ))
+
+    models.Channel.objects.bulk_create(channels.values(), batch_size=BATCH_SIZE)
+    models.BandChange.objects.bulk_create(band_changes, batch_size=BATCH_SIZE)
+    models.DegradationMetric.objects.bulk_create(metrics, batch_size=BATCH_SIZE)
+
+    prediction_rows = []
+    stages = []
+    for data in predictions.bearings:
+        match = PREDICTION_BEARING.search(data.label)
+        bearing = bearings.get((int(match.group(1)), int(match.group(2)))) if match else None
+        if bearing is None:
+            skipped.append(f'prediction_analysis: {data.label} has no matching bearing')
+        prediction = models.Prediction(bearing=bearing, label=data.label, average_accuracy=data.average_accuracy)
+        prediction_rows.append(prediction)
+        for position, stage in enumerate(data.timeline):
+            stages.append(models.PredictionStage(
+                prediction=prediction,
+                position=position,
+                life_stage=stage.life_stage,
+                actual_hours_remaining=stage.actual_hours_remaining,
+                predicted_hours=stage.predicted_hours,
+                error_hours=stage.error_hours,
+                error_days=stage.error_days,
+                accuracy_percentage=stage.accuracy_percentage,
+            ))
+    models.Prediction.objects.bulk_create(prediction_rows, batch_size=BATCH_SIZE)
+    models.PredictionStage.objects.bulk_create(stages, batch_size=BATCH_SIZE)
+
+    models.ModelPerformance.objects.create(
+        average_accuracy=predictions.average_accuracy,
+        average_error_days=predictions.average_error_days,
+    )
+
+    return {
+        'sets': len(sets),
+        'bearings': len(bearings),
+        'channels': len(channels),
+        'band_changes': len(band_changes),
+        'degradation_metrics': len(metrics),
+        'predictions': len(prediction_rows),
+        'prediction_stages': len(stages),
+        'skipped': skipped,
+    }
+
+
+def load_artifacts():
+    """Load the artifacts the dashboard currently serves."""
+    return load_results(
+        repository.get_artifact('degradation_features'),
+        repository.get_artifact('bearing_analysis_results'),
+        repository.get_artifact('prediction_analysis'),
+    )
@@ -0,0 +1,37 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from analysis import alerts
+
+
+class Command(BaseCommand):
+    help = 'Time the alert rules over a synthetic fleet of bearings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bearings', type=int, action='append', dest='fleets', help='fleet size, may be repeated (default 4 and 10000)')
+        parser.add_argument('--channels', type=int, default=2, help='channels per bearing')
+        parser.add_argument('--repeat', type=int, default=20, help='evaluations per fleet size')
+
+    def handle(self, *args, **options):
+        engine = alerts.default_engine
+        repeat = max(1, options['repeat'])
+
+        for bearings in options['fleets'] or [4, 10000]:
+            table = alerts.synthetic_table(bearings, options['channels'])
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                counts = engine.counts(table)
+                timings.append((time.perf_counter() - started) * 1000)
+
+            started = time.perf_counter()
+            fired = engine.alerts(table)
+            listing = (time.perf_counter() - started) * 1000
+
+            self.stdout.write(
+                f'{bearings} bearings ({len(table)} channels, {len(engine.rules)} rules): '
+                f'evaluate median {statistics.median(timings):.2f} ms, max {max(timings):.2f} ms; '
+                f'{sum(counts.values())} alerts listed in {listing:.2f} ms'
+            )
@@ -0,0 +1,90 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import AsyncRequestFactory, RequestFactory
+
+from analysis import views
+
+
+def run_threads(clients, requests, uncached):
+    # a threaded WSGI worker: one thread per concurrent client, each calling the sync view
+    factory = RequestFactory()
+
+    def client():
+        latencies = []
+        for _ in range(requests):
+            if uncached:
+                cache.clear()
+            started = time.perf_counter()
+            response = views.dashboard(factory.get('/'))
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.status_code
+        return latencies
+
+    with ThreadPoolExecutor(clients) as pool:
+        futures = [pool.submit(client) for _ in range(clients)]
+        return [latency for future in futures for latency in future.result()]
+
+
+def run_tasks(clients, requests, uncached, view):
+    # an ASGI worker: one task per concurrent client on a single event loop
+    factory = AsyncRequestFactory()
+
+    async def client():
+        latencies = []
+        for _ in range(requests):
+            if uncached:
+                cache.clear()
+            started = time.perf_counter()
+            response = await view(factory.get('/'))
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.status_code
+        return latencies
+
+    async def main():
+        return await asyncio.gather(*(client() for _ in range(clients)))
+
+    return [latency for latencies in asyncio.run(main()) for latency in latencies]
+
+
+MODES = {
+    'sync view, threads': lambda clients, requests, uncached: run_threads(clients, requests, uncached),
+    # how Django runs a sync view under ASGI: all of them on one shared thread
+    'sync view, ASGI': lambda clients, requests, uncached: run_tasks(clients, requests, uncached, sync_to_async(views.dashboard)),
+    'async view, ASGI': lambda clients, requests, uncached: run_tasks(clients, requests, uncached, views.dashboard_async),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare dashboard throughput under concurrent clients: the sync view in threads (WSGI), '
+        'the sync view under ASGI, and the async view under ASGI'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, action='append', dest='client_counts', help='concurrent clients, may be repeated (default 1, 8 and 32)')
+        parser.add_argument('--requests', type=int, default=20, help='requests per client')
+        parser.add_argument('--uncached', action='store_true', help='clear the page cache before every request, so each one renders')
+
+    def handle(self, *args, **options):
+        requests = max(1, options['requests'])
+        uncached = options['uncached']
+        # load the artifacts and warm the page cache outside the timings
+        views.dashboard(RequestFactory().get('/'))
+
+        for clients in options['client_counts'] or [1, 8, 32]:
+            self.stdout.write(f'{clients} clients x {requests} requests{" (uncached)" if uncached else ""}:')
+            for mode, run in MODES.items():
+                started = time.perf_counter()
+                latencies = sorted(run(clients, requests, uncached))
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f'  {mode:<20} {len(latencies) / elapsed:8.0f} req/s  '
+                    f'p50 {statistics.median(latencies) * 1000:7.2f} ms  '
+                    f'p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:7.2f} ms'
+                )
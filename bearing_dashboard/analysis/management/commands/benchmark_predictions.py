@@ -0,0 +1,40 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from analysis import rul
+
+
+class Command(BaseCommand):
+    help = 'Time scoring the remaining useful life of a synthetic fleet in one call, with and without the memo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bearings', type=int, action='append', dest='fleets', help='fleet size, may be repeated (default 1000 and 100000)')
+        parser.add_argument('--repeat', type=int, default=5, help='calls per fleet size')
+
+    def handle(self, *args, **options):
+        model = rul.current()[0]
+        repeat = max(1, options['repeat'])
+        validation = rul.current_predictions()['validation']
+        self.stdout.write(
+            f'Leave-one-bearing-out accuracy {validation["average_accuracy"]:.1f}% '
+            f'(shipped predictions {validation["shipped_average_accuracy"]:.1f}%)'
+        )
+
+        for bearings in options['fleets'] or [1000, 100000]:
+            inputs, elapsed = rul.synthetic_inputs(bearings)
+            predictions = inputs.shape[0] * inputs.shape[1]
+            timings = {'scored': [], 'memoized': []}
+            for _ in range(repeat):
+                rul.memo.clear()
+                for kind in timings:
+                    started = time.perf_counter()
+                    rul.predict(model, inputs, elapsed)
+                    timings[kind].append(time.perf_counter() - started)
+            scored = statistics.median(timings['scored'])
+            memoized = statistics.median(timings['memoized'])
+            self.stdout.write(
+                f'{bearings} bearings ({predictions} predictions): scored in {scored * 1000:.2f} ms '
+                f'({predictions / scored:,.0f} predictions/s), memoized {memoized * 1000:.2f} ms'
+            )
@@ -0,0 +1,135 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analysis import features, history
+from analysis.feature_checkpoint import Checkpoint
+from analysis.repository import DATA_DIR, atomic_write
+
+
+def parse_set(value):
+    # "1=/data/1st_test"
+    set_number, sep, directory = value.partition('=')
+    if not sep or not set_number.isdigit():
+        raise ValueError(f'Expected SET=DIRECTORY, got {value!r}')
+    return int(set_number), os.path.abspath(directory)
+
+
+class Command(BaseCommand):
+    help = 'Compute degradation_features.json and bearing_analysis_results.json from IMS snapshot files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--set', action='append', dest='sets', default=[], metavar='SET=DIRECTORY',
+                            help='snapshot folder of one test set, may be repeated')
+        parser.add_argument('--output', default=DATA_DIR, help='folder for the JSON artifacts (defaults to the dashboard data folder)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='processes to extract features with')
+        parser.add_argument('--incremental', action='store_true',
+                            help='only process snapshots missing from the checkpoint; without --set, refresh every checkpointed set')
+        parser.add_argument('--checkpoint', help='checkpoint folder for --incremental (defaults to FEATURE_CHECKPOINT_DIR)')
+        parser.add_argument('--history', action='store_true', help='also store the per-snapshot features in the feature history table')
+
+    def handle(self, *args, **options):
+        try:
+            sets = dict(parse_set(value) for value in options['sets'])
+        except ValueError as e:
+            raise CommandError(e)
+
+        checkpoint = Checkpoint.load(options['checkpoint']) if options['incremental'] else None
+        if checkpoint is not None:
+            for set_number, state in checkpoint.sets.items():
+                sets.setdefault(set_number, state.directory)
+        if not sets:
+            raise CommandError('Give at least one --set SET=DIRECTORY')
+
+        workers = max(1, options['workers'] or 1)
+        summaries = {}
+        total_snapshots = 0
+        started = time.perf_counter()
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for set_number, directory in sorted(sets.items()):
+                if not os.path.isdir(directory):
+                    raise CommandError(f'Set {set_number}: no such directory {directory}')
+                paths = features.list_snapshots(directory)
+                if not paths:
+                    raise CommandError(f'Set {set_number}: no snapshot files in {directory}')
+                try:
+                    features.check_run_length(len(paths))
+                except ValueError as e:
+                    raise CommandError(f'Set {set_number}: {e}')
+
+                state = None
+                if checkpoint is not None:
+                    state = checkpoint.set_state(set_number, directory)
+                    paths, changed = state.pending(paths)
+                    if changed:
+                        self.stdout.write(f'Set {set_number}: processed snapshots changed, rebuilding the set')
+                        state.reset()
+
+                set_started = time.perf_counter()
+                if paths:
+                    chunksize = max(1, len(paths) // (workers * 4))
+                    names, digests, stacked = features.stack_features(pool.map(features.process_snapshot, paths, chunksize=chunksize))
+                else:
+                    names, digests, stacked = [], [], None
+                elapsed = time.perf_counter() - set_started
+
+                if options['history'] and names:
+                    self.ingest_history(set_number, names, stacked)
+                if state is not None:
+                    state.add(paths, names, digests, stacked)
+                    summaries[set_number] = state.summary()
+                else:
+                    summaries[set_number] = features.summarize(stacked)
+                total_snapshots += len(names)
+
+                rate = f' ({len(names) / elapsed:.1f} snapshots/s)' if names else ''
+                skipped = f', {len(state) - len(names)} from checkpoint' if state is not None else ''
+                self.stdout.write(f'Set {set_number}: {len(names)} snapshots in {elapsed:.2f}s{rate}{skipped}')
+
+        built = features.build_artifacts(summaries)
+        if not built[0]:
+            raise CommandError('None of the given sets contains a known bearing failure')
+
+        # sets left out of this run keep their entries from the artifacts already there
+        names = ['degradation_features.json', 'bearing_analysis_results.json']
+        previous = [self.read_artifact(os.path.join(options['output'], name)) for name in names]
+        degradation, analysis = features.merge_artifacts(previous, built, summaries)
+        kept = [name for name in analysis if name not in built[1]]
+        if kept:
+            self.stdout.write(f'Kept {", ".join(kept)} from the existing artifacts')
+
+        os.makedirs(options['output'], exist_ok=True)
+        for name, payload in zip(names, [degradation, analysis]):
+            atomic_write(os.path.join(options['output'], name), json.dumps(payload, indent=4).encode())
+        if checkpoint is not None:
+            checkpoint.save()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {total_snapshots} snapshots in {elapsed:.2f}s ({total_snapshots / elapsed:.1f} snapshots/s)'
+        ))
+
+    def read_artifact(self, path):
+        try:
+            with open(path) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            raise CommandError(f'{path} is not valid JSON, move it away to write a new one ({e})')
+
+    def ingest_history(self, set_number, names, stacked):
+        started = time.perf_counter()
+        try:
+            rows = history.history_rows(set_number, names, stacked)
+        except ValueError as e:
+            raise CommandError(f'Set {set_number}: snapshot names must be timestamps for --history ({e})')
+        except LookupError as e:
+            raise CommandError(f'Set {set_number}: {e}')
+        history.ingest(rows)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'Set {set_number}: {len(rows)} history rows in {elapsed:.2f}s ({len(rows) / elapsed:.0f} rows/s)')
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from analysis import plot_assets, plots
+
+
+class Command(BaseCommand):
+    help = 'Render the plot fragments into hashed, precompressed static files and write the plot manifest'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='static root to write to (defaults to STATIC_ROOT)')
+
+    def handle(self, *args, **options):
+        manifest = plot_assets.build(options['output'])
+        count = 0
+        for group, assets in manifest['groups'].items():
+            for name, asset in assets.items():
+                sizes = ', '.join(f'{encoding} {size}' for encoding, size in sorted(asset['encodings'].items()))
+                self.stdout.write(f'{group}/{name}: {asset["bytes"]} bytes{f" ({sizes})" if sizes else ""} -> {asset["path"]}')
+                count += 1
+        self.stdout.write(self.style.SUCCESS(f'Wrote {count} plot assets and {plots.manifest_path(options["output"])}'))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from analysis import plots, signal_store, signals
+
+
+class Command(BaseCommand):
+    help = 'Convert the raw_signals Plotly fragments into the memory-mapped signal store'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='store directory (defaults to SIGNAL_STORE_DIR)')
+        parser.add_argument('--set', type=int, action='append', dest='sets', help='only convert this set, may be repeated')
+
+    def handle(self, *args, **options):
+        root = options['output'] or signal_store.store_dir()
+        converted = 0
+
+        for name in plots.list_plots('raw'):
+            match = signals.RAW_FRAGMENT.match(name)
+            if match is None:
+                continue
+            set_number = int(match.group(1))
+            if options['sets'] and set_number not in options['sets']:
+                continue
+
+            with open(plots.plot_path('raw', name), 'rb') as file:
+                figure = signals.parse_plotly_figure(file.read())
+            bearings = signals.CHANNEL_MAP.get(set_number, {channel: [channel] for channel in figure.signals})
+
+            info = signal_store.write_set(root, set_number, figure.signals, bearings)
+            samples = sum(channel['samples'] for channel in info['channels'].values())
+            self.stdout.write(f'Set {set_number}: {len(info["channels"])} channels, {samples} samples')
+            converted += 1
+
+        if not converted:
+            raise CommandError('No raw signal fragments found to convert')
+        self.stdout.write(self.style.SUCCESS(f'Wrote {converted} sets to {root}'))
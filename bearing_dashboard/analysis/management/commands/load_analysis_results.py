@@ -0,0 +1,39 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analysis import loading, results
+
+
+class Command(BaseCommand):
+    help = 'Bulk load the analysis JSON artifacts into the database, replacing what is stored'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--degradation', help='degradation_features.json (defaults to the dashboard data folder)')
+        parser.add_argument('--bearing-analysis', help='bearing_analysis_results.json')
+        parser.add_argument('--predictions', help='prediction_analysis.json')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        paths = [options['degradation'], options['bearing_analysis'], options['predictions']]
+        if any(paths) and not all(paths):
+            raise CommandError('Give all of --degradation, --bearing-analysis and --predictions, or none')
+
+        if all(paths):
+            artifacts = []
+            parsers = [results.DegradationFeatures.from_json, results.BearingAnalysis.from_json, results.PredictionAnalysis.from_json]
+            for path, parse in zip(paths, parsers):
+                try:
+                    with open(path, 'rb') as file:
+                        artifacts.append(parse(json.load(file)))
+                except (OSError, ValueError) as e:
+                    raise CommandError(f'Could not read {path}: {e}')
+            counts = loading.load_results(*artifacts)
+        else:
+            counts = loading.load_artifacts()
+
+        for entry in counts.pop('skipped'):
+            self.stdout.write(self.style.WARNING(f'Skipped {entry}'))
+        summary = ', '.join(f'{count} {name.replace("_", " ")}' for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f'Loaded {summary} in {time.perf_counter() - started:.2f}s'))
@@ -0,0 +1,110 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from analysis import load_test
+
+
+READY_TIMEOUT = 120
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def gunicorn_server(workers, asgi=False):
+    """A gunicorn.conf.py server with ``workers`` workers on a free local port, once /readyz answers 200."""
+    port = free_port()
+    env = dict(os.environ, BIND=f'127.0.0.1:{port}', WEB_CONCURRENCY=str(workers), GUNICORN_ASGI='1' if asgi else '0')
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py'],
+        cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f'http://127.0.0.1:{port}'
+    try:
+        deadline = time.monotonic() + READY_TIMEOUT
+        while True:
+            if server.poll() is not None:
+                raise CommandError(f'gunicorn exited with status {server.returncode} before it was ready')
+            try:
+                with urllib.request.urlopen(f'{url}/readyz', timeout=1) as response:
+                    if response.status == 200:
+                        break
+            except (OSError, urllib.error.URLError):
+                pass
+            if time.monotonic() > deadline:
+                raise CommandError(f'gunicorn was not ready after {READY_TIMEOUT} s')
+            time.sleep(0.2)
+        yield url
+    finally:
+        server.terminate()
+        server.wait()
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive the dashboard, plot sections and APIs with concurrent clients and report throughput, '
+        'p50/p95/p99 latency, error rate and bytes/s for each worker count and concurrency'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', default='wsgi', help='wsgi or asgi to call the app in-process, or the URL of a running server (default wsgi)')
+        parser.add_argument('--serve', action='store_true', help='start gunicorn.conf.py on a local port for each worker count and drive it over HTTP')
+        parser.add_argument('--workers', type=int, action='append', dest='worker_counts', help='worker processes, may be repeated (default 1)')
+        parser.add_argument('--clients', type=int, action='append', dest='client_counts', help='concurrent clients, may be repeated (default 16)')
+        parser.add_argument('--duration', type=float, help=f'seconds per run (default {load_test.DEFAULT_DURATION:g})')
+        parser.add_argument('--requests', type=int, help='requests per client instead of a duration')
+        parser.add_argument('--path', action='append', dest='paths', help='path to request, may be repeated (default: the dashboard, its sections and the APIs)')
+        parser.add_argument('--json', dest='output', help='also write the full reports, with per-path figures, to this file')
+
+    def handle(self, *args, **options):
+        target = options['target']
+        if not options['serve'] and target not in load_test.IN_PROCESS and not target.startswith('http://'):
+            raise CommandError('--target must be wsgi, asgi or an http:// URL')
+        if options['serve']:
+            try:
+                import gunicorn  # noqa: F401
+            except ImportError:
+                raise CommandError('--serve needs gunicorn installed')
+        worker_counts = options['worker_counts'] or [1]
+        client_counts = options['client_counts'] or [16]
+        if min(worker_counts + client_counts) < 1:
+            raise CommandError('--workers and --clients must be at least 1')
+        paths = options['paths'] or load_test.default_paths()
+
+        self.stdout.write(f'{"workers":>7} {"clients":>7} {"requests":>8} {"req/s":>9} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"errors":>7} {"MB/s":>8}')
+        reports = []
+        for workers in worker_counts:
+            for clients in client_counts:
+                if options['serve']:
+                    with gunicorn_server(workers, asgi=target == 'asgi') as url:
+                        # gunicorn runs the workers; the load comes from this one process
+                        report = load_test.run(url, paths, clients, 1, options['duration'], options['requests'])
+                    report['workers'] = workers
+                else:
+                    report = load_test.run(target, paths, clients, workers, options['duration'], options['requests'])
+                reports.append(report)
+                if not report['requests']:
+                    self.stdout.write(f'{workers:>7} {clients:>7} {0:>8}')
+                    continue
+                self.stdout.write(
+                    f'{workers:>7} {clients:>7} {report["requests"]:>8} {report["throughput"]:>9.1f} '
+                    f'{report["p50"]:>8.2f} {report["p95"]:>8.2f} {report["p99"]:>8.2f} '
+                    f'{report["error_rate"] * 100:>6.1f}% {report["bytes_per_second"] / 1e6:>8.2f}'
+                )
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump({'paths': paths, 'reports': reports}, file, indent=2)
@@ -0,0 +1,138 @@
+import gc
+import json
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from analysis import caching, plots, preload, repository, synthetic
+
+
+def memory_usage(pid='self'):
+    """Resident memory of a process in kB, from /proc/<pid>/smaps_rollup."""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as file:
+        for line in file:
+            key, _, value = line.partition(':')
+            parts = value.split()
+            if len(parts) == 2 and parts[1] == 'kB':
+                fields[key] = int(parts[0])
+    return {
+        'rss': fields['Rss'],
+        'pss': fields['Pss'],
+        'shared': fields['Shared_Clean'] + fields['Shared_Dirty'],
+        'private': fields['Private_Clean'] + fields['Private_Dirty'],
+    }
+
+
+def default_paths():
+    # the page, every plot fragment it loads, and the JSON/SSE endpoints
+    paths = ['/']
+    for group in plots.PLOT_GROUPS:
+        paths += [plots.plot_url(group, name) for name in plots.list_plots(group)]
+    return paths + ['/api/alerts/', '/api/live/']
+
+
+def run_workers(count, paths, client=None):
+    """
+    Fork ``count`` workers that each request ``paths`` and report their memory
+    while all of them are still alive, like a gunicorn master with its workers.
+    Workers share ``client`` (an app loaded in the master) or build their own.
+    """
+    release_read, release_write = os.pipe()
+    workers = []
+    for _ in range(count):
+        report_read, report_write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                os.close(release_write)
+                client = client or Client()
+                statuses = [client.get(path).status_code for path in paths]
+                usage = dict(memory_usage(), statuses=statuses)
+                os.write(report_write, json.dumps(usage).encode())
+                os.close(report_write)
+                # stay alive until every worker has measured, so shared pages count as shared
+                os.read(release_read, 1)
+            except BaseException:
+                status = 1
+            finally:
+                os._exit(status)
+        os.close(report_write)
+        workers.append((pid, report_read))
+
+    os.close(release_read)
+    usages = []
+    for pid, report_read in workers:
+        with os.fdopen(report_read, 'rb') as report:
+            payload = report.read()
+        if payload:
+            usages.append(json.loads(payload))
+    os.close(release_write)
+    for pid, _ in workers:
+        os.waitpid(pid, 0)
+    if len(usages) != count:
+        raise CommandError(f'{count - len(usages)} of {count} workers failed')
+    return usages
+
+
+class Command(BaseCommand):
+    help = (
+        'Fork workers the way gunicorn does, with and without preloading the data in the master '
+        '(see analysis/preload.py), and report the memory each worker holds after serving the dashboard'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='workers to fork per run')
+        parser.add_argument('--scale', type=int, default=1, help='serve a synthetic fleet this many times the shipped one')
+        parser.add_argument('--path', action='append', dest='paths', help='URL every worker requests, may be repeated (default: the dashboard and everything it loads)')
+
+    def handle(self, *args, **options):
+        if not os.path.exists('/proc/self/smaps_rollup'):
+            raise CommandError('Measuring needs /proc/<pid>/smaps_rollup (Linux 4.14 or later)')
+        workers = max(1, options['workers'])
+
+        with tempfile.TemporaryDirectory() as directory:
+            original = {name: artifact.path for name, artifact in repository.ARTIFACTS.items()}, caching.DATA_DIR
+            if options['scale'] > 1:
+                for name, path in synthetic.write_artifacts(directory, options['scale']).items():
+                    repository.ARTIFACTS[name].path = path
+                caching.DATA_DIR = directory
+            try:
+                paths = options['paths'] or default_paths()
+                # nothing is loaded yet, so the lazy workers each load everything themselves
+                results = {'lazy': run_workers(workers, paths)}
+                loaded = preload.preload()
+                # what preload_app does: the master builds the handler and its middleware once
+                client = Client()
+                client.handler.load_middleware()
+                frozen = preload.freeze()
+                try:
+                    results['preloaded'] = run_workers(workers, paths, client)
+                finally:
+                    gc.unfreeze()
+            finally:
+                for name, path in original[0].items():
+                    repository.ARTIFACTS[name].path = path
+                caching.DATA_DIR = original[1]
+                repository.clear_cache()
+
+        self.stdout.write(f'Preloaded {", ".join(f"{key} {value}" for key, value in loaded.items())}; froze {frozen} objects')
+        self.stdout.write(f'{len(paths)} requests per worker, {workers} workers, memory per worker in MB:')
+        means = {}
+        for mode, usages in results.items():
+            means[mode] = {key: sum(usage[key] for usage in usages) / len(usages) / 1024 for key in ['rss', 'pss', 'shared', 'private']}
+            failed = sorted({status for usage in usages for status in usage['statuses'] if status >= 400})
+            line = (
+                f'  {mode:<10} private {means[mode]["private"]:7.1f}  PSS {means[mode]["pss"]:7.1f}  '
+                f'shared {means[mode]["shared"]:7.1f}  RSS {means[mode]["rss"]:7.1f}'
+            )
+            if failed:
+                line += f'  (HTTP {", ".join(map(str, failed))} responses)'
+            self.stdout.write(line)
+        saved = means['lazy']['private'] - means['preloaded']['private']
+        self.stdout.write(self.style.SUCCESS(
+            f'Preloading saves {saved:.1f} MB private memory per worker, {saved * workers:.1f} MB across {workers} workers'
+        ))
@@ -0,0 +1,104 @@
+"""
+Request metrics in the Prometheus text exposition format, served at /metrics.
+
+TimingMiddleware records these histograms:
+
+- request durations by view and status
+- phase durations by view and phase
+- response sizes by view
+
+The artifact cache counters from repository.py are exported as well. All
+values are per process: with several workers, every scrape sees the worker
+that answered it, so scrape the workers individually or sum by instance.
+"""
+import threading
+from bisect import bisect_left
+
+from . import repository
+
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._series = {}
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((labels, list(counts), total) for labels, (counts, total) in self._series.items())
+        for label_values, counts, total in series:
+            labels = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.labels, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total}')
+            lines.append(f'{self.name}_count{{{labels}}} {cumulative}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REQUEST_DURATION = Histogram(
+    'dashboard_request_duration_seconds', 'Time to produce a response, by view and status code.',
+    ('view', 'status'), DURATION_BUCKETS,
+)
+PHASE_DURATION = Histogram(
+    'dashboard_phase_duration_seconds', 'Time spent in each phase of a request (load, scan, version, cache, render, stream).',
+    ('view', 'phase'), DURATION_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    'dashboard_response_size_bytes', 'Response body size, by view.',
+    ('view',), SIZE_BUCKETS,
+)
+HISTOGRAMS = [REQUEST_DURATION, PHASE_DURATION, RESPONSE_SIZE]
+
+
+def render_artifact_counters():
+    lines = [
+        '# HELP dashboard_artifact_cache_total Artifact cache lookups by result.',
+        '# TYPE dashboard_artifact_cache_total counter',
+    ]
+    for name, stats in sorted(repository.artifact_stats().items()):
+        for result in ('hits', 'misses', 'reloads'):
+            lines.append(f'dashboard_artifact_cache_total{{artifact="{name}",result="{result}"}} {stats[result]}')
+    return lines
+
+
+def render():
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    lines.extend(render_artifact_counters())
+    return '\n'.join(lines) + '\n'
+
+
+def clear():
+    for histogram in HISTOGRAMS:
+        histogram.clear()
@@ -0,0 +1,72 @@
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from . import metrics, timing
+
+
+class TimingMiddleware:
+    """
+    Times every request and the phases recorded with ``timing.timed``, adds
+    them as a Server-Timing header and feeds the /metrics histograms.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = perf_counter()
+        token = timing.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            timings = timing.stop(token)
+        return self.finish(request, response, started, timings)
+
+    async def __acall__(self, request):
+        started = perf_counter()
+        token = timing.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            timings = timing.stop(token)
+        return self.finish(request, response, started, timings)
+
+    def finish(self, request, response, started, timings):
+        total = perf_counter() - started
+        match = request.resolver_match
+        view = match.url_name if match is not None and match.url_name else 'unmatched'
+
+        entries = [f'{phase};dur={seconds * 1000:.2f}' for phase, seconds in timings.items()]
+        entries.append(f'total;dur={total * 1000:.2f}')
+        response['Server-Timing'] = ', '.join(entries)
+
+        metrics.REQUEST_DURATION.observe(total, view, str(response.status_code))
+        for phase, seconds in timings.items():
+            metrics.PHASE_DURATION.observe(seconds, view, phase)
+
+        if not response.streaming:
+            metrics.RESPONSE_SIZE.observe(len(response.content), view)
+        elif not response.is_async:
+            # body size and send time are only known once the server has drained the iterator
+            response.streaming_content = self.stream(response.streaming_content, view)
+        return response
+
+    @staticmethod
+    def stream(chunks, view):
+        size = 0
+        started = perf_counter()
+        try:
+            for chunk in chunks:
+                size += len(chunk)
+                yield chunk
+        finally:
+            metrics.PHASE_DURATION.observe(perf_counter() - started, view, 'stream')
+            metrics.RESPONSE_SIZE.observe(size, view)
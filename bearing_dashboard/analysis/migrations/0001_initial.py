@@ -0,0 +1,145 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Bearing',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveSmallIntegerField()),
+                ('failure_label', models.CharField(blank=True, max_length=100)),
+                ('failure_point_percentage', models.FloatField(null=True)),
+            ],
+            options={
+                'ordering': ['set__number', 'number'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ModelPerformance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('average_accuracy', models.FloatField(null=True)),
+                ('average_error_days', models.FloatField(null=True)),
+                ('loaded_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Set',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveSmallIntegerField(unique=True)),
+            ],
+            options={
+                'ordering': ['number'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Channel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveSmallIntegerField()),
+                ('peak_change', models.FloatField(null=True)),
+                ('mean_change', models.FloatField(null=True)),
+                ('total_energy_change', models.FloatField(null=True)),
+                ('bearing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='channels', to='analysis.bearing')),
+            ],
+            options={
+                'ordering': ['bearing', 'number'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BandChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.CharField(choices=[('low', 'Low'), ('mid', 'Mid'), ('high', 'High')], max_length=8)),
+                ('change', models.FloatField()),
+                ('channel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='band_changes', to='analysis.channel')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DegradationMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.CharField(choices=[('low', 'Low'), ('mid', 'Mid'), ('high', 'High')], max_length=8)),
+                ('metric', models.CharField(choices=[('RMS', 'RMS'), ('Peak', 'Peak'), ('Crest', 'Crest'), ('Kurtosis', 'Kurtosis')], max_length=10)),
+                ('stage', models.CharField(choices=[('early', 'Early'), ('mid', 'Mid'), ('late', 'Late')], max_length=8)),
+                ('ratio_to_baseline', models.FloatField(null=True)),
+                ('rate', models.FloatField()),
+                ('stability', models.FloatField()),
+                ('channel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='degradation_metrics', to='analysis.channel')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Prediction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('label', models.CharField(max_length=200, unique=True)),
+                ('average_accuracy', models.FloatField(null=True)),
+                ('bearing', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='predictions', to='analysis.bearing')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PredictionStage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField()),
+                ('life_stage', models.CharField(max_length=50)),
+                ('actual_hours_remaining', models.FloatField()),
+                ('predicted_hours', models.FloatField()),
+                ('error_hours', models.FloatField()),
+                ('error_days', models.FloatField()),
+                ('accuracy_percentage', models.FloatField()),
+                ('prediction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to='analysis.prediction')),
+            ],
+            options={
+                'ordering': ['prediction', 'position'],
+            },
+        ),
+        migrations.AddField(
+            model_name='bearing',
+            name='set',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bearings', to='analysis.set'),
+        ),
+        migrations.AddConstraint(
+            model_name='channel',
+            constraint=models.UniqueConstraint(fields=('bearing', 'number'), name='unique_channel_per_bearing'),
+        ),
+        migrations.AddIndex(
+            model_name='bandchange',
+            index=models.Index(fields=['band', 'change'], name='band_change_by_band'),
+        ),
+        migrations.AddConstraint(
+            model_name='bandchange',
+            constraint=models.UniqueConstraint(fields=('channel', 'band'), name='unique_band_change'),
+        ),
+        migrations.AddIndex(
+            model_name='degradationmetric',
+            index=models.Index(fields=['band', 'metric', 'stage'], name='degradation_by_metric'),
+        ),
+        migrations.AddConstraint(
+            model_name='degradationmetric',
+            constraint=models.UniqueConstraint(fields=('channel', 'band', 'metric', 'stage'), name='unique_degradation_metric'),
+        ),
+        migrations.AddIndex(
+            model_name='predictionstage',
+            index=models.Index(fields=['accuracy_percentage'], name='prediction_stage_accuracy'),
+        ),
+        migrations.AddConstraint(
+            model_name='predictionstage',
+            constraint=models.UniqueConstraint(fields=('prediction', 'position'), name='unique_prediction_stage'),
+        ),
+        migrations.AddConstraint(
+            model_name='bearing',
+            constraint=models.UniqueConstraint(fields=('set', 'number'), name='unique_bearing_per_set'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeatureSample',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('set_number', models.PositiveSmallIntegerField()),
+                ('bearing', models.PositiveSmallIntegerField()),
+                ('channel', models.PositiveSmallIntegerField()),
+                ('feature', models.PositiveSmallIntegerField()),
+                ('timestamp', models.BigIntegerField()),
+                ('value', models.FloatField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('set_number', 'bearing', 'channel', 'feature', 'timestamp'), name='unique_feature_sample')],
+            },
+        ),
+    ]
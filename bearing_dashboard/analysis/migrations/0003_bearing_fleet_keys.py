@@ -0,0 +1,56 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0002_feature_sample'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bearing',
+            name='accuracy',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name='bearing',
+            name='health',
+            field=models.CharField(choices=[('healthy', 'Healthy'), ('info', 'Info'), ('warning', 'Warning'), ('critical', 'Critical')], default='healthy', max_length=8),
+        ),
+        migrations.AddField(
+            model_name='bearing',
+            name='predicted_hours',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name='bearing',
+            index=models.Index(fields=['failure_point_percentage', 'id'], name='bearing_by_failure_point'),
+        ),
+        migrations.AddIndex(
+            model_name='bearing',
+            index=models.Index(fields=['predicted_hours', 'id'], name='bearing_by_predicted_hours'),
+        ),
+        migrations.AddIndex(
+            model_name='bearing',
+            index=models.Index(fields=['health', 'failure_point_percentage', 'id'], name='bearing_by_health'),
+        ),
+        migrations.AddIndex(
+            model_name='bearing',
+            index=models.Index(fields=['health', 'predicted_hours', 'id'], name='bearing_by_health_hours'),
+        ),
+        migrations.AddIndex(
+            model_name='bearing',
+            index=models.Index(fields=['failure_label', 'failure_point_percentage', 'id'], name='bearing_by_failure'),
+        ),
+        migrations.AddIndex(
+            model_name='bearing',
+            index=models.Index(fields=['failure_label', 'predicted_hours', 'id'], name='bearing_by_failure_hours'),
+        ),
+        migrations.AddIndex(
+            model_name='bearing',
+            index=models.Index(fields=['accuracy'], name='bearing_by_accuracy'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+def enable_wal(apps, schema_editor):
+    # WAL is stored in the database file, so it is set once here rather than on every connection;
+    # it lets the dashboard keep reading while the feature history is ingested
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode=WAL')
+
+
+class Migration(migrations.Migration):
+
+    # the journal mode can't change inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('analysis', '0003_bearing_fleet_keys'),
+    ]
+
+    operations = [
+        migrations.RunPython(enable_wal, migrations.RunPython.noop),
+    ]
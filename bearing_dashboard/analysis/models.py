@@ -1,3 +1,150 @@
 from django.db import models
 
-# Create your models here.
+
+# Relational copy of the three JSON artifacts, filled by `python manage.py load_analysis_results`
+# (see analysis/loading.py). Every query can fetch just the rows it needs instead of parsing the files.
+
+BAND_CHOICES = [('low', 'Low'), ('mid', 'Mid'), ('high', 'High')]
+METRIC_CHOICES = [('RMS', 'RMS'), ('Peak', 'Peak'), ('Crest', 'Crest'), ('Kurtosis', 'Kurtosis')]
+STAGE_CHOICES = [('early', 'Early'), ('mid', 'Mid'), ('late', 'Late')]
+# no alert at all, then the alert levels of analysis/alerts.py
+HEALTH_CHOICES = [('healthy', 'Healthy'), ('info', 'Info'), ('warning', 'Warning'), ('critical', 'Critical')]
+
+
+class Set(models.Model):
+    number = models.PositiveSmallIntegerField(unique=True)
+
+    class Meta:
+        ordering = ['number']
+
+    def __str__(self):
+        return f'set {self.number}'
+
+
+class Bearing(models.Model):
+    set = models.ForeignKey(Set, on_delete=models.CASCADE, related_name='bearings')
+    number = models.PositiveSmallIntegerField()
+    failure_label = models.CharField(max_length=100, blank=True)
+    failure_point_percentage = models.FloatField(null=True)
+    # precomputed by the loader for the fleet listing (analysis/fleet.py): the most
+    # severe alert on any channel, and the prediction at the latest life stage
+    health = models.CharField(max_length=8, choices=HEALTH_CHOICES, default='healthy')
+    predicted_hours = models.FloatField(null=True)
+    accuracy = models.FloatField(null=True)
+
+    class Meta:
+        ordering = ['set__number', 'number']
+        constraints = [models.UniqueConstraint(fields=['set', 'number'], name='unique_bearing_per_set')]
+        # a page of the fleet listing is a walk along one of these, id breaking ties
+        indexes = [
+            models.Index(fields=['failure_point_percentage', 'id'], name='bearing_by_failure_point'),
+            models.Index(fields=['predicted_hours', 'id'], name='bearing_by_predicted_hours'),
+            models.Index(fields=['health', 'failure_point_percentage', 'id'], name='bearing_by_health'),
+            models.Index(fields=['health', 'predicted_hours', 'id'], name='bearing_by_health_hours'),
+            models.Index(fields=['failure_label', 'failure_point_percentage', 'id'], name='bearing_by_failure'),
+            models.Index(fields=['failure_label', 'predicted_hours', 'id'], name='bearing_by_failure_hours'),
+            # accuracy ranges are counted on this one
+            models.Index(fields=['accuracy'], name='bearing_by_accuracy'),
+        ]
+
+    def __str__(self):
+        return f'{self.set} bearing {self.number}'
+
+
+class Channel(models.Model):
+    bearing = models.ForeignKey(Bearing, on_delete=models.CASCADE, related_name='channels')
+    number = models.PositiveSmallIntegerField()
+    # late vs early stage, in percent
+    peak_change = models.FloatField(null=True)
+    mean_change = models.FloatField(null=True)
+    total_energy_change = models.FloatField(null=True)
+
+    class Meta:
+        ordering = ['bearing', 'number']
+        constraints = [models.UniqueConstraint(fields=['bearing', 'number'], name='unique_channel_per_bearing')]
+
+    def __str__(self):
+        return f'{self.bearing} channel {self.number}'
+
+
+class BandChange(models.Model):
+    channel = models.ForeignKey(Channel, on_delete=models.CASCADE, related_name='band_changes')
+    band = models.CharField(max_length=8, choices=BAND_CHOICES)
+    change = models.FloatField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['channel', 'band'], name='unique_band_change')]
+        indexes = [models.Index(fields=['band', 'change'], name='band_change_by_band')]
+
+
+class DegradationMetric(models.Model):
+    """One metric of one band at one life stage; ratios are relative to the early stage."""
+
+    channel = models.ForeignKey(Channel, on_delete=models.CASCADE, related_name='degradation_metrics')
+    band = models.CharField(max_length=8, choices=BAND_CHOICES)
+    metric = models.CharField(max_length=10, choices=METRIC_CHOICES)
+    stage = models.CharField(max_length=8, choices=STAGE_CHOICES)
+    ratio_to_baseline = models.FloatField(null=True)
+    rate = models.FloatField()
+    stability = models.FloatField()
+
+    class Meta:
+        constraints = [
+            # (set, bearing, channel) is the channel row, so this also serves per-channel lookups
+            models.UniqueConstraint(fields=['channel', 'band', 'metric', 'stage'], name='unique_degradation_metric'),
+        ]
+        # fleet-wide questions such as "late stability of mid band kurtosis"
+        indexes = [models.Index(fields=['band', 'metric', 'stage'], name='degradation_by_metric')]
+
+
+class Prediction(models.Model):
+    bearing = models.ForeignKey(Bearing, on_delete=models.SET_NULL, null=True, related_name='predictions')
+    label = models.CharField(max_length=200, unique=True)
+    average_accuracy = models.FloatField(null=True)
+
+    def __str__(self):
+        return self.label
+
+
+class PredictionStage(models.Model):
+    prediction = models.ForeignKey(Prediction, on_delete=models.CASCADE, related_name='timeline')
+    position = models.PositiveSmallIntegerField()
+    life_stage = models.CharField(max_length=50)
+    actual_hours_remaining = models.FloatField()
+    predicted_hours = models.FloatField()
+    error_hours = models.FloatField()
+    error_days = models.FloatField()
+    accuracy_percentage = models.FloatField()
+
+    class Meta:
+        ordering = ['prediction', 'position']
+        constraints = [models.UniqueConstraint(fields=['prediction', 'position'], name='unique_prediction_stage')]
+        indexes = [models.Index(fields=['accuracy_percentage'], name='prediction_stage_accuracy')]
+
+
+class ModelPerformance(models.Model):
+    # single row with the fleet-wide prediction summary
+    average_accuracy = models.FloatField(null=True)
+    average_error_days = models.FloatField(null=True)
+    loaded_at = models.DateTimeField(auto_now=True)
+
+
+class FeatureSample(models.Model):
+    """
+    One feature value of one channel at one snapshot time; the history written by
+    `build_features --history` (see analysis/history.py). Feature names are stored as
+    their index in history.FEATURES and times as epoch seconds to keep rows small.
+    """
+
+    set_number = models.PositiveSmallIntegerField()
+    bearing = models.PositiveSmallIntegerField()
+    channel = models.PositiveSmallIntegerField()
+    feature = models.PositiveSmallIntegerField()
+    timestamp = models.BigIntegerField()
+    value = models.FloatField()
+
+    class Meta:
+        # also the index every range query runs on
+        constraints = [
+            models.UniqueConstraint(fields=['set_number', 'bearing', 'channel', 'feature', 'timestamp'], name='unique_feature_sample'),
+        ]
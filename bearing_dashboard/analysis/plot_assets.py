@@ -0,0 +1,66 @@
+"""
+Build step for the plot fragments: render each figure once, write it under
+STATIC_ROOT/analysis/plots/<group>/ with the first 12 hex digits of its
+sha256 in the name, precompress it, and record it in the plot manifest.
+
+Raw-signal figures are written downsampled, as the section view serves them.
+WhiteNoise serves the ``.br``/``.gz`` siblings to clients that accept them
+and marks the hashed names immutable (WHITENOISE_IMMUTABLE_FILE_TEST), so
+a figure is downloaded once and then served from the browser cache until
+its content, and therefore its URL, changes.
+"""
+import hashlib
+import json
+import os
+
+from django.conf import settings
+from django.template.loader import render_to_string
+from whitenoise.compress import Compressor
+
+from . import plots, signals
+from .repository import atomic_write
+
+
+ENCODINGS = {'.br': 'br', '.gz': 'gzip'}
+
+
+def render_plot(group, name):
+    if group == 'raw':
+        fragment = signals.render_raw_fragment(name)
+        if fragment is not None:
+            return fragment.encode()
+    return render_to_string(plots.plot_template(group, name)).encode()
+
+
+def write_asset(root, group, name, content, compressor):
+    digest = hashlib.sha256(content).hexdigest()
+    stem, ext = os.path.splitext(name)
+    path = f'{plots.ASSET_DIR}/{group}/{stem}.{digest[:12]}{ext}'
+    target = os.path.join(root, *path.split('/'))
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    atomic_write(target, content)
+    compressed = compressor.compress(target)
+    return {
+        'path': path,
+        'sha256': digest,
+        'bytes': len(content),
+        'encodings': {ENCODINGS[os.path.splitext(f)[1]]: os.path.getsize(f) for f in compressed},
+    }
+
+
+def build(root=None):
+    """Write every figure and the manifest under ``root`` (STATIC_ROOT by default)."""
+    root = str(root or settings.STATIC_ROOT)
+    compressor = Compressor(quiet=True)
+    manifest = {'version': plots.MANIFEST_VERSION, 'groups': {}}
+    for group in plots.PLOT_GROUPS:
+        # the template folders are the source here, never a previous manifest
+        names = plots.scan_plots(group)
+        if names:
+            manifest['groups'][group] = {
+                name: write_asset(root, group, name, render_plot(group, name), compressor) for name in names
+            }
+    # written last, so a manifest only ever lists files that exist
+    atomic_write(plots.manifest_path(root), json.dumps(manifest, indent=2, sort_keys=True).encode())
+    plots.clear_manifest()
+    return manifest
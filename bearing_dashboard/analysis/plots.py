@@ -0,0 +1,112 @@
+"""
+Lookup of the Plotly figure fragments shown on the dashboard.
+
+Figures are grouped by dashboard section. Each group maps to a folder under
+templates/analysis; a folder that doesn't exist simply has no figures.
+
+``build_plot_assets`` renders every figure once into a content-hashed,
+precompressed static file and lists them in a manifest under STATIC_ROOT.
+When that manifest exists, it is read once per process and the figure lists
+and URLs come from it: no directory scans per request, and browsers fetch
+the figures as immutable static files. Without it, the figures are listed
+from the template folders and served by the section view.
+"""
+import hashlib
+import json
+import os
+import threading
+
+from django.conf import settings
+from django.urls import reverse
+
+from .timing import timed
+
+
+TEMPLATE_DIR = os.path.join(settings.BASE_DIR, 'analysis', 'templates', 'analysis')
+
+# section group -> template folder
+PLOT_GROUPS = {
+    'raw': 'raw_signals',
+    'fft': 'fft_analysis',
+    'filtered': 'filtered_signals',
+    'prediction': 'misc',
+}
+
+# folder of the built figures, relative to STATIC_ROOT
+ASSET_DIR = 'analysis/plots'
+MANIFEST_FILE = 'manifest.json'
+MANIFEST_VERSION = 1
+
+_manifest_lock = threading.Lock()
+_manifest = {}
+
+
+def scan_plots(group):
+    directory = os.path.join(TEMPLATE_DIR, PLOT_GROUPS[group])
+    try:
+        with timed('scan'):
+            return sorted(f for f in os.listdir(directory) if f.endswith('.html'))
+    except FileNotFoundError:
+        return []
+
+
+def list_plots(group):
+    manifest = load_manifest()
+    if manifest is not None:
+        return sorted(manifest['groups'].get(group, {}))
+    return scan_plots(group)
+
+
+def plot_path(group, name):
+    return os.path.join(TEMPLATE_DIR, PLOT_GROUPS[group], name)
+
+
+def plot_template(group, name):
+    return f'analysis/{PLOT_GROUPS[group]}/{name}'
+
+
+def manifest_path(root=None):
+    return os.path.join(str(root or settings.STATIC_ROOT), ASSET_DIR, MANIFEST_FILE)
+
+
+def load_manifest():
+    """The built asset manifest, or None if ``build_plot_assets`` hasn't run."""
+    with _manifest_lock:
+        if 'value' not in _manifest:
+            try:
+                with open(manifest_path(), 'rb') as file:
+                    raw = file.read()
+            except FileNotFoundError:
+                _manifest['value'], _manifest['digest'] = None, ''
+            else:
+                manifest = json.loads(raw)
+                if manifest.get('version') != MANIFEST_VERSION:
+                    manifest = None
+                _manifest['value'], _manifest['digest'] = manifest, hashlib.sha256(raw).hexdigest()
+        return _manifest['value']
+
+
+def manifest_digest():
+    # sha256 of the manifest in use, '' without one
+    load_manifest()
+    return _manifest['digest']
+
+
+def clear_manifest():
+    with _manifest_lock:
+        _manifest.clear()
+
+
+def plot_asset(group, name):
+    manifest = load_manifest()
+    if manifest is None:
+        return None
+    return manifest['groups'].get(group, {}).get(name)
+
+
+def plot_url(group, name):
+    """Hashed static URL of a built figure, or the section view rendering it on demand."""
+    asset = plot_asset(group, name)
+    if asset is not None:
+        return settings.STATIC_URL + asset['path']
+    return reverse('analysis:section', args=[group, name])
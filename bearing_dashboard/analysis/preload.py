@@ -0,0 +1,78 @@
+"""
+Load everything the dashboard reads before gunicorn forks its workers.
+
+gunicorn.conf.py preloads the app in the master, calls ``preload()`` and
+then ``freeze()``. The forked workers share the master's pages until they
+write to them, so the data below sits in memory once instead of once per
+worker:
+
+- the typed analysis artifacts and the alert table
+- the compiled dashboard and plot fragment templates
+- the plot manifest and listings
+- the raw signals
+
+The raw signals are memory-mapped from the signal store when it has been
+built, and those pages come from the OS page cache whatever the fork does.
+The arrays in results.py are read-only, so workers never copy them.
+
+Reference counting still writes to every object a worker touches, and a
+garbage collection pass writes to every object it visits. ``freeze()`` moves
+all objects alive at fork time into the collector's permanent generation,
+so collections in the workers leave those pages shared.
+
+An artifact that changes on disk after the fork is re-read by each worker
+on its own, exactly as without preloading.
+"""
+import gc
+import time
+
+from django.template.loader import get_template
+from django.urls import get_resolver
+
+from . import alerts, plots, repository, signals
+
+
+def preload():
+    """Load and parse every dataset, template and plot listing; returns what was loaded."""
+    started = time.perf_counter()
+    loaded = {}
+
+    for name in repository.ARTIFACTS:
+        repository.get_artifact(name)
+    loaded['artifacts'] = len(repository.ARTIFACTS)
+    loaded['alert_rows'] = len(alerts.current_table())
+
+    # the cached template loader keeps compiled templates for the life of the process
+    get_template('analysis/dashboard.html')
+    loaded['plot_templates'] = 0
+    for group in plots.PLOT_GROUPS:
+        for name in plots.list_plots(group):
+            if group != 'raw':
+                get_template(plots.plot_template(group, name))
+                loaded['plot_templates'] += 1
+
+    # raw fragments are rendered from their parsed figures, see signals.render_raw_fragment
+    loaded['signal_channels'] = 0
+    for set_number in signals.set_numbers():
+        try:
+            loaded['signal_channels'] += len(signals.set_signals(set_number))
+            signals.data_version(set_number)
+        except FileNotFoundError:
+            continue
+    for name in plots.list_plots('raw'):
+        match = signals.RAW_FRAGMENT.match(name)
+        if match is not None:
+            signals.raw_figure(int(match.group(1)))
+
+    # builds the URL patterns, which also imports every view module
+    get_resolver().url_patterns
+
+    loaded['seconds'] = round(time.perf_counter() - started, 3)
+    return loaded
+
+
+def freeze():
+    """Keep the collector in forked workers from writing to what's loaded so far."""
+    gc.collect()
+    gc.freeze()
+    return gc.get_freeze_count()
@@ -0,0 +1,132 @@
+"""
+Process-wide cache for the JSON artifacts that feed the dashboard.
+
+Each artifact is parsed and validated once per worker and kept in memory as
+its typed model from results.py. On every access the file is stat'ed; only
+when its mtime or size changes is the content re-read and hashed, and only
+when the hash differs is it parsed again. Errors are never cached so a transient failure is retried on the next
+request.
+"""
+import hashlib
+import io
+import json
+import os
+import threading
+
+from django.conf import settings
+
+from . import results
+from .timing import timed
+
+
+DATA_DIR = os.path.join(settings.BASE_DIR, 'analysis', 'static', 'analysis', 'data')
+
+
+def atomic_write(path, data):
+    """Replace ``path`` with ``data`` so readers see either the old or the new file, never a partial one."""
+    tmp = f'{path}.tmp{os.getpid()}'
+    with open(tmp, 'wb') as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp, path)
+
+
+class CachedArtifact:
+    """
+    A file parsed once and re-parsed only when its content changes.
+
+    ``parser`` turns the raw bytes into the cached object (JSON by default),
+    ``validator`` checks or annotates the parsed object before it is cached.
+    """
+
+    def __init__(self, path, validator=None, parser=None):
+        self.path = path
+        self.validator = validator
+        self.parser = parser
+        self._lock = threading.Lock()
+        self._stat_key = None
+        self._digest = None
+        self._value = None
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def get(self):
+        with timed('load'):
+            return self._get()
+
+    def _get(self):
+        st = os.stat(self.path)
+        stat_key = (st.st_mtime_ns, st.st_size)
+
+        with self._lock:
+            if self._digest is not None and self._stat_key == stat_key:
+                self.hits += 1
+                return self._value
+
+            with open(self.path, 'rb') as file:
+                raw = file.read()
+            digest = hashlib.sha256(raw).hexdigest()
+
+            # touched but unchanged, e.g. re-copied during a deploy
+            if digest == self._digest:
+                self._stat_key = stat_key
+                self.hits += 1
+                return self._value
+
+            if self.parser is not None:
+                value = self.parser(raw)
+            else:
+                value = json.load(io.BytesIO(raw))
+            if self.validator is not None:
+                value = self.validator(value)
+
+            if self._digest is None:
+                self.misses += 1
+            else:
+                self.reloads += 1
+            self._stat_key = stat_key
+            self._digest = digest
+            self._value = value
+            return value
+
+    @property
+    def version(self):
+        # sha256 of the content currently held in memory, None before first load
+        return self._digest
+
+    def clear(self):
+        with self._lock:
+            self._stat_key = None
+            self._digest = None
+            self._value = None
+
+    def stats(self):
+        return {
+            'path': self.path,
+            'version': self._digest,
+            'hits': self.hits,
+            'misses': self.misses,
+            'reloads': self.reloads,
+        }
+
+
+ARTIFACTS = {
+    'bearing_analysis_results': CachedArtifact(os.path.join(DATA_DIR, 'bearing_analysis_results.json'), validator=results.BearingAnalysis.from_json),
+    'prediction_analysis': CachedArtifact(os.path.join(DATA_DIR, 'prediction_analysis.json'), validator=results.PredictionAnalysis.from_json),
+    'degradation_features': CachedArtifact(os.path.join(DATA_DIR, 'degradation_features.json'), validator=results.DegradationFeatures.from_json),
+}
+
+
+def get_artifact(name):
+    return ARTIFACTS[name].get()
+
+
+def artifact_stats():
+    return {name: artifact.stats() for name, artifact in ARTIFACTS.items()}
+
+
+def clear_cache():
+    for artifact in ARTIFACTS.values():
+        artifact.clear()
@@ -0,0 +1,357 @@
+"""
+Typed in-memory form of the three analysis artifacts.
+
+repository.py builds these once per artifact version, right after parsing
+the JSON. The structure is checked there, not on every request, and a
+malformed file fails with the path of the offending value:
+
+    bearing_analysis_results: set 1/bearing 3/failure_point_percentage: expected a number, got 'n/a'
+
+The numbers of each artifact live in one float64 array. Sets, bearings,
+channels and prediction stages are slotted records, and per-row values are
+read through a row index into that array. A channel is then one small
+object plus a row of floats instead of four nested dicts. numpy code such as
+alerts.py can take the arrays as they are.
+"""
+import re
+import sys
+
+import numpy as np
+
+from . import features
+
+
+MAGNITUDES = ['peak', 'mean', 'total_energy']
+RATIOS = ['mid_to_baseline', 'late_to_baseline']
+BAND_KEYS = [f'{band}_band_change' for band in features.BANDS]
+ERROR_METRICS = {'hours': 'error_hours', 'days': 'error_days', 'accuracy_percentage': 'accuracy_percentage'}
+
+# columns of BearingAnalysis.channel_values and PredictionAnalysis.stage_values
+CHANNEL_COLUMNS = MAGNITUDES + BAND_KEYS
+STAGE_COLUMNS = ['actual_hours_remaining', 'predicted_hours'] + list(ERROR_METRICS.values())
+
+
+class SchemaError(ValueError):
+    """An artifact doesn't have the structure the dashboard expects."""
+
+    def __init__(self, artifact, path, message):
+        self.artifact = artifact
+        self.path = '/'.join(str(part) for part in path)
+        super().__init__(f'{artifact}: {self.path}: {message}' if path else f'{artifact}: {message}')
+
+
+class _Validator:
+    # checks of one artifact, so errors can name it
+
+    def __init__(self, artifact):
+        self.artifact = artifact
+
+    def mapping(self, value, path, keys=()):
+        if not isinstance(value, dict):
+            raise SchemaError(self.artifact, path, f'expected an object, got {type(value).__name__}')
+        if not all(key in value for key in keys):
+            raise SchemaError(self.artifact, path, f'missing {", ".join(key for key in keys if key not in value)}')
+        return value
+
+    def sequence(self, value, path):
+        if not isinstance(value, list):
+            raise SchemaError(self.artifact, path, f'expected a list, got {type(value).__name__}')
+        return value
+
+    def number(self, value, path):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise SchemaError(self.artifact, path, f'expected a number, got {value!r}')
+        return float(value)
+
+    def numbers(self, mapping, path, keys):
+        # the values of ``keys``; checked one by one only to word an error
+        try:
+            values = [mapping[key] for key in keys]
+        except (KeyError, TypeError):
+            values = None
+        if values is None or not all(type(value) in (int, float) for value in values):
+            self.mapping(mapping, path, keys)
+            values = [self.number(mapping[key], path + (key,)) for key in keys]
+        return values
+
+    def string(self, value, path):
+        if not isinstance(value, str):
+            raise SchemaError(self.artifact, path, f'expected a string, got {value!r}')
+        return value
+
+    def numbered(self, name, path):
+        # "set 1", "bearing 3", "channel 5", "Ch5" -> 1, 3, 5, 5
+        digits = re.search(r'\d+$', name)
+        if digits is None:
+            raise SchemaError(self.artifact, path, 'expected a name ending in a number')
+        return int(digits.group())
+
+
+def _column(values, columns, name):
+    # a float read from row self._row of the owner's ``values`` array
+    index = columns.index(name)
+    return property(lambda self: float(getattr(self._owner, values)[self._row, index]))
+
+
+def _frozen(rows, columns):
+    values = np.array(rows, dtype=float).reshape(len(rows), columns)
+    values.flags.writeable = False
+    return values
+
+
+class Channel:
+    """Late vs early stage changes of one channel, in percent."""
+
+    __slots__ = ('_owner', '_row', 'name', 'number')
+
+    def __init__(self, owner, row, name, number):
+        self._owner = owner
+        self._row = row
+        self.name = name
+        self.number = number
+
+    peak = _column('channel_values', CHANNEL_COLUMNS, 'peak')
+    mean = _column('channel_values', CHANNEL_COLUMNS, 'mean')
+    total_energy = _column('channel_values', CHANNEL_COLUMNS, 'total_energy')
+    low_band_change = _column('channel_values', CHANNEL_COLUMNS, 'low_band_change')
+    mid_band_change = _column('channel_values', CHANNEL_COLUMNS, 'mid_band_change')
+    high_band_change = _column('channel_values', CHANNEL_COLUMNS, 'high_band_change')
+
+    @property
+    def values(self):
+        # read-only row of the owner's channel_values, in CHANNEL_COLUMNS order
+        return self._owner.channel_values[self._row]
+
+    def band_changes(self):
+        return dict(zip(BAND_KEYS, self._owner.band_changes[self._row].tolist()))
+
+
+class Bearing:
+    __slots__ = ('name', 'number', 'set_name', 'set_number', 'failure_point_percentage', 'channels')
+
+    def __init__(self, name, number, set_name, set_number, failure_point_percentage, channels):
+        self.name = name
+        self.number = number
+        self.set_name = set_name
+        self.set_number = set_number
+        self.failure_point_percentage = failure_point_percentage
+        self.channels = channels
+
+    def channel(self, number):
+        return next((channel for channel in self.channels if channel.number == number), None)
+
+
+class Set:
+    __slots__ = ('name', 'number', 'bearings')
+
+    def __init__(self, name, number, bearings):
+        self.name = name
+        self.number = number
+        self.bearings = bearings
+
+
+class BearingAnalysis:
+    """
+    bearing_analysis_results.json: sets of bearings of channels. The flat
+    ``bearings`` and ``channels`` tuples and the index behind ``bearing()``
+    are built once, with the rest of the model.
+    """
+
+    __slots__ = ('sets', 'bearings', 'channels', 'channel_values', '_by_number')
+
+    @classmethod
+    def from_json(cls, data):
+        check = _Validator('bearing_analysis_results')
+        analysis = cls()
+        rows = []
+        sets = []
+        for set_name, set_data in check.mapping(data, ()).items():
+            set_number = check.numbered(set_name, (set_name,))
+            bearings = []
+            for bearing_name, bearing_data in check.mapping(set_data, (set_name,)).items():
+                path = (set_name, bearing_name)
+                check.mapping(bearing_data, path, ['failure_point_percentage', 'channels'])
+                channels = []
+                for channel_name, channel_data in check.mapping(bearing_data['channels'], path + ('channels',)).items():
+                    channel_path = path + ('channels', channel_name)
+                    changes = check.mapping(channel_data, channel_path, ['changes'])['changes']
+                    check.mapping(changes, channel_path + ('changes',), ['magnitude', 'frequency_bands'])
+                    rows.append([
+                        *check.numbers(changes['magnitude'], channel_path + ('changes', 'magnitude'), MAGNITUDES),
+                        *check.numbers(changes['frequency_bands'], channel_path + ('changes', 'frequency_bands'), BAND_KEYS),
+                    ])
+                    channels.append(Channel(analysis, len(rows) - 1, channel_name, check.numbered(channel_name, channel_path)))
+                bearings.append(Bearing(
+                    bearing_name,
+                    check.numbered(bearing_name, path),
+                    set_name,
+                    set_number,
+                    check.number(bearing_data['failure_point_percentage'], path + ('failure_point_percentage',)),
+                    tuple(channels),
+                ))
+            sets.append(Set(set_name, set_number, tuple(bearings)))
+        analysis.sets = tuple(sets)
+        analysis.bearings = tuple(bearing for set_ in analysis.sets for bearing in set_.bearings)
+        # in channel_values row order
+        analysis.channels = tuple(channel for bearing in analysis.bearings for channel in bearing.channels)
+        analysis.channel_values = _frozen(rows, len(CHANNEL_COLUMNS))
+        analysis._by_number = {}
+        for bearing in analysis.bearings:
+            analysis._by_number.setdefault((bearing.set_number, bearing.number), bearing)
+        return analysis
+
+    @property
+    def magnitudes(self):
+        return self.channel_values[:, :len(MAGNITUDES)]
+
+    @property
+    def band_changes(self):
+        return self.channel_values[:, len(MAGNITUDES):]
+
+    def bearing(self, set_number, number):
+        return self._by_number.get((set_number, number))
+
+
+class DegradationChannel:
+    """One channel of a failure; its arrays are (ratio or stage, band, metric)."""
+
+    __slots__ = ('_owner', '_row', 'label', 'name', 'number')
+
+    def __init__(self, owner, row, label, name, number):
+        self._owner = owner
+        self._row = row
+        self.label = label
+        self.name = name
+        self.number = number
+
+    @property
+    def ratios(self):
+        return self._owner.ratios[self._row]
+
+    @property
+    def rates(self):
+        return self._owner.rates[self._row]
+
+    @property
+    def stability(self):
+        return self._owner.stability[self._row]
+
+
+class DegradationFeatures:
+    """
+    degradation_features.json: per failure and channel, the ratios, rates and
+    stability of every band metric. ``ratios`` is (channels, ratio, band,
+    metric), ``rates`` and ``stability`` are (channels, stage, band, metric).
+    """
+
+    __slots__ = ('channels', 'ratios', 'rates', 'stability')
+
+    @classmethod
+    def from_json(cls, data):
+        check = _Validator('degradation_features')
+        degradation = cls()
+        fields = {'ratios': RATIOS, 'rates': features.STAGES, 'stability': features.STAGES}
+        channels = []
+        # values in (channel, band, metric, field key) order, split into the field arrays at the end
+        values = []
+        for label, label_data in check.mapping(data, ()).items():
+            for channel_name, bands in check.mapping(label_data, (label,)).items():
+                path = (label, channel_name)
+                check.mapping(bands, path, features.BANDS)
+                for band in features.BANDS:
+                    check.mapping(bands[band], path + (band,), features.METRICS)
+                    for metric in features.METRICS:
+                        metric_path = path + (band, metric)
+                        metric_data = check.mapping(bands[band][metric], metric_path, fields)
+                        for field, keys in fields.items():
+                            values += check.numbers(metric_data[field], metric_path + (field,), keys)
+                channels.append(DegradationChannel(degradation, len(channels), label, channel_name, check.numbered(channel_name, path)))
+        degradation.channels = tuple(channels)
+
+        width = sum(len(keys) for keys in fields.values())
+        values = np.array(values, dtype=float).reshape(len(channels), len(features.BANDS), len(features.METRICS), width)
+        offset = 0
+        for field, keys in fields.items():
+            array = np.ascontiguousarray(values[..., offset:offset + len(keys)].transpose(0, 3, 1, 2))
+            array.flags.writeable = False
+            setattr(degradation, field, array)
+            offset += len(keys)
+        return degradation
+
+    @property
+    def labels(self):
+        return list(dict.fromkeys(channel.label for channel in self.channels))
+
+
+class PredictionStage:
+    __slots__ = ('_owner', '_row', 'life_stage')
+
+    def __init__(self, owner, row, life_stage):
+        self._owner = owner
+        self._row = row
+        self.life_stage = life_stage
+
+    actual_hours_remaining = _column('stage_values', STAGE_COLUMNS, 'actual_hours_remaining')
+    predicted_hours = _column('stage_values', STAGE_COLUMNS, 'predicted_hours')
+    error_hours = _column('stage_values', STAGE_COLUMNS, 'error_hours')
+    error_days = _column('stage_values', STAGE_COLUMNS, 'error_days')
+    accuracy_percentage = _column('stage_values', STAGE_COLUMNS, 'accuracy_percentage')
+
+    @property
+    def values(self):
+        # read-only row of the owner's stage_values, in STAGE_COLUMNS order
+        return self._owner.stage_values[self._row]
+
+
+class BearingPrediction:
+    __slots__ = ('label', 'average_accuracy', 'timeline')
+
+    def __init__(self, label, average_accuracy, timeline):
+        self.label = label
+        self.average_accuracy = average_accuracy
+        self.timeline = timeline
+
+
+class PredictionAnalysis:
+    """
+    prediction_analysis.json: fleet-wide performance and a timeline per
+    bearing. An average accuracy outside 0-100 is kept but flagged in
+    ``error_message`` for the template to show.
+    """
+
+    __slots__ = ('average_accuracy', 'average_error_days', 'error_message', 'bearings', 'stage_values')
+
+    @classmethod
+    def from_json(cls, data):
+        check = _Validator('prediction_analysis')
+        analysis = cls()
+        check.mapping(data, (), ['model_performance', 'bearing_predictions'])
+        analysis.average_accuracy, analysis.average_error_days = check.numbers(
+            data['model_performance'], ('model_performance',), ['average_accuracy', 'average_error_days'],
+        )
+        analysis.error_message = '' if 0 <= analysis.average_accuracy <= 100 else 'Invalid average accuracy percentage'
+
+        rows = []
+        bearings = []
+        for label, bearing_data in check.mapping(data['bearing_predictions'], ('bearing_predictions',)).items():
+            path = ('bearing_predictions', label)
+            check.mapping(bearing_data, path, ['average_accuracy', 'timeline'])
+            timeline = []
+            for position, stage in enumerate(check.sequence(bearing_data['timeline'], path + ('timeline',))):
+                stage_path = path + ('timeline', position)
+                check.mapping(stage, stage_path, ['life_stage', 'predictions'])
+                predictions = check.mapping(stage['predictions'], stage_path + ('predictions',), ['error_metrics'])
+                rows.append([
+                    *check.numbers(predictions, stage_path + ('predictions',), STAGE_COLUMNS[:2]),
+                    *check.numbers(predictions['error_metrics'], stage_path + ('predictions', 'error_metrics'), list(ERROR_METRICS)),
+                ])
+                # the same few stage names repeat for every bearing
+                life_stage = sys.intern(check.string(stage['life_stage'], stage_path + ('life_stage',)))
+                timeline.append(PredictionStage(analysis, len(rows) - 1, life_stage))
+            bearings.append(BearingPrediction(label, check.number(bearing_data['average_accuracy'], path + ('average_accuracy',)), tuple(timeline)))
+        analysis.bearings = tuple(bearings)
+        analysis.stage_values = _frozen(rows, len(STAGE_COLUMNS))
+        return analysis
+
+    def bearing(self, label):
+        return next((bearing for bearing in self.bearings if bearing.label == label), None)
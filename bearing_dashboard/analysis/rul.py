@@ -0,0 +1,450 @@
+"""
+Remaining-useful-life estimates computed from the degradation features,
+for every bearing in degradation_features.json.
+
+The inputs of a bearing at a stage are, per metric and averaged over bands
+and channels:
+
+- growth: asinh(stage mean / baseline mean - 1), 0 in the early stage
+- instability: log of the stage standard deviation over the early one
+
+Inputs at a fraction of life are interpolated between the stage centres.
+The model is a ridge regression from the inputs to the logit of the life
+fraction the bearing has used. It is calibrated on the bearings of
+prediction_analysis.json, whose timelines give the fraction at each life
+stage. A bearing's current inputs are those of its latest stage, and its
+hours remaining follow from the hours it has run:
+
+    hours remaining = elapsed hours * (1 - fraction) / fraction
+
+The hours run are those from the first to the last processed snapshot of
+its set in the feature checkpoint (snapshot file names are timestamps), or
+given by the caller as ``SET:BEARING:HOURS`` (``parse_elapsed``). Without
+either a bearing only gets its life fraction.
+
+Accuracy is validated leaving one bearing out: every shipped timeline is
+scored by a model fitted to the other bearings. The runs end at the
+failure, so the hours run at a life stage are that fraction of the run's
+hours, and the actual hours remaining of the timeline are only compared
+against. Error metrics use the same definitions as
+prediction_analysis.json. Without the hours run there are no errors in
+hours or days, and accuracy is computed on the hours remaining per hour
+run, (1 - fraction) / fraction.
+
+``predict`` scores a whole fleet in one matrix product. Its results are
+memoized under a hash of the model and the input arrays, so repeating a
+request with unchanged features costs one hash.
+"""
+import hashlib
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+from . import feature_checkpoint, features, history, loading, repository
+
+
+INPUTS = [f'{kind}_{metric.lower()}' for kind in ['growth', 'instability'] for metric in features.METRICS]
+STAGE_CENTRES = (np.arange(len(features.STAGES)) + 0.5) / len(features.STAGES)
+LIFE_STAGE = re.compile(r'(\d+(?:\.\d+)?)%')
+RIDGE = 10.0
+MEMO_SIZE = 64
+# keeps a fraction of exactly 0 or 1 from dividing by zero
+EPSILON = 1e-6
+
+
+def channel_inputs(ratios, stability):
+    """(channels, stages, INPUTS) array from results.DegradationFeatures ratios and stability."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = np.arcsinh(ratios - 1).mean(axis=2)
+        spread = np.log(stability + EPSILON)
+    growth = np.concatenate([np.zeros_like(growth[:, :1]), growth], axis=1)
+    instability = (spread - spread[:, :1]).mean(axis=2)
+    return np.concatenate([growth, instability], axis=2)
+
+
+def bearing_inputs(degradation):
+    """Labels and (bearings, stages, INPUTS) inputs of a results.DegradationFeatures, channels averaged."""
+    labels = degradation.labels
+    index = {label: i for i, label in enumerate(labels)}
+    rows = np.array([index[channel.label] for channel in degradation.channels], dtype=np.intp)
+    values = channel_inputs(degradation.ratios, degradation.stability)
+    inputs = np.zeros((len(labels),) + values.shape[1:])
+    np.add.at(inputs, rows, values)
+    inputs /= np.bincount(rows, minlength=len(labels))[:, None, None]
+    return labels, inputs
+
+
+def at_fractions(stage_inputs, fractions):
+    """(bearings, fractions, INPUTS) inputs interpolated at the life ``fractions`` of every bearing."""
+    fractions = np.asarray(fractions, dtype=np.float64)
+    # piecewise-linear weights of each stage centre, the same for every bearing
+    eye = np.eye(len(STAGE_CENTRES))
+    weights = np.stack([np.interp(fractions, STAGE_CENTRES, eye[i]) for i in range(len(STAGE_CENTRES))], axis=-1)
+    return np.einsum('fs,bsi->bfi', weights, stage_inputs)
+
+
+def life_fraction(stage):
+    """0.25 for a life stage named '25% through life'."""
+    match = LIFE_STAGE.search(stage)
+    if match is None:
+        raise ValueError(f'No percentage in life stage {stage!r}')
+    return float(match.group(1)) / 100
+
+
+def remaining_per_hour(fraction):
+    """Hours remaining per hour run at a life ``fraction``."""
+    fraction = np.clip(fraction, EPSILON, 1 - EPSILON)
+    return (1 - fraction) / fraction
+
+
+def error_metrics(predicted, actual):
+    """Absolute error in hours and days, and accuracy as 100 - error in percent of the actual."""
+    hours = np.abs(predicted - actual)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        accuracy = np.where(actual > 0, 100 * (1 - hours / actual), np.nan)
+    return {'hours': hours, 'days': hours / 24, 'accuracy_percentage': accuracy}
+
+
+@dataclass(frozen=True)
+class Model:
+    mean: np.ndarray
+    scale: np.ndarray
+    weights: np.ndarray
+    intercept: float
+
+    @classmethod
+    def fit(cls, inputs, fractions, ridge=RIDGE):
+        """Ridge regression of logit(fractions) on (samples, INPUTS) ``inputs``."""
+        fractions = np.clip(fractions, EPSILON, 1 - EPSILON)
+        target = np.log(fractions / (1 - fractions))
+        mean = inputs.mean(axis=0)
+        scale = inputs.std(axis=0)
+        scale[scale == 0] = 1.0
+        standard = (inputs - mean) / scale
+        weights = np.linalg.solve(standard.T @ standard + ridge * np.eye(len(mean)), standard.T @ (target - target.mean()))
+        return cls(mean, scale, weights, float(target.mean()))
+
+    @property
+    def digest(self):
+        sha = hashlib.sha256()
+        for array in [self.mean, self.scale, self.weights, np.array([self.intercept])]:
+            sha.update(np.ascontiguousarray(array, dtype=np.float64).tobytes())
+        return sha.hexdigest()
+
+    def life_fraction(self, inputs):
+        """Estimated fraction of life used, for inputs of any leading shape."""
+        # standardising folded into the coefficients: one matrix-vector product over the inputs
+        coefficients = self.weights / self.scale
+        logit = inputs @ coefficients + (self.intercept - self.mean @ coefficients)
+        return 1 / (1 + np.exp(-logit))
+
+    def hours_remaining(self, inputs, elapsed, fraction=None):
+        if fraction is None:
+            fraction = self.life_fraction(inputs)
+        return elapsed * remaining_per_hour(fraction)
+
+
+class Memo:
+    """Least recently used results of ``predict``, keyed by the hash of its inputs."""
+
+    def __init__(self, size=MEMO_SIZE):
+        self.size = size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+memo = Memo()
+
+
+def input_key(model, *arrays):
+    sha = hashlib.sha256(model.digest.encode())
+    for array in arrays:
+        array = np.ascontiguousarray(array, dtype=np.float64)
+        sha.update(repr(array.shape).encode())
+        # hashed through the buffer protocol, without a copy
+        sha.update(array.reshape(-1).view(np.uint8))
+    return sha.hexdigest()
+
+
+def predict(model, inputs, elapsed, actual=None):
+    """
+    Hours remaining for (bearings, fractions, INPUTS) ``inputs`` after
+    (bearings, fractions) ``elapsed`` hours, plus the error metrics when the
+    ``actual`` hours remaining are known. Arrays are read-only and shared
+    between calls with the same inputs.
+    """
+    arrays = [inputs, elapsed] if actual is None else [inputs, elapsed, actual]
+    key = input_key(model, *arrays)
+    cached = memo.get(key)
+    if cached is not None:
+        return cached
+
+    fraction = model.life_fraction(inputs)
+    predicted = {'life_fraction': fraction, 'predicted_hours': model.hours_remaining(inputs, elapsed, fraction)}
+    if actual is not None:
+        predicted.update(error_metrics(predicted['predicted_hours'], actual))
+    for array in predicted.values():
+        array.flags.writeable = False
+    memo.put(key, predicted)
+    return predicted
+
+
+def bearing_numbers(labels, failures=features.FAILURES):
+    """(set, bearing) of each degradation label, (None, None) for a failure that isn't configured."""
+    by_label = {failure['label']: (failure['set'], failure['bearing']) for failure in failures}
+    return [by_label.get(label, (None, None)) for label in labels]
+
+
+def training_set(labels, stage_inputs, predictions, failures=features.FAILURES):
+    """
+    Every predicted bearing with degradation features as (bearing prediction,
+    set, bearing) rows, their (bearings, stages) life fractions and actual
+    hours remaining, NaN past the end of a shorter timeline, and inputs with
+    a trailing INPUTS axis.
+    """
+    index = {label: i for i, label in enumerate(labels)}
+    by_bearing = {(failure['set'], failure['bearing']): failure['label'] for failure in failures}
+
+    rows = []
+    for bearing in predictions.bearings:
+        match = loading.PREDICTION_BEARING.search(bearing.label)
+        numbers = (int(match.group(1)), int(match.group(2))) if match else None
+        if by_bearing.get(numbers) in index and bearing.timeline:
+            rows.append((bearing, *numbers))
+    stages = max((len(bearing.timeline) for bearing, _, _ in rows), default=0)
+
+    fractions = np.full((len(rows), stages), np.nan)
+    actual = np.full((len(rows), stages), np.nan)
+    inputs = np.zeros((len(rows), stages, len(INPUTS)))
+    for i, (bearing, set_number, number) in enumerate(rows):
+        count = len(bearing.timeline)
+        fractions[i, :count] = [life_fraction(stage.life_stage) for stage in bearing.timeline]
+        actual[i, :count] = [stage.actual_hours_remaining for stage in bearing.timeline]
+        row = index[by_bearing[(set_number, number)]]
+        inputs[i] = at_fractions(stage_inputs[[row]], np.nan_to_num(fractions[i]))[0]
+    return rows, fractions, inputs, actual
+
+
+def leave_one_out(inputs, fractions):
+    """Life fractions of every bearing's stages from a model fitted to the other bearings."""
+    known = ~np.isnan(fractions)
+    estimated = np.full(fractions.shape, np.nan)
+    for i in range(len(fractions)):
+        others = known.copy()
+        others[i] = False
+        if others.any():
+            estimated[i] = Model.fit(inputs[others], fractions[others]).life_fraction(inputs[i])
+    return np.where(known, estimated, np.nan)
+
+
+def _run_hours(raw):
+    # hours from the first to the last processed snapshot of each set in a checkpoint manifest
+    hours = {}
+    for set_number, names in feature_checkpoint.snapshot_names(raw).items():
+        try:
+            first, last = history.snapshot_time(names[0]), history.snapshot_time(names[-1])
+        except ValueError:
+            # not timestamps, so the run length is unknown
+            continue
+        hours[set_number] = (last - first) / 3600
+    return hours
+
+
+_manifests = {}
+
+
+def snapshot_hours():
+    """Hours run by every set in the feature checkpoint, from its snapshot timestamps."""
+    path = os.path.join(feature_checkpoint.checkpoint_dir(), feature_checkpoint.MANIFEST_FILE)
+    manifest = _manifests.get(path)
+    if manifest is None:
+        manifest = _manifests.setdefault(path, repository.CachedArtifact(path, parser=_run_hours))
+    try:
+        return manifest.get()
+    except FileNotFoundError:
+        return {}
+
+
+def parse_elapsed(values):
+    """{(set, bearing): hours} of ``SET:BEARING:HOURS`` strings; raises ValueError with a message for the client."""
+    elapsed = {}
+    for value in values:
+        parts = value.split(':')
+        try:
+            if len(parts) != 3:
+                raise ValueError
+            set_number, bearing, hours = int(parts[0]), int(parts[1]), float(parts[2])
+        except ValueError:
+            raise ValueError(f'elapsed must be SET:BEARING:HOURS, got {value!r}')
+        if not (math.isfinite(hours) and hours > 0):
+            raise ValueError(f'elapsed hours must be positive, got {value!r}')
+        elapsed[(set_number, bearing)] = hours
+    return elapsed
+
+
+def elapsed_hours(numbers, given=None):
+    """Hours run by each (set, bearing), NaN when unknown, and where they came from."""
+    given = given or {}
+    runs = snapshot_hours()
+    hours, sources = np.full(len(numbers), np.nan), []
+    for i, (set_number, bearing) in enumerate(numbers):
+        if (set_number, bearing) in given:
+            hours[i] = given[(set_number, bearing)]
+            sources.append('request')
+        elif set_number in runs:
+            hours[i] = runs[set_number]
+            sources.append('snapshots')
+        else:
+            sources.append(None)
+    return hours, sources
+
+
+_lock = threading.Lock()
+_current = {'versions': None, 'value': None}
+
+
+def current():
+    """
+    Model fitted to every shipped timeline, and what it was fitted from with
+    the leave-one-bearing-out life fractions; refitted when an artifact changes.
+    """
+    degradation = repository.get_artifact('degradation_features')
+    predictions = repository.get_artifact('prediction_analysis')
+    versions = (repository.ARTIFACTS['degradation_features'].version, repository.ARTIFACTS['prediction_analysis'].version)
+    with _lock:
+        if _current['versions'] != versions:
+            labels, stage_inputs = bearing_inputs(degradation)
+            rows, fractions, inputs, actual = training_set(labels, stage_inputs, predictions)
+            known = ~np.isnan(fractions)
+            if not known.any():
+                raise ValueError('No shipped prediction timeline matches a bearing with degradation features')
+            fitted = {
+                'labels': labels,
+                'stage_inputs': stage_inputs,
+                'rows': rows,
+                'fractions': fractions,
+                'actual': actual,
+                'validated': leave_one_out(inputs, fractions),
+                'shipped_accuracy': predictions.average_accuracy,
+            }
+            _current['value'] = (Model.fit(inputs[known], fractions[known]), fitted)
+            _current['versions'] = versions
+        return _current['value']
+
+
+def _number(value, digits=1):
+    # NaN where the hours run are unknown: null in JSON
+    value = float(value)
+    return round(value, digits) if math.isfinite(value) else None
+
+
+def _mean(values):
+    values = values[~np.isnan(values)]
+    return float(values.mean()) if len(values) else None
+
+
+def validation(fitted, given=None):
+    """Leave-one-bearing-out scores of the shipped timelines, shaped like prediction_analysis.json."""
+    rows, fractions, actual, validated = fitted['rows'], fitted['fractions'], fitted['actual'], fitted['validated']
+    run_hours, _ = elapsed_hours([(set_number, number) for _, set_number, number in rows], given)
+    predicted = fractions * run_hours[:, None] * remaining_per_hour(validated)
+    metrics = error_metrics(predicted, actual)
+    # without the hours run, the same accuracy on hours remaining per hour run
+    per_hour = error_metrics(remaining_per_hour(validated), remaining_per_hour(fractions))['accuracy_percentage']
+    accuracy = np.where(np.isnan(predicted), per_hour, metrics['accuracy_percentage'])
+    accuracy[np.isnan(fractions)] = np.nan
+
+    bearing_predictions = {}
+    for i, (bearing, _, _) in enumerate(rows):
+        timeline = []
+        for j, stage in enumerate(bearing.timeline):
+            timeline.append({
+                'life_stage': stage.life_stage,
+                'predictions': {
+                    'actual_hours_remaining': float(actual[i, j]),
+                    'predicted_life_fraction': round(float(validated[i, j]), 4),
+                    'predicted_hours': _number(predicted[i, j]),
+                    'error_metrics': {
+                        'hours': _number(metrics['hours'][i, j]),
+                        'days': _number(metrics['days'][i, j]),
+                        'accuracy_percentage': _number(accuracy[i, j]),
+                    },
+                },
+            })
+        bearing_predictions[bearing.label] = {
+            'average_accuracy': _mean(accuracy[i]),
+            'shipped_average_accuracy': bearing.average_accuracy,
+            'timeline': timeline,
+        }
+    return {
+        'method': 'leave one bearing out',
+        'average_accuracy': _mean(accuracy.ravel()),
+        'average_error_days': _mean(metrics['days'].ravel()),
+        'shipped_average_accuracy': fitted['shipped_accuracy'],
+        'bearing_predictions': bearing_predictions,
+    }
+
+
+def current_predictions(elapsed=None):
+    """
+    Every bearing with degradation features scored from its latest stage,
+    and the out-of-sample validation of the model on the shipped timelines.
+    ``elapsed`` maps (set, bearing) to hours run, ahead of the snapshot timestamps.
+    """
+    model, fitted = current()
+    numbers = bearing_numbers(fitted['labels'])
+    hours, sources = elapsed_hours(numbers, elapsed)
+    scored = predict(model, fitted['stage_inputs'][:, -1:], hours[:, None])
+    bearings = []
+    for i, label in enumerate(fitted['labels']):
+        predicted = scored['predicted_hours'][i, 0]
+        bearings.append({
+            'label': label,
+            'set': numbers[i][0],
+            'bearing': numbers[i][1],
+            'life_fraction': round(float(scored['life_fraction'][i, 0]), 4),
+            'elapsed_hours': _number(hours[i]),
+            'elapsed_source': sources[i],
+            'predicted_hours': _number(predicted),
+            'predicted_days': _number(predicted / 24),
+        })
+    return {'bearings': bearings, 'validation': validation(fitted, elapsed)}
+
+
+def synthetic_inputs(bearings, fractions=(0.25, 0.5, 0.75, 0.9), seed=0):
+    """Inputs and elapsed hours of a random fleet, for benchmarks."""
+    rng = np.random.default_rng(seed)
+    stage_inputs = np.cumsum(rng.gamma(1.0, 0.3, size=(bearings, len(features.STAGES), len(INPUTS))), axis=1)
+    stage_inputs[:, 0] = 0
+    inputs = at_fractions(stage_inputs, fractions)
+    elapsed = rng.uniform(10, 1000, size=(bearings, 1)) * np.asarray(fractions)
+    return inputs, elapsed
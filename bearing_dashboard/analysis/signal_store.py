@@ -0,0 +1,135 @@
+"""
+Memory-mapped binary store for raw vibration signals.
+
+Every channel of every set is a flat little-endian float32 file; a small
+``index.json`` next to them records the sample rate, start time, channel files
+and bearing/channel map of each set:
+
+    <SIGNAL_STORE_DIR>/index.json
+    <SIGNAL_STORE_DIR>/set1/channel5.f32
+
+Channels are opened with ``numpy.memmap``, so slicing a time range only pages
+in that range, and the pages are shared by all workers through the OS page
+cache instead of being copied into each process.
+"""
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+from django.conf import settings
+
+from .repository import CachedArtifact, atomic_write
+
+
+DTYPE = '<f4'
+INDEX_FILE = 'index.json'
+INDEX_VERSION = 1
+
+
+class SignalStore:
+    """Read side of the store, built from the bytes of ``index.json``."""
+
+    def __init__(self, root, raw_index):
+        self.root = root
+        self.index = json.loads(raw_index)
+        if self.index.get('version') != INDEX_VERSION:
+            raise ValueError(f'Unsupported signal store version: {self.index.get("version")}')
+        self.version = hashlib.sha256(raw_index).hexdigest()
+        self._lock = threading.Lock()
+        self._maps = {}
+
+    def sets(self):
+        return sorted(int(set_number) for set_number in self.index['sets'])
+
+    def set_info(self, set_number):
+        return self.index['sets'][str(set_number)]
+
+    def has_set(self, set_number):
+        return str(set_number) in self.index['sets']
+
+    def bearings(self, set_number):
+        return {int(b): channels for b, channels in self.set_info(set_number)['bearings'].items()}
+
+    def channels(self, set_number):
+        return sorted(int(c) for c in self.set_info(set_number)['channels'])
+
+    def values(self, set_number, channel):
+        key = (set_number, channel)
+        with self._lock:
+            if key not in self._maps:
+                info = self.set_info(set_number)
+                entry = info['channels'][str(channel)]
+                path = os.path.join(self.root, entry['file'])
+                self._maps[key] = np.memmap(path, dtype=info['dtype'], mode='r', shape=(entry['samples'],))
+            return self._maps[key]
+
+
+def store_dir():
+    return str(settings.SIGNAL_STORE_DIR)
+
+
+_STORES = {}
+
+
+def _store_artifact(root):
+    if root not in _STORES:
+        path = os.path.join(root, INDEX_FILE)
+        _STORES[root] = CachedArtifact(path, parser=lambda raw: SignalStore(root, raw))
+    return _STORES[root]
+
+
+def open_store(root=None):
+    """The store at ``root`` (SIGNAL_STORE_DIR by default), or None if it hasn't been built."""
+    try:
+        return _store_artifact(root or store_dir()).get()
+    except FileNotFoundError:
+        return None
+
+
+def index_mtime(root=None):
+    return os.stat(_store_artifact(root or store_dir()).path).st_mtime
+
+
+def write_set(root, set_number, signals, bearings):
+    """
+    Write all channels of one set and register them in the index.
+
+    ``signals`` maps channel numbers to ``signals.Signal`` objects sharing one sample
+    rate and start time, ``bearings`` maps bearing numbers to their channels.
+    """
+    first = next(iter(signals.values()))
+    set_dir = os.path.join(root, f'set{set_number}')
+    os.makedirs(set_dir, exist_ok=True)
+
+    channels = {}
+    for channel, signal in sorted(signals.items()):
+        if signal.sample_rate != first.sample_rate or signal.start_time != first.start_time:
+            raise ValueError(f'Channel {channel} of set {set_number} has a different time base')
+        values = np.ascontiguousarray(signal.values, dtype=DTYPE)
+        name = f'channel{channel}.f32'
+        atomic_write(os.path.join(set_dir, name), values.tobytes())
+        channels[str(channel)] = {
+            'file': f'set{set_number}/{name}',
+            'samples': len(values),
+            'sha256': hashlib.sha256(values.tobytes()).hexdigest(),
+        }
+
+    index_path = os.path.join(root, INDEX_FILE)
+    try:
+        with open(index_path, 'rb') as file:
+            index = json.load(file)
+    except FileNotFoundError:
+        index = {'version': INDEX_VERSION, 'sets': {}}
+
+    index['sets'][str(set_number)] = {
+        'dtype': DTYPE,
+        'sample_rate': first.sample_rate,
+        'start_time': first.start_time,
+        'channels': channels,
+        'bearings': {str(b): list(c) for b, c in bearings.items()},
+    }
+    payload = json.dumps(index, indent=2, sort_keys=True).encode()
+    atomic_write(index_path, payload)
+    return index['sets'][str(set_number)]
@@ -0,0 +1,228 @@
+"""
+Raw vibration signals behind the time-domain plots.
+
+Signals are served from the memory-mapped binary store (see signal_store.py)
+when it has been built. Otherwise the traces are read out of the Plotly
+fragments in templates/analysis/raw_signals once per worker (re-read only when
+a fragment changes) and kept as float32 arrays. Either way a time window is
+sliced by index arithmetic and downsampled for the browser instead of
+shipping every sample.
+"""
+import json
+import math
+import os
+import re
+
+import numpy as np
+
+from . import downsampling, plots, signal_store
+from .repository import CachedArtifact
+
+
+# IMS test rigs: set 1 has two accelerometers per bearing, sets 2 and 3 have one
+CHANNEL_MAP = {
+    1: {1: [1, 2], 2: [3, 4], 3: [5, 6], 4: [7, 8]},
+    2: {1: [1], 2: [2], 3: [3], 4: [4]},
+    3: {1: [1], 2: [2], 3: [3], 4: [4]},
+}
+
+DEFAULT_POINTS = 2000
+MAX_POINTS = 20000
+
+RAW_FRAGMENT = re.compile(r'^raw_signals_set(\d+)\.html$')
+
+
+class Signal:
+    """An evenly sampled signal; sample ``i`` is taken at ``start_time + i / sample_rate``."""
+
+    __slots__ = ('values', 'sample_rate', 'start_time')
+
+    def __init__(self, values, sample_rate, start_time=0.0):
+        self.values = values
+        self.sample_rate = sample_rate
+        self.start_time = start_time
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def end_time(self):
+        return self.start_time + (len(self.values) - 1) / self.sample_rate
+
+    def window(self, start=None, end=None):
+        """(x, y) of the samples between ``start`` and ``end`` seconds, inclusive."""
+        # positions are clipped before rounding, so a far-off bound can't overflow
+        first, last = 0, len(self.values)
+        if start is not None:
+            first = math.ceil(np.clip((start - self.start_time) * self.sample_rate - 1e-9, first, last))
+        if end is not None:
+            last = math.floor(np.clip((end - self.start_time) * self.sample_rate + 1e-9, -1, last - 1)) + 1
+        last = max(first, last)
+        x = self.start_time + np.arange(first, last) / self.sample_rate
+        return x, self.values[first:last]
+
+
+class RawSignalFigure:
+    """A parsed raw-signal fragment: its HTML around the trace list, the traces and their signals."""
+
+    __slots__ = ('head', 'tail', 'traces', 'signals')
+
+    def __init__(self, head, tail, traces, signals):
+        self.head = head
+        self.tail = tail
+        self.traces = traces
+        self.signals = signals
+
+
+def _channel_number(trace_name):
+    match = re.search(r'(\d+)$', trace_name or '')
+    if match is None:
+        raise ValueError(f'Trace name without a channel number: {trace_name!r}')
+    return int(match.group(1))
+
+
+def to_signal(x, y):
+    x = np.asarray(x, dtype=np.float64)
+    if len(x) < 2:
+        raise ValueError('A signal needs at least two samples')
+    step = x[1] - x[0]
+    if step <= 0 or not np.allclose(np.diff(x), step, rtol=1e-4, atol=0):
+        raise ValueError('Raw signal is not evenly sampled')
+    return Signal(np.asarray(y, dtype=np.float32), sample_rate=round(1 / step, 6), start_time=float(x[0]))
+
+
+def parse_plotly_figure(raw):
+    html = raw.decode('utf-8')
+    call = html.index('Plotly.newPlot(')
+    # arguments are the div id, the trace list and the layout
+    start = html.index('[', html.index(',', call))
+    traces, end = json.JSONDecoder().raw_decode(html, start)
+
+    signals = {}
+    for trace in traces:
+        signals[_channel_number(trace.get('name'))] = to_signal(trace.pop('x'), trace.pop('y'))
+    return RawSignalFigure(html[:start], html[end:], traces, signals)
+
+
+_FIGURES = {}
+
+
+def _figure_artifact(set_number):
+    if set_number not in _FIGURES:
+        path = plots.plot_path('raw', f'raw_signals_set{set_number}.html')
+        _FIGURES[set_number] = CachedArtifact(path, parser=parse_plotly_figure)
+    return _FIGURES[set_number]
+
+
+def raw_figure(set_number):
+    """The parsed raw-signal fragment of a set; raises FileNotFoundError if there is none."""
+    return _figure_artifact(set_number).get()
+
+
+def _stored_set(set_number):
+    store = signal_store.open_store()
+    if store is not None and store.has_set(set_number):
+        return store
+    return None
+
+
+def set_numbers():
+    store = signal_store.open_store()
+    stored = store.sets() if store is not None else []
+    return sorted(set(CHANNEL_MAP) | set(stored))
+
+
+def bearings(set_number):
+    store = _stored_set(set_number)
+    if store is not None:
+        return store.bearings(set_number)
+    return CHANNEL_MAP.get(set_number, {})
+
+
+def set_signals(set_number):
+    """channel -> Signal for one set; raises FileNotFoundError if the set has no data."""
+    store = _stored_set(set_number)
+    if store is not None:
+        info = store.set_info(set_number)
+        return {
+            channel: Signal(store.values(set_number, channel), info['sample_rate'], info['start_time'])
+            for channel in store.channels(set_number)
+        }
+    return _figure_artifact(set_number).get().signals
+
+
+def data_version(set_number):
+    """(content hash, mtime) of the data a set's signals are read from."""
+    store = _stored_set(set_number)
+    if store is not None:
+        return f'store:{store.version}', signal_store.index_mtime()
+    artifact = _figure_artifact(set_number)
+    artifact.get()
+    return artifact.version, os.stat(artifact.path).st_mtime
+
+
+def get_signal(set_number, bearing, channel):
+    """The signal of one channel; raises LookupError for unknown combinations."""
+    if channel not in bearings(set_number).get(bearing, []):
+        raise LookupError(f'Set {set_number} has no channel {channel} on bearing {bearing}')
+    try:
+        channels = set_signals(set_number)
+    except FileNotFoundError:
+        raise LookupError(f'No raw signals for set {set_number}')
+    if channel not in channels:
+        raise LookupError(f'No raw signal for channel {channel} in set {set_number}')
+    return channels[channel]
+
+
+def signal_index():
+    index = {}
+    for set_number in set_numbers():
+        try:
+            channels = set_signals(set_number)
+        except FileNotFoundError:
+            continue
+        first = next(iter(channels.values()))
+        index[str(set_number)] = {
+            'sample_rate': first.sample_rate,
+            'start_time': first.start_time,
+            'end_time': first.end_time,
+            'samples': len(first),
+            'bearings': {str(bearing): chs for bearing, chs in bearings(set_number).items()},
+        }
+    return index
+
+
+def series(signal, start=None, end=None, points=DEFAULT_POINTS, method='minmax'):
+    x, y = signal.window(start, end)
+    total = len(y)
+    x, y = downsampling.downsample(x, y, points, method)
+    return {
+        'start': float(x[0]) if len(x) else start,
+        'end': float(x[-1]) if len(x) else end,
+        'sample_rate': signal.sample_rate,
+        'total_points': total,
+        'points': len(y),
+        'method': method,
+        'x': np.round(x, 6).tolist(),
+        'y': y.astype(np.float64).round(5).tolist(),
+    }
+
+
+def render_raw_fragment(name, points=DEFAULT_POINTS):
+    """The raw-signal fragment ``name`` with every trace downsampled to ``points`` samples."""
+    match = RAW_FRAGMENT.match(name)
+    if match is None:
+        return None
+    set_number = int(match.group(1))
+    figure = raw_figure(set_number)
+    channels = set_signals(set_number)
+
+    traces = []
+    for trace in figure.traces:
+        signal = channels[_channel_number(trace.get('name'))]
+        x, y = downsampling.downsample(*signal.window(), points)
+        traces.append(dict(trace, x=np.round(x, 6).tolist(), y=y.astype(np.float64).round(5).tolist()))
+    # same escaping as plotly so the JSON is safe inside a <script> block
+    payload = json.dumps(traces, separators=(',', ':'))
+    payload = payload.replace('<', '\\u003c').replace('>', '\\u003e').replace('&', '\\u0026')
+    return figure.head + payload + figure.tail
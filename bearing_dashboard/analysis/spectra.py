@@ -0,0 +1,158 @@
+"""
+Welch-averaged power spectra and band energies of arbitrarily long signals,
+in memory bounded by the chunk size.
+
+Signals are read in fixed-size (channels, samples) chunks, from a generator
+or by slicing memory-mapped channels (see signal_store.py). Each chunk is cut
+into Hann-windowed segments overlapping by half, and the segments of every
+channel go through one batched real FFT. Between chunks only the running sum
+of segment power spectra and the samples of the unfinished segment are kept,
+so the length of the recording doesn't change the memory used.
+
+Spectra are one-sided power spectral densities with segment means removed,
+scaled like ``scipy.signal.welch`` with its defaults. Band energies integrate
+the density over features.BANDS. The frequency resolution is the sample rate
+over the segment length; ``reduce`` averages neighbouring bins for display.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from . import features, signals
+
+
+SEGMENTS = [256, 512, 1024, 2048, 4096, 8192, 16384]
+DEFAULT_SEGMENT = 4096
+# samples per channel read at a time
+CHUNK = 1 << 18
+DEFAULT_POINTS = 1000
+MAX_POINTS = 8193
+
+
+class Welch:
+    """Running Welch average over (channels, samples) blocks of one recording."""
+
+    def __init__(self, channels, sample_rate, segment=DEFAULT_SEGMENT):
+        self.sample_rate = sample_rate
+        self.segment = segment
+        self.step = segment // 2
+        # periodic Hann window, as scipy.signal.get_window('hann', segment)
+        self.window = np.hanning(segment + 1)[:-1]
+        self.power = np.zeros((channels, segment // 2 + 1))
+        self.segments = 0
+        self.samples = 0
+        self._tail = np.empty((channels, 0))
+
+    def update(self, block):
+        """Add the next samples of every channel; returns the number of segments completed."""
+        block = np.asarray(block, dtype=np.float64)
+        data = np.concatenate([self._tail, block], axis=1) if self._tail.shape[1] else block
+        count = (data.shape[1] - self.segment) // self.step + 1 if data.shape[1] >= self.segment else 0
+        if count:
+            # (channels, segments, segment) view; the only copies are the detrended frames
+            frames = sliding_window_view(data, self.segment, axis=1)[:, ::self.step][:, :count]
+            frames = (frames - frames.mean(axis=-1, keepdims=True)) * self.window
+            spectrum = np.fft.rfft(frames, axis=-1)
+            self.power += (spectrum.real ** 2 + spectrum.imag ** 2).sum(axis=1)
+            self.segments += count
+        self._tail = data[:, count * self.step:].copy()
+        self.samples += block.shape[1]
+        return count
+
+    @property
+    def frequencies(self):
+        return np.fft.rfftfreq(self.segment, d=1 / self.sample_rate)
+
+    def density(self):
+        """(channels, bins) one-sided power spectral density."""
+        if self.segments == 0:
+            raise ValueError(f'{self.samples} samples are fewer than one segment of {self.segment}')
+        psd = self.power / (self.segments * self.sample_rate * np.sum(self.window ** 2))
+        # every bin but DC, and Nyquist for an even segment, also holds the negative frequencies
+        psd[:, 1:(self.segment + 1) // 2] *= 2
+        return psd
+
+
+def chunks(channels, chunk=CHUNK):
+    """(channels, chunk) float64 blocks of equally long 1-D arrays, e.g. memmaps."""
+    length = min(len(values) for values in channels)
+    for start in range(0, length, chunk):
+        yield np.stack([np.asarray(values[start:start + chunk], dtype=np.float64) for values in channels])
+
+
+def welch(blocks, sample_rate, segment=DEFAULT_SEGMENT):
+    """Frequencies and (channels, bins) density of a stream of (channels, samples) blocks."""
+    average = None
+    for block in blocks:
+        if average is None:
+            average = Welch(len(block), sample_rate, segment)
+        average.update(block)
+    if average is None:
+        raise ValueError('No samples to analyse')
+    return average.frequencies, average.density()
+
+
+def band_energy(frequencies, psd, bands=features.BANDS):
+    """(channels, bands) power in each band, the density summed over its bins."""
+    resolution = frequencies[1] - frequencies[0]
+    masks = np.stack([(frequencies >= lo) & (frequencies < hi) for lo, hi in bands.values()])
+    return psd @ masks.T.astype(np.float64) * resolution
+
+
+def reduce(frequencies, psd, points):
+    """At most ``points`` bins, each the mean of a run of neighbouring bins."""
+    bins = len(frequencies)
+    if points >= bins:
+        return frequencies, psd
+    width = -(-bins // points)
+    buckets = -(-bins // width)
+    # pad the last bucket with NaN so every bucket has the same width
+    padded = np.full((psd.shape[0] + 1, buckets * width), np.nan)
+    padded[0, :bins] = frequencies
+    padded[1:, :bins] = psd
+    means = np.nanmean(padded.reshape(len(padded), buckets, width), axis=-1)
+    return means[0], means[1:]
+
+
+def _significant(values, digits=5):
+    return [float(f'{value:.{digits}g}') for value in values]
+
+
+def set_spectra(set_number, segment=DEFAULT_SEGMENT, points=DEFAULT_POINTS, chunk=CHUNK):
+    """
+    Spectra and band energies of every channel of a set, JSON-ready; raises
+    LookupError if the set has no signals and ValueError if they are shorter
+    than a segment.
+    """
+    try:
+        channels = signals.set_signals(set_number)
+    except FileNotFoundError:
+        raise LookupError(f'No raw signals for set {set_number}')
+    numbers = sorted(channels)
+    sample_rate = channels[numbers[0]].sample_rate
+    average = Welch(len(numbers), sample_rate, segment)
+    for block in chunks([channels[number].values for number in numbers], chunk):
+        average.update(block)
+    frequencies, psd = average.frequencies, average.density()
+    energy = band_energy(frequencies, psd)
+    frequencies, psd = reduce(frequencies, psd, points)
+
+    bearing_of = {channel: bearing for bearing, chs in signals.bearings(set_number).items() for channel in chs}
+    return {
+        'set': set_number,
+        'sample_rate': sample_rate,
+        'segment': segment,
+        'resolution_hz': sample_rate / segment,
+        'segments': average.segments,
+        'samples': average.samples,
+        'bands': {band: list(limits) for band, limits in features.BANDS.items()},
+        'frequencies': np.round(frequencies, 3).tolist(),
+        'channels': [
+            {
+                'channel': number,
+                'bearing': bearing_of.get(number),
+                'psd': _significant(psd[i]),
+                'band_energy': dict(zip(features.BANDS, _significant(energy[i]))),
+            }
+            for i, number in enumerate(numbers)
+        ],
+    }
@@ -0,0 +1,77 @@
+// Replaces the static correlation image with a heatmap of /api/correlation/,
+// with selectors for the failure types and bands it is computed over
+(function () {
+    function select(name, values) {
+        var element = document.createElement('select');
+        element.name = name;
+        element.innerHTML = '<option value="">All ' + name + 's</option>';
+        values.forEach(function (value) {
+            var option = document.createElement('option');
+            option.value = option.textContent = value;
+            element.appendChild(option);
+        });
+        return element;
+    }
+
+    function draw(plot, data) {
+        Plotly.react(plot, [{
+            type: 'heatmap',
+            z: data.matrix,
+            x: data.features,
+            y: data.features,
+            zmin: -1,
+            zmax: 1,
+            colorscale: 'RdBu',
+            reversescale: true,
+            hoverongaps: false
+        }], {
+            title: data.observations + ' observations',
+            margin: {l: 120, b: 120},
+            yaxis: {autorange: 'reversed'}
+        }, {responsive: true});
+    }
+
+    function load(container) {
+        var url = container.dataset.correlationUrl;
+        fetch(url)
+            .then(function (response) {
+                if (!response.ok) {
+                    throw new Error(response.status + ' ' + response.statusText);
+                }
+                return response.json();
+            })
+            .then(function (data) {
+                if (typeof Plotly === 'undefined') {
+                    return;
+                }
+                var controls = document.createElement('div');
+                var failures = select('failure', data.failures);
+                var bands = select('band', data.bands);
+                var plot = document.createElement('div');
+                controls.className = 'correlation-controls';
+                controls.append(failures, bands);
+                container.replaceChildren(controls, plot);
+                draw(plot, data);
+
+                function refresh() {
+                    var query = new URLSearchParams();
+                    if (failures.value) query.append('failure', failures.value);
+                    if (bands.value) query.append('band', bands.value);
+                    fetch(url + '?' + query).then(function (response) {
+                        return response.json();
+                    }).then(function (subset) {
+                        draw(plot, subset);
+                    });
+                }
+                failures.addEventListener('change', refresh);
+                bands.addEventListener('change', refresh);
+            })
+            .catch(function () {
+                // keep the static image
+            });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('[data-correlation-url]').forEach(load);
+    });
+})();
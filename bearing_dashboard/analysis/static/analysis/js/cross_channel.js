@@ -0,0 +1,67 @@
+// Charts /api/cross-channel/ for every bearing with more than one channel: the
+// correlation and lag between its channels over time, and their coherence by frequency
+(function () {
+    function drawPair(container, data, pair) {
+        var name = 'Ch' + pair.channels[0] + ' vs Ch' + pair.channels[1];
+        var overTime = document.createElement('div');
+        var coherence = document.createElement('div');
+        container.append(overTime, coherence);
+
+        Plotly.newPlot(overTime, [
+            {x: data.starts, y: pair.windows.correlation, name: 'Correlation', mode: 'lines'},
+            {x: data.starts, y: pair.windows.lag_ms, name: 'Lag (ms)', mode: 'lines', yaxis: 'y2'}
+        ], {
+            title: 'Set ' + data.set + ' Bearing ' + data.bearing + ': ' + name,
+            xaxis: {title: 'Time (s)'},
+            yaxis: {title: 'Peak correlation', range: [-1, 1]},
+            yaxis2: {title: 'Lag (ms)', overlaying: 'y', side: 'right'}
+        }, {responsive: true});
+
+        var bands = Object.keys(data.bands);
+        Plotly.newPlot(coherence, [{
+            x: pair.coherence.frequencies, y: pair.coherence.values, mode: 'lines', name: 'Coherence'
+        }], {
+            title: name + ' coherence; phase lag ' + bands.map(function (band) {
+                return band + ' ' + pair.phase_lag[band].toFixed(0) + '°';
+            }).join(', '),
+            xaxis: {title: 'Frequency (Hz)'},
+            yaxis: {title: 'Coherence', range: [0, 1]},
+            shapes: bands.map(function (band) {
+                return {
+                    type: 'rect', xref: 'x', yref: 'paper', y0: 0, y1: 1,
+                    x0: data.bands[band][0], x1: data.bands[band][1], fillcolor: '#888', opacity: 0.06, line: {width: 0}
+                };
+            })
+        }, {responsive: true});
+    }
+
+    function load(container) {
+        fetch(container.dataset.crossChannelUrl)
+            .then(function (response) {
+                return response.json();
+            })
+            .then(function (index) {
+                if (typeof Plotly === 'undefined') {
+                    return;
+                }
+                index.bearings.forEach(function (bearing) {
+                    fetch(bearing.url).then(function (response) {
+                        return response.ok ? response.json() : null;
+                    }).then(function (data) {
+                        if (data) {
+                            data.pairs.forEach(function (pair) {
+                                drawPair(container, data, pair);
+                            });
+                        }
+                    });
+                });
+            })
+            .catch(function () {
+                // nothing to chart without the raw signals
+            });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('[data-cross-channel-url]').forEach(load);
+    });
+})();
@@ -0,0 +1,58 @@
+// Fetches each plot fragment once its placeholder scrolls close to the viewport
+(function () {
+    function runScripts(container) {
+        // scripts inserted through innerHTML don't execute, so re-create them
+        container.querySelectorAll('script').forEach(function (old) {
+            var script = document.createElement('script');
+            Array.from(old.attributes).forEach(function (attr) {
+                script.setAttribute(attr.name, attr.value);
+            });
+            script.text = old.text;
+            old.replaceWith(script);
+        });
+    }
+
+    function loadSection(placeholder) {
+        placeholder.classList.add('loading');
+        fetch(placeholder.dataset.sectionUrl)
+            .then(function (response) {
+                if (!response.ok) {
+                    throw new Error(response.status + ' ' + response.statusText);
+                }
+                return response.text();
+            })
+            .then(function (html) {
+                placeholder.innerHTML = html;
+                runScripts(placeholder);
+                placeholder.dispatchEvent(new CustomEvent('section:loaded', {bubbles: true}));
+            })
+            .catch(function (error) {
+                placeholder.innerHTML = '<div class="error-message">Could not load plot (' + error.message + ')</div>';
+            })
+            .finally(function () {
+                placeholder.classList.remove('loading');
+            });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        var placeholders = document.querySelectorAll('.lazy-section[data-section-url]');
+
+        if (!('IntersectionObserver' in window)) {
+            placeholders.forEach(loadSection);
+            return;
+        }
+
+        var observer = new IntersectionObserver(function (entries) {
+            entries.forEach(function (entry) {
+                if (entry.isIntersecting) {
+                    observer.unobserve(entry.target);
+                    loadSection(entry.target);
+                }
+            });
+        }, {rootMargin: '400px 0px'});
+
+        placeholders.forEach(function (placeholder) {
+            observer.observe(placeholder);
+        });
+    });
+})();
@@ -0,0 +1,70 @@
+// Applies live updates from the server-sent event stream to elements marked with data-live-key / data-live-alert
+(function () {
+    var ALERT_CLASSES = ['low-accuracy', 'high-accuracy'];
+    var script = document.currentScript;
+
+    function indexBy(attribute) {
+        var elements = {};
+        document.querySelectorAll('[' + attribute + ']').forEach(function (element) {
+            var key = element.getAttribute(attribute);
+            (elements[key] = elements[key] || []).push(element);
+        });
+        return elements;
+    }
+
+    function format(element, value) {
+        if (value === null) {
+            return '–';
+        }
+        var digits = element.getAttribute('data-live-digits');
+        return typeof value === 'number' && digits !== null ? value.toFixed(Number(digits)) : String(value);
+    }
+
+    function apply(values, elements) {
+        Object.keys(values).forEach(function (key) {
+            var value = values[key];
+            (elements.values[key] || []).forEach(function (element) {
+                element.textContent = format(element, value);
+            });
+            (elements.alerts[key] || []).forEach(function (element) {
+                element.classList.remove.apply(element.classList, ALERT_CLASSES);
+                if (ALERT_CLASSES.indexOf(value) !== -1) {
+                    element.classList.add(value);
+                }
+            });
+        });
+    }
+
+    // a snapshot is the whole state: every key it leaves out is cleared, as a removed key in a delta would be
+    function complete(values, elements) {
+        var state = {};
+        Object.keys(elements.values).concat(Object.keys(elements.alerts)).forEach(function (key) {
+            state[key] = null;
+        });
+        Object.keys(values).forEach(function (key) {
+            state[key] = values[key];
+        });
+        return state;
+    }
+
+    function connect() {
+        if (!window.EventSource) {
+            return;
+        }
+        var elements = {values: indexBy('data-live-key'), alerts: indexBy('data-live-alert')};
+        var source = new EventSource(script.getAttribute('data-stream-url'));
+        // the snapshot on (re)connect covers anything missed while disconnected
+        source.addEventListener('snapshot', function (event) {
+            apply(complete(JSON.parse(event.data), elements), elements);
+        });
+        source.addEventListener('delta', function (event) {
+            apply(JSON.parse(event.data), elements);
+        });
+    }
+
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', connect);
+    } else {
+        connect();
+    }
+})();
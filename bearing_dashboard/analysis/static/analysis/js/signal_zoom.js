@@ -0,0 +1,70 @@
+// Refetches raw-signal detail from /api/signals/ when a time-domain plot is zoomed
+(function () {
+    // section view URL, or the hashed static copy written by build_plot_assets
+    var RAW_SECTION = /\/raw\/raw_signals_set(\d+)(?:\.[0-9a-f]{12})?\.html$/;
+    var POINTS = 2000;
+    var index = null;
+
+    function signalIndex() {
+        if (!index) {
+            index = fetch('/api/signals/').then(function (response) {
+                return response.json();
+            });
+        }
+        return index;
+    }
+
+    function bearingFor(sets, setNumber, channel) {
+        var bearings = (sets[setNumber] || {}).bearings || {};
+        return Object.keys(bearings).find(function (bearing) {
+            return bearings[bearing].indexOf(channel) !== -1;
+        });
+    }
+
+    function refetch(plot, setNumber, sets, event) {
+        plot.data.forEach(function (trace, traceIndex) {
+            var axis = (trace.xaxis || 'x').replace('x', 'xaxis');
+            var start = event[axis + '.range[0]'];
+            var end = event[axis + '.range[1]'];
+            if (start === undefined && !event[axis + '.autorange']) {
+                return;
+            }
+
+            var channel = parseInt((trace.name || '').replace(/\D+/g, ''), 10);
+            var bearing = bearingFor(sets, setNumber, channel);
+            if (!bearing) {
+                return;
+            }
+
+            var params = new URLSearchParams({points: POINTS});
+            if (start !== undefined) {
+                params.set('start', start);
+                params.set('end', end);
+            }
+            fetch('/api/signals/' + setNumber + '/' + bearing + '/' + channel + '?' + params)
+                .then(function (response) {
+                    return response.ok ? response.json() : null;
+                })
+                .then(function (series) {
+                    if (series) {
+                        Plotly.restyle(plot, {x: [series.x], y: [series.y]}, [traceIndex]);
+                    }
+                });
+        });
+    }
+
+    document.addEventListener('section:loaded', function (event) {
+        var match = RAW_SECTION.exec(event.target.dataset.sectionUrl || '');
+        if (!match) {
+            return;
+        }
+        var setNumber = match[1];
+        event.target.querySelectorAll('.plotly-graph-div').forEach(function (plot) {
+            plot.on('plotly_relayout', function (relayout) {
+                signalIndex().then(function (data) {
+                    refetch(plot, setNumber, data.sets, relayout);
+                });
+            });
+        });
+    });
+})();
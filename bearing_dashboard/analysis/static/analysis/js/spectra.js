@@ -0,0 +1,78 @@
+// Plots the Welch spectra of /api/spectra/ for every set, with the frequency bands
+// shaded and a selector for the segment length, i.e. the frequency resolution
+(function () {
+    var POINTS = 1000;
+
+    function draw(plot, data) {
+        var traces = data.channels.map(function (channel) {
+            return {
+                x: data.frequencies,
+                y: channel.psd,
+                mode: 'lines',
+                name: 'Bearing ' + channel.bearing + ' Ch' + channel.channel
+            };
+        });
+        var shapes = Object.keys(data.bands).map(function (band, i) {
+            return {
+                type: 'rect', xref: 'x', yref: 'paper', y0: 0, y1: 1,
+                x0: data.bands[band][0], x1: data.bands[band][1],
+                fillcolor: ['#1f77b4', '#ff7f0e', '#d62728'][i % 3], opacity: 0.08, line: {width: 0}
+            };
+        });
+        Plotly.react(plot, traces, {
+            title: 'Set ' + data.set + ': ' + data.segments + ' segments, ' + data.resolution_hz.toFixed(2) + ' Hz resolution',
+            xaxis: {title: 'Frequency (Hz)'},
+            yaxis: {title: 'Power spectral density', type: 'log'},
+            shapes: shapes
+        }, {responsive: true});
+    }
+
+    function load(container) {
+        fetch(container.dataset.spectraUrl)
+            .then(function (response) {
+                return response.json();
+            })
+            .then(function (index) {
+                if (typeof Plotly === 'undefined' || !Object.keys(index.sets).length) {
+                    return;
+                }
+                var select = document.createElement('select');
+                index.segments.forEach(function (segment) {
+                    var option = document.createElement('option');
+                    option.value = segment;
+                    option.textContent = segment + ' samples per segment';
+                    option.selected = segment === index.default_segment;
+                    select.appendChild(option);
+                });
+                container.appendChild(select);
+
+                var plots = Object.keys(index.sets).map(function (setNumber) {
+                    var plot = document.createElement('div');
+                    container.appendChild(plot);
+                    return {plot: plot, url: index.sets[setNumber].url};
+                });
+
+                function refresh() {
+                    var query = '?' + new URLSearchParams({segment: select.value, points: POINTS});
+                    plots.forEach(function (entry) {
+                        fetch(entry.url + query).then(function (response) {
+                            return response.ok ? response.json() : null;
+                        }).then(function (data) {
+                            if (data) {
+                                draw(entry.plot, data);
+                            }
+                        });
+                    });
+                }
+                select.addEventListener('change', refresh);
+                refresh();
+            })
+            .catch(function () {
+                // the section keeps its static plots
+            });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('[data-spectra-url]').forEach(load);
+    });
+})();
@@ -0,0 +1,60 @@
+"""
+Synthetic fleets for benchmarks: the shipped analysis artifacts repeated
+``scale`` times under new set numbers, failure labels and bearing names, so
+a scale of 10 shows ten times today's bearings on the dashboard.
+"""
+import json
+import os
+
+from .repository import ARTIFACTS
+
+
+ARTIFACT_FILES = {name: os.path.basename(artifact.path) for name, artifact in ARTIFACTS.items()}
+
+
+def _load(name):
+    with open(ARTIFACTS[name].path, 'rb') as file:
+        return json.loads(file.read())
+
+
+def _copy_name(name, copy):
+    return name if copy == 0 else f'{name} #{copy + 1}'
+
+
+def scaled_artifacts(scale):
+    """{artifact name: data} with every bearing repeated ``scale`` times."""
+    analysis = _load('bearing_analysis_results')
+    degradation = _load('degradation_features')
+    predictions = _load('prediction_analysis')
+    set_numbers = [int(name.split()[-1]) for name in analysis]
+    stride = max(set_numbers, default=0)
+
+    scaled = {
+        'bearing_analysis_results': {},
+        'degradation_features': {},
+        'prediction_analysis': {'model_performance': predictions['model_performance'], 'bearing_predictions': {}},
+    }
+    for copy in range(scale):
+        for set_name, set_data in analysis.items():
+            # numbered sets, so code parsing "set N" keeps working
+            scaled['bearing_analysis_results'][f'set {int(set_name.split()[-1]) + copy * stride}'] = set_data
+        for label, channels in degradation.items():
+            scaled['degradation_features'][_copy_name(label, copy)] = channels
+        for name, bearing in predictions['bearing_predictions'].items():
+            scaled['prediction_analysis']['bearing_predictions'][_copy_name(name, copy)] = bearing
+    return scaled
+
+
+def write_artifacts(directory, scale):
+    """Write the scaled artifacts to ``directory``; returns {artifact name: path}."""
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    for name, data in scaled_artifacts(scale).items():
+        paths[name] = os.path.join(str(directory), ARTIFACT_FILES[name])
+        with open(paths[name], 'w') as file:
+            json.dump(data, file, indent=4)
+    return paths
+
+
+def bearing_count(artifacts):
+    return sum(len(set_data) for set_data in artifacts['bearing_analysis_results'].values())
@@ -0,0 +1,12 @@
+from django import template
+
+from analysis import plots
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def plot_url(group, name):
+    # {% plot_url 'raw' 'raw_signals_set1.html' %}
+    return plots.plot_url(group, name)
@@ -1,10 +1,44 @@
-from django.test import TestCase
+from django.test import AsyncRequestFactory, Client, RequestFactory, TestCase
 
 import pytest
 import os
 import json
 from bs4 import BeautifulSoup
 import builtins
+import contextvars
+import csv
+import asyncio
+import hashlib
+import io
+import runpy
+import shutil
+import socketserver
+import sys
+import threading
+import time
+import tracemalloc
+import types
+from wsgiref import simple_server
+import numpy as np
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+
+from analysis import alerts, benchmarks, correlation, cross_channel, downsampling, export, feature_checkpoint, features, fleet, health, history, live, load_test, metrics, plots, preload, repository, results, rul, signal_store, signals, spectra, synthetic, timing, views
+from analysis import models
+from analysis.feature_checkpoint import RunningStats
+
+
+# Cached artifacts are per process, so every test starts from a cold cache
+@pytest.fixture(autouse=True)
+def reset_dashboard_caches():
+    repository.clear_cache()
+    plots.clear_manifest()
+    cache.clear()
+    yield
+    repository.clear_cache()
+    plots.clear_manifest()
+    cache.clear()
 
 # 1. Tests basic view response and status code
 @pytest.mark.django_db            
@@ -363,42 +397,42 @@ def test_view_context_data(client):
     bearing_results = content['bearing_analysis_results']
     
     # Verify Set 1 Inner Race processing
-    inner_race = bearing_results['set 1']['bearing 3']
-    assert inner_race['failure_point_percentage'] > 99, "Inner race failure point incorrectly processed"
+    inner_race = bearing_results.bearing(1, 3)
+    assert inner_race.failure_point_percentage > 99, "Inner race failure point incorrectly processed"
     
     # Check channel processing for paired sensors
-    ch5 = inner_race['channels']['channel 5']
-    ch6 = inner_race['channels']['channel 6']
+    ch5 = inner_race.channel(5)
+    ch6 = inner_race.channel(6)
     
     # Verify frequency band relationships maintained
-    assert ch5['changes']['frequency_bands']['high_band_change'] > \
-           ch5['changes']['frequency_bands']['low_band_change'], \
+    assert ch5.high_band_change > \
+           ch5.low_band_change, \
            "Frequency band relationship lost in processing"
     
     # Test energy calculations preserved
-    assert abs(ch5['changes']['magnitude']['mean'] - 
-              ch5['changes']['magnitude']['total_energy']) < 0.001, \
+    assert abs(ch5.mean - 
+              ch5.total_energy) < 0.001, \
               "Energy calculations modified during processing"
 
     # Test Prediction Analysis processing
     predictions = content['prediction_analysis']
     
     # Verify model performance metrics
-    model_perf = predictions['model_performance']
-    assert 0 <= model_perf['average_accuracy'] <= 100, "Invalid accuracy range"
-    assert model_perf['average_error_days'] >= 0, "Negative error days"
+    assert 0 <= predictions.average_accuracy <= 100, "Invalid accuracy range"
+    assert predictions.average_error_days >= 0, "Negative error days"
 
     # Test timeline processing for each bearing
-    for bearing_name, bearing_data in predictions['bearing_predictions'].items():
+    for bearing_data in predictions.bearings:
+        bearing_name = bearing_data.label
         # Check life stages are properly ordered
-        timeline = bearing_data['timeline']
-        life_stages = [stage['life_stage'] for stage in timeline]
+        timeline = bearing_data.timeline
+        life_stages = [stage.life_stage for stage in timeline]
         expected_stages = ['25% through life', '50% through life', 
                          '75% through life', '90% through life']
         assert life_stages == expected_stages, f"Incorrect life stage ordering for {bearing_name}"
         
         # Verify predictions maintain physical consistency
-        hours_remaining = [stage['predictions']['actual_hours_remaining'] 
+        hours_remaining = [stage.actual_hours_remaining 
                          for stage in timeline]
         assert all(hours_remaining[i] > hours_remaining[i+1] 
                   for i in range(len(hours_remaining)-1)), \
@@ -406,17 +440,1282 @@ def test_view_context_data(client):
         
         # Check accuracy calculations preserved
         for stage in timeline:
-            pred = stage['predictions']
             # Verify accuracy calculation matches hours difference
-            calculated_accuracy = 100 * (1 - abs(pred['actual_hours_remaining'] - 
-                                               pred['predicted_hours']) / 
-                                           pred['actual_hours_remaining'])
+            calculated_accuracy = 100 * (1 - abs(stage.actual_hours_remaining - 
+                                               stage.predicted_hours) / 
+                                           stage.actual_hours_remaining)
             assert abs(calculated_accuracy - 
-                      pred['error_metrics']['accuracy_percentage']) < 0.3, \
+                      stage.accuracy_percentage) < 0.3, \
                       f"Accuracy calculation modified for {bearing_name}"
 
     # Test plot data preparation
     assert all(plot.endswith('.html') for plot in content['raw']), \
            "Raw signal plots incorrectly formatted"
     assert all(plot.endswith('.html') for plot in content['fft']), \
-           "FFT plots incorrectly formatted"
\ No newline at end of file
+           "FFT plots incorrectly formatted"
+
+
+# 17. Tests artifacts are parsed once and reloaded only when their content changes
+def test_cached_artifact_reloads_on_change(tmp_path):
+    path = tmp_path / 'artifact.json'
+    path.write_text(json.dumps({'value': 1}))
+    artifact = repository.CachedArtifact(str(path))
+
+    first = artifact.get()
+    assert artifact.get() is first, "Unchanged artifact should be served from memory"
+    assert (artifact.hits, artifact.misses, artifact.reloads) == (1, 1, 0)
+
+    # same content with a new mtime is revalidated by hash, not parsed again
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert artifact.get() is first
+    assert artifact.reloads == 0
+
+    path.write_text(json.dumps({'value': 22}))
+    assert artifact.get() == {'value': 22}, "Changed artifact should be reloaded"
+    assert artifact.reloads == 1
+
+
+# 18. Tests the dashboard reuses the cached prediction analysis between requests
+@pytest.mark.django_db
+def test_dashboard_uses_artifact_cache(client):
+    before = repository.artifact_stats()['prediction_analysis']
+    client.get('')
+    cache.clear()  # force a second render instead of a cached page
+    client.get('')
+    after = repository.artifact_stats()['prediction_analysis']
+    assert after['misses'] - before['misses'] == 1, "Prediction analysis should only be parsed once"
+    assert after['hits'] - before['hits'] >= 1, "Second request should hit the artifact cache"
+
+
+# 19. Tests conditional GET support for the dashboard
+@pytest.mark.django_db
+def test_dashboard_conditional_get(client):
+    response = client.get('')
+    etag = response['ETag']
+    assert etag.startswith('"'), "Dashboard should send a strong ETag"
+    assert response.has_header('Last-Modified'), "Missing Last-Modified header"
+
+    response = client.get('', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304, "Matching ETag should return 304 Not Modified"
+    assert response['ETag'] == etag
+    assert response.content == b''
+
+
+# 20. Tests repeated requests are served from the response cache
+@pytest.mark.django_db
+def test_dashboard_response_cache(client):
+    first = client.get('')
+    assert first.context is not None
+
+    second = client.get('')
+    assert second.context is None, "Cached page should not render the template again"
+    assert second.content == first.content
+
+
+# 21. Tests pages with load errors are never cached
+@pytest.mark.django_db
+def test_dashboard_error_page_not_cached(client, monkeypatch):
+    original_open = builtins.open
+    def mock_file_open(*args, **kwargs):
+        if 'bearing_analysis_results.json' in str(args[0]):
+            raise PermissionError("Permission denied: bearing_analysis_results.json")
+        return original_open(*args, **kwargs)
+
+    monkeypatch.setattr('builtins.open', mock_file_open)
+    response = client.get('')
+    assert 'no-store' in response['Cache-Control']
+    assert not response.has_header('ETag')
+
+    monkeypatch.setattr('builtins.open', original_open)
+    response = client.get('')
+    assert 'Error accessing bearing analysis data' not in response.content.decode('utf-8')
+
+
+# 22. Tests the dashboard ships placeholders instead of inline plots
+@pytest.mark.django_db
+def test_dashboard_lazy_sections(client):
+    response = client.get('')
+    scrape = BeautifulSoup(response.content.decode('utf-8'), 'html.parser')
+
+    assert 'Plotly.newPlot' not in response.content.decode('utf-8'), "Plots should not be inlined in the dashboard shell"
+    urls = [div['data-section-url'] for div in scrape.find_all('div', class_='lazy-section')]
+    for raw in response.context['content']['raw']:
+        assert f'/sections/raw/{raw}' in urls, f"Missing lazy section for {raw}"
+
+    # only figures that exist get a placeholder, and the load test and warm-up cover all of them
+    assert not plots.list_plots('prediction') and not [url for url in urls if '/sections/prediction/' in url]
+    assert set(urls) <= set(load_test.default_paths())
+    for url in urls:
+        assert client.get(url).status_code == 200, url
+
+
+# 23. Tests a single plot section is served on its own
+@pytest.mark.django_db
+def test_section_endpoint(client):
+    response = client.get('/sections/raw/raw_signals_set2.html')
+    assert response.status_code == 200
+    assert 'Set 2 - Raw Vibration Data' in response.content.decode('utf-8')
+    assert response.has_header('ETag')
+
+    response = client.get('/sections/raw/raw_signals_set2.html', HTTP_IF_NONE_MATCH=response['ETag'])
+    assert response.status_code == 304
+
+
+# 24. Tests unknown sections are rejected
+@pytest.mark.django_db
+@pytest.mark.parametrize("url", [
+    '/sections/raw/missing.html',
+    '/sections/unknown/raw_signals_set1.html',
+    '/sections/raw/..%2Fdashboard.html',
+])
+def test_section_endpoint_unknown(client, url):
+    response = client.get(url)
+    assert response.status_code == 404
+
+
+# 25. Tests downsampling keeps the signal envelope within the point budget
+@pytest.mark.parametrize("method", ['minmax', 'lttb'])
+def test_downsampling_preserves_shape(method):
+    x = np.arange(20480) / 20000
+    y = np.sin(x * 300)
+    y[12345] = 5.0
+
+    dx, dy = downsampling.downsample(x, y, 500, method)
+    assert len(dx) <= 500, "Downsampled series exceeds requested points"
+    assert dy.max() == 5.0, "Spike lost during downsampling"
+    assert all(a < b for a, b in zip(dx, dx[1:])), "Downsampled x values out of order"
+
+
+# 26. Tests the raw signal API returns a downsampled window
+@pytest.mark.django_db
+def test_signal_api_window(client):
+    response = client.get('/api/signals/1/3/5', {'start': 0.25, 'end': 0.5, 'points': 200})
+    assert response.status_code == 200
+    data = response.json()
+
+    assert data['points'] <= 200
+    assert len(data['x']) == len(data['y']) == data['points']
+    assert 0.25 <= data['x'][0] and data['x'][-1] <= 0.5, "Samples outside of the requested window"
+    assert data['total_points'] == 5001
+
+    # a finite bound far outside the signal gives an empty window, not an overflow
+    assert client.get('/api/signals/1/3/5', {'start': 1e300}).json()['points'] == 0
+    assert client.get('/api/signals/1/3/5', {'end': -1e300}).json()['points'] == 0
+
+
+# 27. Tests the raw signal API rejects invalid requests
+@pytest.mark.django_db
+@pytest.mark.parametrize("url, status", [
+    ('/api/signals/1/3/7', 404),
+    ('/api/signals/4/1/1', 404),
+    ('/api/signals/1/3/5?points=1', 400),
+    ('/api/signals/1/3/5?start=abc', 400),
+    ('/api/signals/1/3/5?start=nan', 400),
+    ('/api/signals/1/3/5?start=inf', 400),
+    ('/api/signals/1/3/5?end=-inf', 400),
+    ('/api/signals/1/3/5?method=cubic', 400),
+    ('/api/signals/1/3/5?start=0.5&end=0.1', 400),
+])
+def test_signal_api_errors(client, url, status):
+    response = client.get(url)
+    assert response.status_code == status
+    assert 'error' in response.json()
+
+
+# 28. Tests raw signal sections are served downsampled
+@pytest.mark.django_db
+def test_raw_section_is_downsampled(client):
+    response = client.get('/sections/raw/raw_signals_set1.html')
+    original = os.path.getsize(os.path.join('analysis', 'templates', 'analysis', 'raw_signals', 'raw_signals_set1.html'))
+    assert response.status_code == 200
+    assert len(response.content) < original / 5, "Raw signal section should not ship every sample"
+    assert 'Set 1 - Raw Vibration Data' in response.content.decode('utf-8')
+
+
+# 29. Tests the raw signal converter writes a memory-mapped store matching the plots
+def test_signal_store_conversion(tmp_path):
+    call_command('convert_raw_signals', output=str(tmp_path), stdout=io.StringIO())
+    store = signal_store.open_store(str(tmp_path))
+
+    assert store.sets() == [1, 2, 3], "Missing converted sets"
+    assert store.bearings(1)[3] == [5, 6]
+
+    values = store.values(1, 5)
+    assert isinstance(values, np.memmap), "Stored channels should be memory-mapped"
+    assert values.dtype == np.float32
+    np.testing.assert_array_equal(values, signals._figure_artifact(1).get().signals[5].values)
+
+
+# 30. Tests the signal API reads from the binary store once it exists
+@pytest.mark.django_db
+def test_signal_api_uses_store(client, settings, tmp_path):
+    expected = client.get('/api/signals/2/1/1', {'start': 0.1, 'end': 0.2}).json()
+
+    call_command('convert_raw_signals', output=str(tmp_path), stdout=io.StringIO())
+    settings.SIGNAL_STORE_DIR = str(tmp_path)
+
+    assert isinstance(signals.get_signal(2, 1, 1).values, np.memmap)
+    response = client.get('/api/signals/2/1/1', {'start': 0.1, 'end': 0.2})
+    assert response.status_code == 200
+    assert response.json()['y'] == expected['y'], "Store and plot data should agree"
+
+
+# 31. Fixture writing a small synthetic IMS-style run for set 1
+@pytest.fixture
+def ims_run(tmp_path):
+    run_dir = tmp_path / '1st_test'
+    run_dir.mkdir()
+    rng = np.random.default_rng(7)
+    t = np.arange(4096) / features.SAMPLE_RATE
+    for i in range(12):
+        data = rng.normal(0, 0.1, size=(4096, 8))
+        # channel 5 develops a growing high-band tone in the last third of the run
+        if i >= 8:
+            data[:, 4] += (i - 7) * 0.5 * np.sin(2 * np.pi * 4000 * t)
+        np.savetxt(run_dir / f'2003.10.22.{i:02d}.00.00', data, fmt='%.3f', delimiter='\t')
+    return run_dir
+
+
+# 32. Tests feature extraction finds the injected high-band degradation
+def test_snapshot_features_bands(ims_run):
+    data = features.read_snapshot(features.list_snapshots(ims_run)[-1])
+    assert data.shape == (4096, 8)
+
+    snapshot = features.snapshot_features(data)
+    assert snapshot['band_metrics'].shape == (3, 8, 4)
+    high_energy = snapshot['band_energy'][2]
+    assert high_energy.argmax() == 4, "Injected 4 kHz tone should dominate channel 5's high band"
+
+
+# 33. Tests the build_features command writes both dashboard artifacts
+def test_build_features_command(ims_run, tmp_path):
+    output = tmp_path / 'data'
+    stdout = io.StringIO()
+    call_command('build_features', '--set', f'1={ims_run}', '--output', str(output), '--workers', '2', stdout=stdout)
+    assert 'snapshots/s' in stdout.getvalue(), "Missing throughput report"
+
+    with open(output / 'degradation_features.json') as f:
+        degradation = json.load(f)
+    with open(output / 'bearing_analysis_results.json') as f:
+        analysis = json.load(f)
+
+    assert set(degradation) == {'Inner Race', 'Roller'}, "Only set 1 failures should be present"
+    high_rms = degradation['Inner Race']['Ch5']['high']['RMS']
+    assert set(high_rms) == {'ratios', 'rates', 'stability'}
+    assert high_rms['ratios']['late_to_baseline'] > 2, "High band RMS should grow for the failing channel"
+
+    inner_race = analysis['set 1']['bearing 3']
+    bands = inner_race['channels']['channel 5']['changes']['frequency_bands']
+    assert bands['high_band_change'] > bands['mid_band_change']
+    assert 50 < inner_race['failure_point_percentage'] <= 100
+
+    # a run over some sets replaces theirs and keeps the other sets already in the output
+    data_dir = os.path.join('analysis', 'static', 'analysis', 'data')
+    for name in ['degradation_features.json', 'bearing_analysis_results.json']:
+        shutil.copy(os.path.join(data_dir, name), output / name)
+    stdout = io.StringIO()
+    call_command('build_features', '--set', f'1={ims_run}', '--output', str(output), '--workers', '1', stdout=stdout)
+    assert 'Kept set 2, set 3 from the existing artifacts' in stdout.getvalue()
+    with open(output / 'degradation_features.json') as f, open(os.path.join(data_dir, 'degradation_features.json')) as shipped:
+        merged, shipped = json.load(f), json.load(shipped)
+    assert list(merged) == [failure['label'] for failure in features.FAILURES]
+    assert merged['Outer Race Set2'] == shipped['Outer Race Set2'] and merged['Inner Race'] == degradation['Inner Race']
+    with open(output / 'bearing_analysis_results.json') as f:
+        merged = json.load(f)
+    assert list(merged) == ['set 1', 'set 2', 'set 3'] and merged['set 1'] == analysis['set 1']
+
+
+# 34. Tests incremental feature builds only process new snapshots and match a full build
+def test_build_features_incremental(ims_run, tmp_path):
+    snapshots = features.list_snapshots(ims_run)
+    late = snapshots[9:]
+    holding = tmp_path / 'holding'
+    holding.mkdir()
+    for path in late:
+        os.rename(path, holding / os.path.basename(path))
+
+    incremental = tmp_path / 'incremental'
+    checkpoint = tmp_path / 'checkpoint'
+    args = ['--set', f'1={ims_run}', '--output', str(incremental), '--workers', '1', '--incremental', '--checkpoint', str(checkpoint)]
+    call_command('build_features', *args, stdout=io.StringIO())
+
+    for path in late:
+        os.rename(holding / os.path.basename(path), path)
+    stdout = io.StringIO()
+    call_command('build_features', *args, stdout=stdout)
+    assert 'Set 1: 3 snapshots' in stdout.getvalue(), "Only the new snapshots should be processed"
+
+    with open(checkpoint / 'manifest.json') as f:
+        manifest = json.load(f)
+    assert manifest['sets']['1']['snapshots'] == 12
+    assert all({'path', 'size', 'sha256'} <= set(record) for record in manifest['sets']['1']['files'])
+    assert manifest['sets']['1']['stage_edges'] == [0, 4, 8, 12]
+
+    def leaves(data, prefix=''):
+        if isinstance(data, dict):
+            return {k: v for key, value in data.items() for k, v in leaves(value, f'{prefix}/{key}').items()}
+        return {prefix: data}
+
+    full = tmp_path / 'full'
+    call_command('build_features', '--set', f'1={ims_run}', '--output', str(full), '--workers', '1', stdout=io.StringIO())
+    for name in ['degradation_features.json', 'bearing_analysis_results.json']:
+        with open(incremental / name) as a, open(full / name) as b:
+            a, b = leaves(json.load(a)), leaves(json.load(b))
+        assert a.keys() == b.keys()
+        for key in a:
+            assert a[key] == pytest.approx(b[key]), f"{name}{key} differs from a full build"
+
+    # a set whose rows are missing is processed again instead of failing
+    os.remove(checkpoint / 'set1.npz')
+    assert len(feature_checkpoint.Checkpoint.load(str(checkpoint)).sets[1]) == 0
+    stdout = io.StringIO()
+    call_command('build_features', *args, stdout=stdout)
+    assert 'Set 1: 12 snapshots' in stdout.getvalue()
+
+
+# 35. Tests the running statistics follow a sliding range of rows like a one-shot computation
+def test_running_stats_welford():
+    data = np.random.default_rng(3).normal(5, 2, size=(100, 3, 4)) + np.arange(100)[:, None, None] * 0.1
+    stats = RunningStats()
+    for batch in np.array_split(data, 7):
+        stats.update(batch)
+
+    assert stats.count == 100
+    np.testing.assert_allclose(stats.mean, data.mean(axis=0))
+    np.testing.assert_allclose(stats.variance, data.var(axis=0))
+    np.testing.assert_allclose(stats.rate, features.slope(data))
+
+    # the range moves forward as a stage does when the run grows
+    first = 0
+    for removed in [10, 25, 0, 30]:
+        stats.remove(data[first:first + removed])
+        first += removed
+        np.testing.assert_allclose(stats.mean, data[first:].mean(axis=0))
+        np.testing.assert_allclose(stats.variance, data[first:].var(axis=0))
+        np.testing.assert_allclose(stats.rate, features.slope(data[first:]))
+    more = np.random.default_rng(4).normal(0, 1, size=(20, 3, 4))
+    stats.update(more)
+    rows = np.concatenate([data[first:], more])
+    np.testing.assert_allclose(stats.rate, features.slope(rows))
+    np.testing.assert_allclose(stats.variance, rows.var(axis=0))
+
+
+# 36. Tests the live state covers accuracies, alert states and band changes
+def test_live_state():
+    state = live.live_state()
+    predictions = repository.get_artifact('prediction_analysis')
+    assert state['accuracy/average'] == predictions.average_accuracy
+    assert any(key.startswith('alerts/') for key in state)
+    assert set(state[key] for key in state if key.startswith('alerts/')) <= {'low-accuracy', 'high-accuracy', 'normal'}
+    assert any(key.startswith('bands/') and key.endswith('high_band_change') for key in state)
+
+    delta = live.diff({'a': 1, 'b': 2, 'gone': 3}, {'a': 1, 'b': 5, 'new': 4})
+    assert delta == {'b': 5, 'new': 4, 'gone': None}
+
+
+# 37. Tests subscribers get a snapshot, then only the changed keys
+def test_live_broadcaster_pushes_deltas():
+    values = {'accuracy/average': 80.0, 'alerts/Bearing 1/early': 'normal'}
+    source = live.Broadcaster(state_func=lambda: dict(values), interval=3600)
+
+    async def scenario():
+        streams = [live.event_stream(source, heartbeat=3600) for _ in range(200)]
+        for stream in streams:
+            assert (await stream.__anext__()).startswith('retry:')
+            assert 'event: snapshot' in await stream.__anext__()
+
+        values['alerts/Bearing 1/early'] = 'low-accuracy'
+        assert await source.poll() == {'alerts/Bearing 1/early': 'low-accuracy'}
+        events = [await stream.__anext__() for stream in streams]
+        assert await source.poll() == {}, "Unchanged state should not publish"
+        for stream in streams:
+            await stream.aclose()
+        return events
+
+    events = asyncio.run(scenario())
+    assert len(set(events)) == 1
+    lines = events[0].splitlines()
+    assert lines[:2] == ['id: 1', 'event: delta']
+    assert json.loads(lines[2][len('data: '):]) == {'alerts/Bearing 1/early': 'low-accuracy'}
+    assert not source._subscribers and source._task is None, "Closed streams should stop the watcher"
+
+    # a subscriber that stops reading gets one snapshot of the latest state, no stale deltas before it
+    async def slow_subscriber():
+        queue = source.subscribe()
+        for i in range(live.QUEUE_SIZE + 1):
+            values['accuracy/average'] = 50.0 + i
+            await source.poll()
+        items = []
+        while not queue.empty():
+            items.append(queue.get_nowait())
+        source.unsubscribe(queue)
+        return items
+
+    items = asyncio.run(slow_subscriber())
+    assert [kind for _, kind, _ in items] == ['snapshot']
+    assert items[0][0] == source.version and items[0][2]['accuracy/average'] == 50.0 + live.QUEUE_SIZE
+
+
+# 38. Tests the live endpoint streams under ASGI and falls back to one snapshot under WSGI
+def test_live_events_endpoint(client, async_client):
+    response = client.get('/api/live/')
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'text/event-stream'
+    assert 'event: snapshot' in response.content.decode('utf-8')
+
+    async def first_events():
+        response = await async_client.get('/api/live/')
+        assert response.streaming
+        stream = aiter(response.streaming_content)
+        chunks = [await anext(stream), await anext(stream)]
+        await stream.aclose()
+        return response, b''.join(chunks).decode('utf-8')
+
+    response, text = asyncio.run(first_events())
+    assert 'no-cache' in response['Cache-Control']
+    data = json.loads(text.split('data: ', 1)[1])
+    assert data['accuracy/average'] == repository.get_artifact('prediction_analysis').average_accuracy
+
+    scrape = BeautifulSoup(client.get('').content.decode('utf-8'), 'html.parser')
+    assert scrape.find(attrs={'data-live-key': 'accuracy/average'}), "Missing live hook for the average accuracy"
+    assert scrape.find(attrs={'data-live-alert': True}), "Missing live hook for accuracy alerts"
+
+
+# 39. Tests the declarative alert rules over the shipped analysis data
+def test_alert_rules():
+    table = alerts.current_table()
+    assert (1, 3, 5) in table.rows and table.labels[table.rows.index((1, 3, 5))] == 'Inner Race'
+
+    engine = alerts.AlertEngine([
+        alerts.Rule('mid_kurtosis', 'stability.late.mid.Kurtosis > 5', 'critical'),
+        alerts.Rule('high_over_mid', 'high_band_change > mid_band_change', 'info'),
+        alerts.Rule('kurtosis_bands', 'ratios.late_to_baseline.*.Kurtosis > 5'),
+        alerts.Rule('rms_spread', 'stability.late.*.RMS > 10 * stability.early.*.RMS'),
+    ])
+    fired = engine.alerts(table)
+    degradation = repository.get_artifact('degradation_features')
+    analysis = repository.get_artifact('bearing_analysis_results')
+
+    expected = {(1, 4, 7), (1, 4, 8), (1, 3, 5)}
+    assert {(a['set'], a['bearing'], a['channel']) for a in fired if a['rule'] == 'mid_kurtosis'} == expected
+    assert fired[0]['level'] == 'critical', "Most severe alerts should come first"
+
+    for alert in fired:
+        if alert['rule'] == 'high_over_mid':
+            channel = analysis.bearing(alert['set'], alert['bearing']).channel(alert['channel'])
+            assert channel.high_band_change > channel.mid_band_change
+        if alert['rule'] == 'kurtosis_bands':
+            channel = next(c for c in degradation.channels if (c.label, c.number) == (alert['failure'], alert['channel']))
+            assert channel.ratios[1, list(features.BANDS).index(alert['band']), features.METRICS.index('Kurtosis')] > 5
+
+    for when in ['nonsense > 1', 'stability.later.mid.RMS > 1', 'high_band_change', 'ratios.late_to_baseline.mid.RMS.x > 1']:
+        with pytest.raises(alerts.RuleError):
+            alerts.AlertEngine([alerts.Rule('bad', when)])
+
+
+# 40. Tests the rules stay in the millisecond range for a fleet of 10,000 bearings
+def test_alert_rules_benchmark():
+    table = alerts.synthetic_table(10000)
+    engine = alerts.default_engine
+    engine.counts(table)
+    started = time.perf_counter()
+    for _ in range(5):
+        counts = engine.counts(table)
+    elapsed = (time.perf_counter() - started) / 5
+    assert len(table) == 20000 and set(counts) == {rule.name for rule in alerts.DEFAULT_RULES}
+    assert elapsed < 0.05, f"Evaluating {len(engine.rules)} rules over 10,000 bearings took {elapsed * 1000:.1f} ms"
+
+    stdout = io.StringIO()
+    call_command('benchmark_alerts', '--bearings', '100', '--repeat', '2', stdout=stdout)
+    assert '100 bearings (200 channels' in stdout.getvalue()
+
+
+# 41. Tests the alert API and the rule alerts in the live state
+def test_alert_api(client):
+    response = client.get('/api/alerts/?level=critical')
+    assert response.status_code == 200
+    data = response.json()
+    assert data['count'] == len(data['alerts']) > 0
+    assert all(alert['level'] == 'critical' for alert in data['alerts'])
+    assert client.get('/api/alerts/?level=severe').status_code == 400
+
+    state = live.live_state()
+    assert state['rules/mid_kurtosis_unstable/set 1/bearing 3/channel 5'] == 'critical'
+
+
+# 42. Tests built plot assets are linked from the manifest and served as immutable, compressed files
+@pytest.mark.django_db
+def test_plot_assets(client, settings, tmp_path, monkeypatch):
+    settings.STATIC_ROOT = tmp_path
+    call_command('build_plot_assets', stdout=io.StringIO())
+
+    with open(plots.manifest_path()) as f:
+        manifest = json.load(f)
+    asset = manifest['groups']['raw']['raw_signals_set1.html']
+    path = tmp_path / asset['path']
+    assert path.exists() and os.path.exists(f'{path}.gz'), "Missing asset or its gzip copy"
+    with open(path, 'rb') as f:
+        assert hashlib.sha256(f.read()).hexdigest() == asset['sha256']
+    assert asset['sha256'][:12] in asset['path']
+
+    original_listdir = os.listdir
+    scanned = []
+    def tracking_listdir(path):
+        scanned.append(str(path))
+        return original_listdir(path)
+    monkeypatch.setattr('os.listdir', tracking_listdir)
+
+    response = client.get('')
+    assert not [path for path in scanned if plots.TEMPLATE_DIR in path], "Plot folders should not be scanned per request"
+    scrape = BeautifulSoup(response.content.decode('utf-8'), 'html.parser')
+    urls = [div['data-section-url'] for div in scrape.find_all('div', class_='lazy-section')]
+    assert f'/static/{asset["path"]}' in urls
+
+    response = Client().get(f'/static/{asset["path"]}', HTTP_ACCEPT_ENCODING='gzip')
+    assert response.status_code == 200
+    assert response['Content-Encoding'] == 'gzip'
+    assert 'immutable' in response['Cache-Control']
+
+
+# 43. Tests the synthetic benchmark fleets and the baseline comparison
+def test_benchmark_helpers(tmp_path):
+    scaled = synthetic.scaled_artifacts(10)
+    assert synthetic.bearing_count(scaled) == 10 * synthetic.bearing_count(synthetic.scaled_artifacts(1))
+    assert len(scaled['prediction_analysis']['bearing_predictions']) == 10 * len(repository.get_artifact('prediction_analysis').bearings)
+    paths = synthetic.write_artifacts(tmp_path, 2)
+    assert sorted(os.path.basename(path) for path in paths.values()) == sorted(os.listdir(tmp_path))
+
+    table = alerts.FleetTable.from_artifacts(
+        results.DegradationFeatures.from_json(scaled['degradation_features']),
+        results.BearingAnalysis.from_json(scaled['bearing_analysis_results']),
+    )
+    labelled = sum(label is not None for label in alerts.current_table().labels)
+    assert sum(label is not None for label in table.labels) == 10 * labelled, "Copies of a failure should get their own rows"
+
+    baseline = {'10x': {'render': {'p50': 10.0}, 'version_check': {'p50': 0.1}, 'response_bytes': 1000}}
+    current = {'10x': {'render': {'p50': 25.0}, 'version_check': {'p50': 0.5}, 'response_bytes': 1100, 'new_metric': {'p50': 99.0}}}
+    assert benchmarks.compare(current, baseline) == ['10x render: median 25.00 ms vs baseline 10.00 ms']
+    assert benchmarks.compare(current, baseline, time_threshold=3, size_threshold=1.05) == ['10x response_bytes: 1100 bytes vs baseline 1000 bytes']
+
+    # the stored baseline was recorded with the pinned versions, and runs elsewhere aren't compared with it
+    recorded = benchmarks.load_baseline()['environment']
+    with open(os.path.join(os.path.dirname(os.path.dirname(benchmarks.__file__)), 'requirements.txt'), encoding='utf-16') as file:
+        pinned = dict(line.strip().lower().split('==') for line in file if '==' in line)
+    assert recorded['numpy'] == pinned['numpy'] and recorded['django'] == pinned['django']
+    assert set(recorded) == set(benchmarks.environment())
+    environment = dict(recorded, python=recorded['python'] + 'rc1', platform='Linux-7.0-x86_64')
+    assert benchmarks.environment_differences(environment, recorded) == []
+    assert benchmarks.environment_differences(dict(recorded, numpy='2.4.6'), recorded) == [f'numpy 2.4.6 vs baseline {recorded["numpy"]}']
+    other_hardware = dict(recorded, cpus=recorded['cpus'] + 63, machine='arm64')
+    assert benchmarks.environment_differences(other_hardware, recorded) == [
+        f'cpus {recorded["cpus"] + 63} vs baseline {recorded["cpus"]}', f'machine arm64 vs baseline {recorded["machine"]}',
+    ]
+
+
+# 44. Tests Server-Timing headers and the Prometheus metrics endpoint
+@pytest.mark.django_db
+def test_request_timing_metrics(client):
+    metrics.clear()
+    response = client.get('')
+    phases = dict(entry.split(';dur=') for entry in response['Server-Timing'].split(', '))
+    assert {'load', 'version', 'render', 'cache', 'total'} <= set(phases), f"Missing phases in {phases}"
+    assert all(float(ms) >= 0 for ms in phases.values())
+    assert float(phases['render']) <= float(phases['total'])
+
+    cached = client.get('')
+    assert 'render;' not in cached['Server-Timing'], "A cached page should not be rendered"
+
+    response = client.get('/metrics')
+    assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+    text = response.content.decode('utf-8')
+    assert 'dashboard_request_duration_seconds_count{view="dashboard",status="200"} 2' in text
+    assert 'dashboard_phase_duration_seconds_count{view="dashboard",phase="render"} 1' in text
+    assert 'dashboard_response_size_bytes_bucket{view="dashboard",le="+Inf"} 2' in text
+    assert 'dashboard_artifact_cache_total{artifact="prediction_analysis",result="misses"}' in text
+    buckets = [int(line.rsplit(' ', 1)[1]) for line in text.splitlines()
+               if line.startswith('dashboard_request_duration_seconds_bucket{view="dashboard"')]
+    assert buckets == sorted(buckets), "Histogram buckets should be cumulative"
+
+
+# 45. Tests the bulk loader fills the relational models from the JSON artifacts
+@pytest.mark.django_db
+def test_load_analysis_results():
+    stdout = io.StringIO()
+    call_command('load_analysis_results', stdout=stdout)
+    assert 'Loaded 3 sets, 4 bearings, 6 channels' in stdout.getvalue()
+    call_command('load_analysis_results', stdout=io.StringIO())
+    assert models.Bearing.objects.count() == 4, "Reloading should replace the stored rows"
+
+    bearing = models.Bearing.objects.get(set__number=1, number=3)
+    analysis = repository.get_artifact('bearing_analysis_results').bearing(1, 3)
+    assert bearing.failure_label == 'Inner Race'
+    assert bearing.failure_point_percentage == analysis.failure_point_percentage
+    change = models.BandChange.objects.get(channel__bearing=bearing, channel__number=5, band='high')
+    assert change.change == analysis.channel(5).high_band_change
+
+    unstable = models.DegradationMetric.objects.filter(band='mid', metric='Kurtosis', stage='late', stability__gt=5)
+    assert sorted(unstable.values_list('channel__number', flat=True)) == [5, 7, 8]
+    with open(repository.ARTIFACTS['degradation_features'].path) as file:
+        kurtosis = json.load(file)['Roller']['Ch7']['mid']['Kurtosis']
+    late = models.DegradationMetric.objects.get(channel__number=7, band='mid', metric='Kurtosis', stage='late')
+    assert (late.ratio_to_baseline, late.rate) == (kurtosis['ratios']['late_to_baseline'], kurtosis['rates']['late'])
+
+    predictions = repository.get_artifact('prediction_analysis')
+    prediction = models.Prediction.objects.get(bearing=bearing)
+    timeline = predictions.bearing(prediction.label).timeline
+    assert [stage.life_stage for stage in prediction.timeline.all()] == [stage.life_stage for stage in timeline]
+    assert models.ModelPerformance.objects.get().average_accuracy == predictions.average_accuracy
+
+
+# 46. Tests build_features --history stores every snapshot and the range API buckets it
+@pytest.mark.django_db
+def test_feature_history(ims_run, tmp_path, client):
+    stdout = io.StringIO()
+    call_command('build_features', '--set', f'1={ims_run}', '--output', str(tmp_path / 'out'), '--workers', '1', '--history', stdout=stdout)
+    # 12 hourly snapshots x 8 channels x every feature
+    assert models.FeatureSample.objects.count() == 12 * 8 * len(history.FEATURES)
+    assert 'history rows' in stdout.getvalue()
+    call_command('build_features', '--set', f'1={ims_run}', '--output', str(tmp_path / 'out'), '--workers', '1', '--history', stdout=io.StringIO())
+    assert models.FeatureSample.objects.count() == 12 * 8 * len(history.FEATURES), "Re-ingesting should replace rows"
+
+    # channel 5 is bearing 3 in set 1
+    values = list(models.FeatureSample.objects.filter(channel=5, feature=history.FEATURES.index('high_energy'))
+                  .order_by('timestamp').values_list('bearing', 'value'))
+    assert {bearing for bearing, _ in values} == {3}
+    assert values[-1][1] > 10 * values[0][1], "The injected tone should show up in the history"
+
+    start = history.snapshot_time('2003.10.22.00.00.00')
+    response = client.get('/api/history/1/3/5/high_energy', {'buckets': 4})
+    data = response.json()
+    assert response.status_code == 200
+    assert [bucket['count'] for bucket in data['buckets']] == [3, 3, 3, 3]
+    first = data['buckets'][0]
+    assert (first['start'], first['first'], first['last']) == (start, start, start + 2 * 3600)
+    assert first['min'] <= first['mean'] <= first['max']
+    assert np.isclose(data['buckets'][-1]['max'], values[-1][1])
+
+    response = client.get('/api/history/1/3/5/high_energy', {'start': '2003-10-22T06:00:00', 'end': start + 8 * 3600})
+    assert [bucket['count'] for bucket in response.json()['buckets']] == [1, 1, 1]
+
+    assert client.get('/api/history/1/3/5/high_energy', {'buckets': 'x'}).status_code == 400
+    assert client.get('/api/history/1/3/5/high_energy', {'start': 'yesterday'}).status_code == 400
+    for params in [{'start': 'inf'}, {'end': '-inf'}, {'start': 'nan'}, {'start': '1e300'}]:
+        assert client.get('/api/history/1/3/5/high_energy', params).status_code == 400, params
+    response = client.get('/api/history/1/3/5/sparkle')
+    assert response.status_code == 400 and 'high_energy' in response.json()['error']
+    assert client.get('/api/history/2/1/1/high_energy').json()['buckets'] == []
+
+
+# 47. Tests batched ingest throughput of the history table
+@pytest.mark.django_db
+def test_feature_history_ingest_throughput():
+    rng = np.random.default_rng(0)
+    names = [f'2004.02.12.{hour:02d}.{minute:02d}.00' for hour in range(20) for minute in range(0, 60, 10)]
+    stacked = {
+        'band_metrics': rng.random((len(names), 3, 4, 4)),
+        'band_energy': rng.random((len(names), 3, 4)),
+        'spectrum': rng.random((len(names), 4, 3)),
+    }
+    rows = history.history_rows(2, names, stacked)
+    assert len(rows) == len(names) * 4 * len(history.FEATURES)
+
+    started = time.perf_counter()
+    history.ingest(rows)
+    elapsed = time.perf_counter() - started
+    assert models.FeatureSample.objects.count() == len(rows)
+    assert len(rows) / elapsed > 5000, f"Ingest managed only {len(rows) / elapsed:.0f} rows/s"
+    sample = models.FeatureSample.objects.get(bearing=2, channel=2, feature=history.FEATURES.index('mid_crest'), timestamp=history.snapshot_time(names[5]))
+    assert sample.value == stacked['band_metrics'][5, 1, 1, 2]
+
+    # channels without a bearing are refused rather than stored under a made-up bearing number
+    with pytest.raises(LookupError, match='channel 1, 2, 3, 4 of set 4'):
+        history.history_rows(4, names, stacked)
+    wider = {
+        'band_metrics': np.concatenate([stacked['band_metrics'], stacked['band_metrics'][:, :, :1]], axis=2),
+        'band_energy': np.concatenate([stacked['band_energy'], stacked['band_energy'][:, :, :1]], axis=2),
+        'spectrum': np.concatenate([stacked['spectrum'], stacked['spectrum'][:, :1]], axis=1),
+    }
+    with pytest.raises(LookupError, match='channel 5 of set 2'):
+        history.history_rows(2, names, wider)
+
+
+# 48. Tests the typed artifacts stay compact and reject malformed files with the path of the bad value
+@pytest.mark.django_db
+def test_typed_results(client, tmp_path, monkeypatch):
+    with pytest.raises(results.SchemaError, match=r'^bearing_analysis_results: set 1/bearing 3/failure_point_percentage: expected a number'):
+        results.BearingAnalysis.from_json({'set 1': {'bearing 3': {'failure_point_percentage': 'n/a', 'channels': {}}}})
+    with pytest.raises(results.SchemaError, match=r'Roller/Ch7/low: missing RMS, Peak, Crest, Kurtosis'):
+        results.DegradationFeatures.from_json({'Roller': {'Ch7': {band: {} for band in features.BANDS}}})
+    with pytest.raises(results.SchemaError, match=r'bearing_predictions/B1/timeline/0: missing predictions'):
+        results.PredictionAnalysis.from_json({
+            'model_performance': {'average_accuracy': 80, 'average_error_days': 1},
+            'bearing_predictions': {'B1': {'average_accuracy': 80, 'timeline': [{'life_stage': '25% through life'}]}},
+        })
+
+    # far less memory than the parsed JSON it replaces
+    scaled = synthetic.scaled_artifacts(10)
+    for name, model in [('bearing_analysis_results', results.BearingAnalysis), ('degradation_features', results.DegradationFeatures),
+                        ('prediction_analysis', results.PredictionAnalysis)]:
+        payload = json.dumps(scaled[name])
+        tracemalloc.start()
+        parsed = json.loads(payload)
+        parsed_size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del parsed
+        tracemalloc.start()
+        typed = model.from_json(json.loads(payload))
+        typed_size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        assert typed_size * 3 < parsed_size, f"{name}: {typed_size} bytes typed vs {parsed_size} bytes parsed"
+    assert not hasattr(typed.bearings[0], '__dict__') and not hasattr(typed.bearings[0].timeline[0], '__dict__')
+
+    # a record's row of floats is public, read-only and in the documented column order
+    stage = typed.bearings[0].timeline[0]
+    assert stage.values.tolist() == [getattr(stage, column) for column in results.STAGE_COLUMNS] and not stage.values.flags.writeable
+    analysis = repository.get_artifact('bearing_analysis_results')
+    channel = analysis.channels[0]
+    assert channel.values.tolist() == [getattr(channel, column) for column in results.CHANNEL_COLUMNS] and not channel.values.flags.writeable
+
+    # the flat bearing and channel lists and the bearing lookup are built once, not per access
+    assert analysis.bearings is analysis.bearings and analysis.channels is analysis.channels
+    assert len(analysis.channels) == len(analysis.channel_values)
+    assert all(analysis.bearing(bearing.set_number, bearing.number) is bearing for bearing in analysis.bearings)
+    assert analysis.bearing(9, 9) is None
+
+    # a malformed file shows an error on the dashboard and fails the loader with the same message
+    broken = tmp_path / 'prediction_analysis.json'
+    broken.write_text(json.dumps({'model_performance': {'average_accuracy': 80}, 'bearing_predictions': {}}))
+    monkeypatch.setattr(repository.ARTIFACTS['prediction_analysis'], 'path', str(broken))
+    response = client.get('')
+    assert response.status_code == 200 and 'no-store' in response['Cache-Control']
+    assert 'An error occurred while loading prediction analysis data' in response.content.decode('utf-8')
+    data_dir = os.path.join('analysis', 'static', 'analysis', 'data')
+    args = ['--degradation', os.path.join(data_dir, 'degradation_features.json'),
+            '--bearing-analysis', os.path.join(data_dir, 'bearing_analysis_results.json'), '--predictions', str(broken)]
+    with pytest.raises(CommandError, match='model_performance: missing average_error_days'):
+        call_command('load_analysis_results', *args, stdout=io.StringIO())
+
+
+# 49. Tests preloading loads everything before the fork and leaves forked workers less private memory
+def test_preload_shares_memory_with_workers():
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        pytest.skip('needs /proc/<pid>/smaps_rollup')
+    loaded = preload.preload()
+    assert loaded['artifacts'] == len(repository.ARTIFACTS) and loaded['alert_rows'] > 0
+    repository.clear_cache()
+
+    out = io.StringIO()
+    call_command('measure_worker_memory', '--workers', '2', '--path', '/', '--path', '/api/alerts/', stdout=out)
+    report = out.getvalue()
+    assert 'HTTP' not in report, report
+    lines = {line.split()[0]: line.split() for line in report.splitlines() if line.startswith('  ')}
+    assert float(lines['preloaded'][2]) < float(lines['lazy'][2]), report
+    assert 'Preloading saves' in report
+
+
+# 50. Tests the async dashboard serves the same page, validators and error page as the sync one
+def test_async_dashboard(client, monkeypatch):
+    factory = AsyncRequestFactory()
+    sync_response = client.get('')
+    response = asyncio.run(views.dashboard_async(factory.get('/')))
+    assert response.status_code == 200 and response['ETag'] == sync_response['ETag']
+    assert response.content == sync_response.content
+
+    cache.clear()
+    rendered = asyncio.run(views.dashboard_async(factory.get('/')))
+    assert rendered.content == sync_response.content
+    revalidated = asyncio.run(views.dashboard_async(factory.get('/', headers={'If-None-Match': response['ETag']})))
+    assert revalidated.status_code == 304
+
+    original_listdir = os.listdir
+    monkeypatch.setattr(os, 'listdir', lambda path: [] if 'raw_signals' in path else original_listdir(path))
+    plots.clear_manifest()
+    degraded = asyncio.run(views.dashboard_async(factory.get('/')))
+    assert 'No raw signals found' in degraded.content.decode('utf-8') and 'no-store' in degraded['Cache-Control']
+
+    out = io.StringIO()
+    call_command('benchmark_async_dashboard', '--clients', '4', '--requests', '2', stdout=out)
+    assert 'async view, ASGI' in out.getvalue()
+
+
+# 51. Tests the fleet listing filters, sorts and pages in the database, and stays fast for 50,000 bearings
+@pytest.mark.django_db
+def test_fleet_listing(client):
+    call_command('load_analysis_results', stdout=io.StringIO())
+    data = client.get('/api/fleet/?sort=predicted_hours').json()
+    assert data['count'] == 4 and [row['predicted_hours'] for row in data['bearings']] == [16.4, 32.6, 55.7, 256.1]
+    assert {row['health'] for row in data['bearings']} <= set(fleet.HEALTH)
+    inner = next(row for row in data['bearings'] if (row['set'], row['bearing']) == (1, 3))
+    assert inner['failure'] == 'Inner Race' and inner['health'] == 'critical', "Channel 5 fires mid_kurtosis_unstable"
+
+    data = client.get('/api/fleet/?min_accuracy=80&sort=-failure_point&size=1&page=2').json()
+    assert data['count'] == 2 and data['pages'] == 2 and not data['has_next'] and data['has_previous']
+    assert [(row['set'], row['bearing']) for row in data['bearings']] == [(1, 4)]
+    assert client.get('/api/fleet/?set=1&failure=Roller').json()['count'] == 1
+    for query in ['health=poor', 'sort=accuracy', 'size=0', 'page=x']:
+        assert client.get(f'/api/fleet/?{query}').status_code == 400, query
+
+    response = client.get('/fleet/?sort=predicted_hours&size=2')
+    scrape = BeautifulSoup(response.content.decode('utf-8'), 'html.parser')
+    assert response.status_code == 200 and len(scrape.select('tbody tr')) == 2
+    assert scrape.find('a', rel='next')['href'] == '?sort=predicted_hours&size=2&page=2'
+    assert client.get('/fleet/?health=poor').status_code == 400
+
+    fleet.synthetic_fleet(50000)
+    for params in [{}, {'sort': 'predicted_hours', 'page': '400'}, {'health': 'critical', 'sort': '-predicted_hours'},
+                   {'failure': 'Roller', 'page': '100'}, {'set': '77'}, {'min_accuracy': '90', 'max_accuracy': '95'}]:
+        query = fleet.parse_query(params)
+        fleet.page(query)
+        started = time.perf_counter()
+        listing = fleet.page(query)
+        elapsed = time.perf_counter() - started
+        assert elapsed < 0.05, f"{params}: a page took {elapsed * 1000:.1f} ms"
+        assert len(listing['bearings']) == min(50, listing['count'])
+        keys = [row[fleet.SORTS[query['sort'].lstrip('-')]] for row in listing['bearings']]
+        assert keys == sorted(keys, reverse=query['sort'].startswith('-')), params
+
+
+# 52. Tests the remaining-useful-life engine scores every bearing at once, memoized, validated out of sample
+def test_rul_predictions(client, settings, tmp_path):
+    predictions = repository.get_artifact('prediction_analysis')
+    stages = [stage for bearing in predictions.bearings for stage in bearing.timeline]
+    predicted = np.array([stage.predicted_hours for stage in stages])
+    actual = np.array([stage.actual_hours_remaining for stage in stages])
+    metrics = rul.error_metrics(predicted, actual)
+    for stage, hours, days, accuracy in zip(stages, metrics['hours'], metrics['days'], metrics['accuracy_percentage']):
+        # the artifact was computed before its hours were rounded to one decimal
+        assert abs(hours - stage.error_hours) <= 0.15 and abs(days - stage.error_days) <= 0.06
+        assert abs(accuracy - stage.accuracy_percentage) <= 0.5
+    assert rul.life_fraction('75% through life') == 0.75
+
+    # no checkpoint: every bearing gets a life fraction, hours only where the request gives the hours run
+    settings.FEATURE_CHECKPOINT_DIR = str(tmp_path)
+    degradation = repository.get_artifact('degradation_features')
+    data = client.get('/api/predictions/').json()
+    assert [bearing['label'] for bearing in data['bearings']] == list(degradation.labels)
+    assert all(0 < bearing['life_fraction'] < 1 and bearing['predicted_hours'] is None for bearing in data['bearings'])
+    inner_race = client.get('/api/predictions/', {'elapsed': '1:3:500'}).json()['bearings'][0]
+    fraction = inner_race['life_fraction']
+    assert inner_race['elapsed_source'] == 'request'
+    assert inner_race['predicted_hours'] == pytest.approx(500 * (1 - fraction) / fraction, abs=0.2)
+    assert client.get('/api/predictions/', {'elapsed': '1:3'}).status_code == 400
+    assert client.get('/api/predictions/', {'elapsed': '1:3:-5'}).status_code == 400
+
+    # each shipped bearing is scored by a model that never saw it, next to the shipped accuracy
+    validation = data['validation']
+    assert validation['shipped_average_accuracy'] == predictions.average_accuracy
+    assert list(validation['bearing_predictions']) == [bearing.label for bearing in predictions.bearings]
+    model, fitted = rul.current()
+    rows, fractions = fitted['rows'], fitted['fractions']
+    _, stage_inputs = rul.bearing_inputs(degradation)
+    _, _, inputs, _ = rul.training_set(fitted['labels'], stage_inputs, predictions)
+    others = np.arange(len(rows)) != 0
+    held_out = rul.Model.fit(inputs[others].reshape(-1, len(rul.INPUTS)), fractions[others].ravel())
+    np.testing.assert_allclose(fitted['validated'][0], held_out.life_fraction(inputs[0]))
+    first = validation['bearing_predictions'][rows[0][0].label]['timeline'][0]['predictions']
+    assert first['predicted_hours'] is None and first['error_metrics']['hours'] is None
+    assert first['error_metrics']['accuracy_percentage'] is not None
+
+    # snapshot timestamps in the checkpoint give the hours run by set 1
+    names = [f'2003.10.{day}.12.00.00' for day in range(22, 26)]
+    manifest = {'version': feature_checkpoint.MANIFEST_VERSION, 'sets': {'1': {'files': [{'path': f'/data/1st_test/{name}'} for name in names]}}}
+    (tmp_path / 'manifest.json').write_text(json.dumps(manifest))
+    data = client.get('/api/predictions/').json()
+    roller = data['bearings'][1]
+    assert roller['elapsed_source'] == 'snapshots' and roller['elapsed_hours'] == 72
+    assert roller['predicted_hours'] == pytest.approx(72 * (1 - roller['life_fraction']) / roller['life_fraction'], abs=0.2)
+    assert data['bearings'][3]['elapsed_hours'] is None
+    first = data['validation']['bearing_predictions'][rows[0][0].label]['timeline'][0]['predictions']
+    assert first['predicted_hours'] == pytest.approx(0.25 * 72 * (1 - first['predicted_life_fraction']) / first['predicted_life_fraction'], abs=0.2)
+    assert first['error_metrics']['hours'] == pytest.approx(abs(first['predicted_hours'] - first['actual_hours_remaining']), abs=0.2)
+
+    inputs, elapsed = rul.synthetic_inputs(100000)
+    rul.memo.clear()
+    started = time.perf_counter()
+    first = rul.predict(model, inputs, elapsed)
+    elapsed_time = time.perf_counter() - started
+    assert first['predicted_hours'].shape == (100000, 4) and not first['predicted_hours'].flags.writeable
+    assert elapsed_time < 0.5, f"Scoring 100,000 bearings took {elapsed_time * 1000:.0f} ms"
+    assert rul.predict(model, inputs.copy(), elapsed) is first and rul.memo.hits == 1
+    assert rul.predict(model, inputs[:10], elapsed[:10]) is not first
+    np.testing.assert_allclose(rul.predict(model, inputs[:10], elapsed[:10])['predicted_hours'], first['predicted_hours'][:10])
+
+    out = io.StringIO()
+    call_command('benchmark_predictions', '--bearings', '1000', '--repeat', '1', stdout=out)
+    assert '1000 bearings (4000 predictions)' in out.getvalue()
+
+
+# 53. Tests the accumulated correlation matrix matches a full recompute, for the fleet and for subsets
+def test_correlation_matrix(client):
+    degradation = repository.get_artifact('degradation_features')
+    values = correlation.observations(degradation)
+    labels = np.array([channel.label for channel in degradation.channels])
+    index = correlation.CorrelationIndex()
+    assert index.refresh(degradation) == (0, len(degradation.labels) * len(correlation.BANDS))
+
+    everything = values.reshape(-1, len(correlation.FEATURES))
+    np.testing.assert_allclose(index.covariance().correlation(), np.corrcoef(everything, rowvar=False))
+    subset = values[labels == 'Roller'][:, correlation.BANDS.index('mid')].reshape(-1, len(correlation.FEATURES))
+    np.testing.assert_allclose(index.covariance(['Roller'], ['mid']).correlation(), np.corrcoef(subset, rowvar=False))
+
+    # merging accumulators of parts equals accumulating everything at once
+    parts = np.array_split(everything, [5, 40])
+    merged = correlation.Covariance(len(correlation.FEATURES))
+    for part in parts:
+        merged = merged.merge(correlation.Covariance.of(part))
+    np.testing.assert_allclose(merged.correlation(), np.corrcoef(everything, rowvar=False))
+    assert merged.count == len(everything)
+
+    # a refresh only accumulates the groups whose observations changed
+    assert index.refresh(degradation) == (0, 0)
+    changed = results.DegradationFeatures()
+    changed.channels, changed.ratios, changed.rates = degradation.channels, degradation.ratios, degradation.rates
+    changed.stability = degradation.stability.copy()
+    changed.stability[labels == 'Roller'] += 1
+    assert index.refresh(changed) == (len(correlation.BANDS), 0)
+
+    # new channels are merged into their groups, matching a fresh build without rebuilding anything
+    last = {label: np.flatnonzero(labels == label)[-1] for label in degradation.labels}
+    keep = ~np.isin(np.arange(len(labels)), list(last.values()))
+    partial = results.DegradationFeatures()
+    partial.channels = tuple(channel for channel, kept in zip(degradation.channels, keep) if kept)
+    partial.ratios, partial.rates, partial.stability = degradation.ratios[keep], degradation.rates[keep], degradation.stability[keep]
+    index = correlation.CorrelationIndex()
+    index.refresh(partial)
+    before = index.covariance()
+    assert index.refresh(degradation) == (0, len(degradation.labels) * len(correlation.BANDS))
+    fresh = correlation.CorrelationIndex()
+    fresh.refresh(degradation)
+    np.testing.assert_allclose(index.covariance().comoment, fresh.covariance().comoment)
+    np.testing.assert_allclose(index.covariance().correlation(), np.corrcoef(everything, rowvar=False))
+    assert before.count == len(everything) - len(last) * len(correlation.BANDS) * len(features.STAGES)
+
+    response = client.get('/api/correlation/')
+    data = response.json()
+    assert response.status_code == 200 and data['features'] == correlation.FEATURES
+    assert data['observations'] == len(everything) and len(data['matrix']) == len(correlation.FEATURES)
+    assert all(value is None or -1 <= value <= 1 for row in data['matrix'] for value in row)
+    assert client.get('/api/correlation/', headers={'If-None-Match': response['ETag']}).status_code == 304
+    subset_data = client.get('/api/correlation/?failure=Roller&band=mid').json()
+    assert subset_data['observations'] == len(subset) and subset_data['bands'] == ['mid']
+    assert client.get('/api/correlation/?band=ultra').status_code == 400
+
+
+# 54. Tests streaming Welch spectra: chunking doesn't change the result, memory stays bounded, and the API caches
+def test_streaming_spectra(client, tmp_path):
+    rate, segment = 20000, 1024
+    t = np.arange(200000) / rate
+    rng = np.random.default_rng(0)
+    data = np.stack([np.sin(2 * np.pi * 2500 * t), 0.1 * rng.normal(size=len(t))])
+
+    frequencies, psd = spectra.welch([data], rate, segment)
+    # a 2.5 kHz sine of amplitude 1 has power 1/2, all of it in the mid band
+    energy = spectra.band_energy(frequencies, psd)
+    assert abs(energy[0, 1] - 0.5) < 0.005 and energy[0, 0] < 1e-3 and energy[0, 2] < 1e-3
+    assert frequencies[psd[0].argmax()] == 2500
+    # white noise: flat density at variance / (rate / 2)
+    assert abs(psd[1, 10:-10].mean() - 0.01 / (rate / 2)) < 0.05 * 0.01 / (rate / 2)
+
+    # chunk boundaries anywhere, as blocks of a generator or slices of a memmap
+    for chunk in [1000, 4097, 65536]:
+        np.testing.assert_allclose(spectra.welch(spectra.chunks(list(data), chunk), rate, segment)[1], psd, rtol=1e-10)
+    path = tmp_path / 'channel.f32'
+    data.astype('<f4').tofile(path)
+    mapped = np.memmap(path, dtype='<f4', mode='r', shape=data.shape)
+    expected = spectra.welch([data.astype('<f4')], rate, segment)[1]
+    np.testing.assert_allclose(spectra.welch(spectra.chunks(list(mapped), 3000), rate, segment)[1], expected, rtol=1e-10)
+
+    freqs, reduced = spectra.reduce(frequencies, psd, 100)
+    assert len(freqs) <= 100 and reduced.shape == (2, len(freqs))
+    np.testing.assert_allclose(reduced[:, 0], psd[:, :len(psd[0]) // len(freqs) + 1].mean(axis=1), rtol=1e-10)
+
+    # 30 million samples per channel (480 MB as float64) in a few MB
+    def long_recording():
+        for _ in range(460):
+            yield rng.normal(size=(2, 65536))
+
+    tracemalloc.start()
+    frequencies, psd = spectra.welch(long_recording(), rate, segment)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert peak < 16 * 2 ** 20, f"peak {peak / 2 ** 20:.1f} MB"
+    assert abs(psd[:, 10:-10].mean() * rate / 2 - 1) < 0.01
+
+    with pytest.raises(ValueError):
+        spectra.welch([data[:, :100]], rate, segment)
+
+    index = client.get('/api/spectra/').json()
+    assert index['sets']['1']['url'] == '/api/spectra/1' and index['default_segment'] in index['segments']
+    response = client.get('/api/spectra/1?segment=2048&points=200')
+    data = response.json()
+    assert response.status_code == 200 and data['resolution_hz'] == 20000 / 2048
+    assert len(data['frequencies']) <= 200 and [c['channel'] for c in data['channels']] == list(range(1, 9))
+    assert all(len(c['psd']) == len(data['frequencies']) and set(c['band_energy']) == set(features.BANDS) for c in data['channels'])
+    assert client.get('/api/spectra/1?segment=2048&points=200', headers={'If-None-Match': response['ETag']}).status_code == 304
+    assert client.get('/api/spectra/1?segment=1000').status_code == 400
+    assert client.get('/api/spectra/9').status_code == 404
+
+
+# 55. Tests the health checks answer without rendering, and readiness waits for the warm-up
+def test_health_checks(client, monkeypatch):
+    health.reset()
+    response = client.get('/healthz')
+    assert response.status_code == 200 and response.content == b'ok' and 'no-store' in response['Cache-Control']
+
+    # the first probe of a cold process starts the warm-up and reports not ready
+    response = client.get('/readyz')
+    assert response.status_code == 503 and response.json()['status'] == 'warming up'
+    thread = health._state['thread']
+    if thread is not None:
+        thread.join()
+    assert client.get('/readyz').status_code == 200
+    # the page is in the cache: the first real request doesn't render
+    monkeypatch.setattr(views, '_render_dashboard', lambda request: pytest.fail('dashboard rendered after warm-up'))
+    assert client.get('/').status_code == 200
+
+    factory = RequestFactory()
+    for view in [views.healthz, views.readyz]:
+        request = factory.get('/')
+        started = time.perf_counter()
+        for _ in range(100):
+            assert view(request).status_code == 200
+        elapsed = (time.perf_counter() - started) / 100
+        assert elapsed < 0.001, f"{view.__name__} took {elapsed * 1000:.2f} ms"
+
+    # losing the data in memory makes the process not ready until it warms up again
+    repository.clear_cache()
+    assert client.get('/readyz').status_code == 503
+    thread = health._state['thread']
+    if thread is not None:
+        thread.join()
+    assert client.get('/readyz').status_code == 200
+
+    health.reset()
+    monkeypatch.setattr(health.preload, 'preload', lambda: (_ for _ in ()).throw(OSError('disk gone')))
+    client.get('/readyz')
+    thread = health._state['thread']
+    if thread is not None:
+        thread.join()
+    data = client.get('/readyz').json()
+    assert data['status'] == 'warming up' and 'disk gone' in data['error']
+    health.start_warm_up().join()
+
+    # a failed warm-up under gunicorn is logged and the server still boots, not ready
+    class Log:
+        def __init__(self):
+            self.errors = []
+
+        def info(self, *args):
+            pass
+
+        def exception(self, message, *args):
+            self.errors.append(message)
+
+    server = types.SimpleNamespace(log=Log())
+    config = runpy.run_path(os.path.join(os.path.dirname(os.path.dirname(views.__file__)), 'gunicorn.conf.py'))
+    monkeypatch.setattr(health.preload, 'freeze', lambda: 0)
+    config['when_ready'](server)
+    config['post_worker_init'](server)
+    assert len(server.log.errors) == 2 and 'disk gone' in health._state['error']
+    assert client.get('/readyz').status_code == 503
+    health.start_warm_up().join()
+    health.reset()
+
+
+# 56. Tests the exports stream every row of the artifacts, filtered, in constant memory
+def test_streaming_export(client):
+    index = client.get('/api/export/').json()
+    assert set(index['datasets']) == set(export.DATASETS) and index['formats'][:2] == ['csv', 'ndjson']
+
+    response = client.get('/api/export/band_changes')
+    assert response.streaming and response['Content-Disposition'] == 'attachment; filename="band_changes.csv"'
+    table = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+    analysis = repository.get_artifact('bearing_analysis_results')
+    assert len(table) == len(analysis.channels)
+    row = next(row for row in table if (row['set'], row['bearing'], row['channel']) == ('1', '3', '5'))
+    assert float(row['mid_band_change']) == analysis.bearing(1, 3).channel(5).mid_band_change
+
+    response = client.get('/api/export/degradation?format=ndjson&set=1&channel=7')
+    rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+    assert len(rows) == len(features.BANDS) * len(features.METRICS)
+    assert {(row['failure'], row['bearing'], row['channel']) for row in rows} == {('Roller', 4, 7)}
+    assert [row[3] for row in export.rows('degradation', {})[1]].count(7) == len(rows)
+
+    response = client.get('/api/export/predictions?set=1')
+    table = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+    assert len(table) == 8 and {row['bearing'] for row in table} == {'3', '4'}
+
+    for url in ['/api/export/predictions?channel=1', '/api/export/band_changes?set=x', '/api/export/band_changes?format=xlsx']:
+        assert client.get(url).status_code == 400, url
+    assert client.get('/api/export/everything').status_code == 404
+
+    if export.pyarrow is None:
+        assert client.get('/api/export/band_changes?format=parquet').status_code == 400
+    else:
+        response = client.get('/api/export/degradation?format=parquet')
+        parquet = export.pyarrow.parquet.read_table(io.BytesIO(b''.join(response.streaming_content)))
+        assert parquet.num_rows == 72 and parquet.schema.field('set').type == export.pyarrow.int64()
+
+    # memory held while streaming doesn't depend on the number of rows
+    peaks = []
+    for scale in [20, 400]:
+        degradation = results.DegradationFeatures.from_json(synthetic.scaled_artifacts(scale)['degradation_features'])
+        tracemalloc.start()
+        size = sum(len(chunk) for chunk in export.formats()['csv'][2](*export.rows('degradation', {}, degradation)))
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        assert size > scale * 72 * 100
+    assert peaks[1] < 1.5 * peaks[0] + 64 * 1024 and peaks[1] < 1024 * 1024, peaks
+
+
+# 57. Tests the cross-channel engine finds known lags, phases and coherence, batch by batch, and caches per version
+def test_cross_channel(client, monkeypatch):
+    rate, n = 20000, 60000
+    rng = np.random.default_rng(0)
+    noise = rng.normal(size=n + 30)
+    t = np.arange(n) / rate
+    tone = np.sin(2 * np.pi * 2500 * t)
+    # channel 1 is channel 0 delayed by 30 samples; channel 2 is a 2.5 kHz tone 60 degrees behind channel 0's
+    values = np.stack([noise[30:] + tone, noise[:-30], np.sin(2 * np.pi * 2500 * t - np.pi / 3) + 0.01 * rng.normal(size=n)])
+    result = cross_channel.analyse(values, rate, 1024)
+    assert result['pairs'] == [(0, 1), (0, 2), (1, 2)] and result['windows'] == (n - 1024) // 512 + 1
+    assert np.all(result['lag_seconds'][0] * rate == 30) and np.all(result['correlation'][0] > 0.6)
+    assert abs(result['band_phase_lag'][1, 1] - 60) < 1 and result['band_coherence'][1, 1] > 0.95
+    assert result['band_coherence'][1, 0] < 0.1 and result['band_coherence'][2, 1] < 0.1
+    np.testing.assert_allclose(np.median(result['rms_ratio'][0]), np.sqrt(1.5), rtol=0.05)
+
+    # batches don't change the result, and memmaps work as lists of channels
+    monkeypatch.setattr(cross_channel, 'BATCH', 7)
+    batched = cross_channel.analyse(list(values), rate, 1024)
+    for key in ['correlation', 'lag_seconds', 'coherence', 'phase_lag']:
+        np.testing.assert_allclose(batched[key], result[key], atol=1e-9)
+    with pytest.raises(ValueError):
+        cross_channel.analyse(values[:, :100], rate, 1024)
+
+    index = client.get('/api/cross-channel/').json()
+    assert [(entry['set'], entry['bearing']) for entry in index['bearings']] == [(1, 1), (1, 2), (1, 3), (1, 4)]
+    cross_channel.clear_cache()
+    response = client.get('/api/cross-channel/1/3?window=1024')
+    data = response.json()
+    assert response.status_code == 200 and data['channels'] == [5, 6] and len(data['pairs']) == 1
+    pair = data['pairs'][0]
+    assert pair['channels'] == [5, 6] and len(pair['windows']['correlation']) == len(data['starts'])
+    assert set(pair['phase_lag']) == set(features.BANDS) and all(0 <= value <= 1 for value in pair['coherence']['values'])
+    assert cross_channel.bearing_pairs(1, 3, 1024) is cross_channel.bearing_pairs(1, 3, 1024)
+    assert cross_channel._bearing_pairs.cache_info().misses == 1
+    assert client.get('/api/cross-channel/1/3?window=1024', headers={'If-None-Match': response['ETag']}).status_code == 304
+
+    assert client.get('/api/cross-channel/2/1').json()['pairs'] == []
+    assert client.get('/api/cross-channel/1/3?window=1000').status_code == 400
+    assert client.get('/api/cross-channel/1/9').status_code == 404
+
+
+# 58. Tests the load generator against the app objects, forked workers and HTTP servers, and its report
+def test_load_test_harness():
+    paths = ['/healthz', '/api/alerts/', '/missing']
+    for target in load_test.IN_PROCESS:
+        samples, seconds = asyncio.run(load_test.drive(target, paths, 3, requests=2))
+        report = load_test.summarize(samples, seconds, paths)
+        assert report['requests'] == 6 and report['statuses'] == {'200': 4, '404': 2}, target
+        assert abs(report['error_rate'] - 1 / 3) < 1e-3 and report['paths']['/missing']['error_rate'] == 1
+        assert report['paths']['/healthz']['bytes'] == 2 * len(b'ok') and report['p50'] <= report['p99']
+
+    # two forked workers with the three clients split between them
+    samples, seconds = load_test.run_workers('wsgi', paths, 3, 2, requests=2)
+    assert len(samples) == 6 and {sample[2] for sample in samples} == {200, 404}
+
+    # a real server that closes every connection (HTTP/1.0), so clients reconnect
+    from bearing_dashboard.wsgi import application
+
+    class Server(socketserver.ThreadingMixIn, simple_server.WSGIServer):
+        daemon_threads = True
+
+    class Handler(simple_server.WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    server = simple_server.make_server('127.0.0.1', 0, application, server_class=Server, handler_class=Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        report = load_test.run(f'http://127.0.0.1:{server.server_port}', paths, 2, requests=3)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert report['requests'] == 6 and report['statuses'] == {'200': 4, '404': 2}
+    assert report['paths']['/healthz']['bytes'] == 2 * len(b'ok')
+
+    # keep-alive with chunked bodies: one connection per client for every request
+    connections = []
+
+    async def chunked(reader, writer):
+        connections.append(writer)
+        while (await reader.readline()).strip():
+            while (await reader.readline()).strip():
+                pass
+            writer.write(b'HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n5\r\nhello\r\n6;x=y\r\n world\r\n0\r\n\r\n')
+            await writer.drain()
+        writer.close()
+
+    async def chunked_run():
+        server = await asyncio.start_server(chunked, '127.0.0.1', 0)
+        async with server:
+            port = server.sockets[0].getsockname()[1]
+            return await load_test.drive(f'http://127.0.0.1:{port}', ['/a', '/b'], 2, requests=5)
+
+    samples, seconds = asyncio.run(chunked_run())
+    assert len(connections) == 2 and [sample[2:] for sample in samples] == [(200, 11)] * 10
+
+    out = io.StringIO()
+    call_command('load_test', '--clients', '2', '--requests', '2', '--path', '/healthz', stdout=out)
+    header, row = out.getvalue().splitlines()
+    assert header.split()[:3] == ['workers', 'clients', 'requests'] and row.split()[:3] == ['1', '2', '4']
+    with pytest.raises(CommandError):
+        call_command('load_test', '--target', 'ftp://example')
+
+
+# 59. Tests phases timed from concurrent worker threads of one request all add up
+def test_timed_from_threads(monkeypatch):
+    # every block lasts exactly one tick of its own thread's clock
+    clock = threading.local()
+
+    def ticks():
+        clock.now = getattr(clock, 'now', -1) + 1
+        return float(clock.now)
+
+    def branch():
+        for _ in range(2000):
+            with timing.timed('load'):
+                pass
+
+    monkeypatch.setattr(timing, 'perf_counter', ticks)
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    token = timing.start()
+    try:
+        # the dashboard_async loads run like this: threads sharing the request's context
+        threads = [threading.Thread(target=contextvars.copy_context().run, args=(branch,)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        timings = timing.stop(token)
+        sys.setswitchinterval(interval)
+    assert timings == {'load': 8 * 2000}
+
+
+# 60. Tests runs too short for three stages are rejected instead of giving NaN statistics
+def test_short_runs_rejected(ims_run, tmp_path):
+    with pytest.raises(ValueError, match='at least 3'):
+        features.stage_slices(2)
+    assert [(s.start, s.stop) for s in features.stage_slices(3)] == [(0, 1), (1, 2), (2, 3)]
+    stacked = features.stack_features(features.process_snapshot(path) for path in features.list_snapshots(ims_run)[:2])[2]
+    with pytest.raises(ValueError, match='at least 3'):
+        features.summarize(stacked)
+
+    for path in features.list_snapshots(ims_run)[2:]:
+        os.remove(path)
+    with pytest.raises(CommandError, match='Set 1: 2 snapshots are too few'):
+        call_command('build_features', '--set', f'1={ims_run}', '--output', str(tmp_path / 'out'), '--workers', '1', stdout=io.StringIO())
+    assert not (tmp_path / 'out').exists()
@@ -0,0 +1,49 @@
+"""
+Per-request phase timings.
+
+TimingMiddleware (middleware.py) gives every request a dict of phase
+durations held in a context variable. Code on the request path wraps its
+expensive steps in ``timed('<phase>')``. Outside a request, e.g. in
+management commands, ``timed`` only reads the context variable.
+
+The worker threads of one request (views.dashboard_async gathers its loads
+in several) share its dict, so every update holds a lock.
+"""
+import threading
+from contextvars import ContextVar
+from time import perf_counter
+
+
+_timings = ContextVar('request_timings', default=None)
+_lock = threading.Lock()
+
+
+def start():
+    return _timings.set({})
+
+
+def stop(token):
+    timings = _timings.get()
+    _timings.reset(token)
+    return timings
+
+
+class timed:
+    """Adds the time spent in the block to ``phase`` of the current request."""
+
+    __slots__ = ('phase', 'timings', 'started')
+
+    def __init__(self, phase):
+        self.phase = phase
+
+    def __enter__(self):
+        self.timings = _timings.get()
+        if self.timings is not None:
+            self.started = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.timings is not None:
+            elapsed = perf_counter() - self.started
+            with _lock:
+                self.timings[self.phase] = self.timings.get(self.phase, 0.0) + elapsed
@@ -1,9 +1,42 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
 app_name = 'analysis'
 
 urlpatterns = [
-    # connects dashboard view to the root URL
-    path('', views.dashboard, name='dashboard'),
-]
\ No newline at end of file
+    # connects dashboard view to the root URL, the async one under ASGI
+    path('', views.dashboard_async if settings.DASHBOARD_ASYNC else views.dashboard, name='dashboard'),
+    # single plot fragments, loaded lazily by the dashboard shell
+    path('sections/<str:group>/<str:name>', views.section, name='section'),
+    # downsampled raw signals for zooming into the time-domain plots
+    path('api/signals/', views.signal_index, name='signal_index'),
+    path('api/signals/<int:set_number>/<int:bearing>/<int:channel>', views.signal_series, name='signal_series'),
+    # Welch spectra and band energies of the raw signals, computed in bounded memory
+    path('api/spectra/', views.spectra_index, name='spectra_index'),
+    path('api/spectra/<int:set_number>', views.set_spectra, name='set_spectra'),
+    # correlation, lag, coherence and phase between the channels of a bearing over sliding windows
+    path('api/cross-channel/', views.cross_channel_index, name='cross_channel_index'),
+    path('api/cross-channel/<int:set_number>/<int:bearing>', views.cross_channel_pairs, name='cross_channel_pairs'),
+    # per-snapshot feature history, bucketed by time
+    path('api/history/<int:set_number>/<int:bearing>/<int:channel>/<str:feature>', views.feature_history, name='feature_history'),
+    # every bearing, filtered, sorted and paginated in the database
+    path('fleet/', views.fleet_list, name='fleet_list'),
+    path('api/fleet/', views.fleet_api, name='fleet_api'),
+    # flat rows of the artifacts as CSV, NDJSON or Parquet, streamed
+    path('api/export/', views.export_index, name='export_index'),
+    path('api/export/<str:dataset>', views.export_rows, name='export_rows'),
+    # remaining useful life scored from the degradation features (analysis/rul.py)
+    path('api/predictions/', views.rul_predictions, name='rul_predictions'),
+    # correlation between the degradation features as a heatmap, optionally per failure type or band
+    path('api/correlation/', views.correlation_matrix, name='correlation_matrix'),
+    # alerts from the declarative rules in analysis/alerts.py
+    path('api/alerts/', views.alert_list, name='alert_list'),
+    # live accuracy, alert and band updates as server-sent events
+    path('api/live/', views.live_events, name='live_events'),
+    # load balancer health checks: process alive, and data loaded with the page cache warm
+    path('healthz', views.healthz, name='healthz'),
+    path('readyz', views.readyz, name='readyz'),
+    # request timing histograms in the Prometheus text format
+    path('metrics', views.metrics_view, name='metrics'),
+]
@@ -1,52 +1,521 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
-import json
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+import asyncio
+import datetime
+import functools
+import hashlib
+import math
 import os
 
+from . import alerts, caching, correlation, cross_channel, downsampling, export, fleet, health, history, live, metrics, plots, repository, rul, signals, spectra
+from .timing import timed
+
+
 def dashboard(request):
-    content = {'raw': [], 'fft': [], 'bearing_analysis_results': {}, 'filtered_signals': [], 'prediction_analysis': {},}
+    # light shell: plot fragments are fetched per section as they scroll into view
+    return _versioned_response(request, caching.dashboard_version(), _render_dashboard)
 
-    raw = 'analysis/templates/analysis/raw_signals/'
-    content['raw'] = []
 
-    # List files in the raw_signals directory
-    raw_files = os.listdir(raw)
+async def dashboard_async(request):
+    # the same page for ASGI servers (see asgi.py): blocking work runs in worker threads,
+    # one hop to fingerprint the inputs and look up the rendered page, and on a miss the
+    # independent loads of a render concurrently, so the event loop keeps serving requests
+    version, cached = await sync_to_async(_cached_page, thread_sensitive=False)(caching.dashboard_version)
+    if version is not None:
+        not_modified = get_conditional_response(request, etag=version.etag, last_modified=version.last_modified)
+        if not_modified is not None:
+            return _set_validators(not_modified, version)
+        if cached is not None:
+            page, content_type = cached
+            return _set_validators(HttpResponse(page, content_type=content_type), version)
 
-    if not raw_files:  # If no files are found
-        content['raw'] = [{'error': 'No raw signals found'}]
+    response, degraded = await _render_dashboard_async(request)
+    if version is None or degraded:
+        return response
+    with timed('cache'):
+        await sync_to_async(cache.set, thread_sensitive=False)(version.cache_key, (response.content, response['Content-Type']), timeout=None)
+    return _set_validators(response, version)
+
+
+def section(request, group, name):
+    # a single plot fragment, e.g. /sections/raw/raw_signals_set1.html
+    if group not in plots.PLOT_GROUPS or name not in plots.list_plots(group):
+        raise Http404(f'No {group} plot named {name}')
+
+    path = plots.plot_path(group, name)
+    stat = os.stat(path)
+    version = caching.ContentVersion(
+        digest=caching.file_digest(path, stat)[:32],
+        last_modified=int(stat.st_mtime),
+        namespace='section',
+    )
+
+    def render_section(request):
+        # raw traces are sent downsampled; zooming refetches detail from the signal API
+        with timed('render'):
+            fragment = signals.render_raw_fragment(name) if group == 'raw' else None
+            if fragment is not None:
+                return HttpResponse(fragment), False
+            return render(request, plots.plot_template(group, name)), False
+
+    return _versioned_response(request, version, render_section)
+
+
+def signal_index(request):
+    return JsonResponse({'sets': signals.signal_index()})
+
+
+def signal_series(request, set_number, bearing, channel):
+    # e.g. /api/signals/1/3/5?start=0.2&end=0.3&points=1000&method=lttb
+    try:
+        start = _float_param(request, 'start')
+        end = _float_param(request, 'end')
+        points = int(request.GET.get('points', signals.DEFAULT_POINTS))
+    except ValueError:
+        return JsonResponse({'error': 'start and end must be numbers, points an integer'}, status=400)
+    method = request.GET.get('method', 'minmax')
+    if method not in downsampling.METHODS:
+        return JsonResponse({'error': f'method must be one of {", ".join(downsampling.METHODS)}'}, status=400)
+    if not 2 <= points <= signals.MAX_POINTS:
+        return JsonResponse({'error': f'points must be between 2 and {signals.MAX_POINTS}'}, status=400)
+    if start is not None and end is not None and end < start:
+        return JsonResponse({'error': 'end must not be before start'}, status=400)
+
+    try:
+        signal = signals.get_signal(set_number, bearing, channel)
+    except LookupError as e:
+        return JsonResponse({'error': str(e)}, status=404)
+
+    data_version, data_mtime = signals.data_version(set_number)
+    query = f'{data_version}:{bearing}:{channel}:{start}:{end}:{points}:{method}'
+    version = caching.ContentVersion(
+        digest=hashlib.sha256(query.encode()).hexdigest()[:32],
+        last_modified=int(data_mtime),
+        namespace='signals',
+    )
+
+    def render_series(request):
+        data = signals.series(signal, start, end, points, method)
+        data.update({'set': set_number, 'bearing': bearing, 'channel': channel})
+        return JsonResponse(data), False
+
+    return _versioned_response(request, version, render_series)
+
+
+def spectra_index(request):
+    # sets with signals to analyse and the segment lengths (frequency resolutions) on offer
+    index = signals.signal_index()
+    return JsonResponse({
+        'sets': {
+            set_number: {
+                'url': reverse('analysis:set_spectra', args=[int(set_number)]),
+                'sample_rate': info['sample_rate'],
+                'samples': info['samples'],
+            }
+            for set_number, info in index.items()
+        },
+        'segments': spectra.SEGMENTS,
+        'default_segment': spectra.DEFAULT_SEGMENT,
+    })
+
+
+def set_spectra(request, set_number):
+    # e.g. /api/spectra/1?segment=8192&points=500: Welch spectra and band energies of every channel
+    try:
+        segment = int(request.GET.get('segment', spectra.DEFAULT_SEGMENT))
+        points = int(request.GET.get('points', spectra.DEFAULT_POINTS))
+    except ValueError:
+        return JsonResponse({'error': 'segment and points must be integers'}, status=400)
+    if segment not in spectra.SEGMENTS:
+        return JsonResponse({'error': f'segment must be one of {", ".join(map(str, spectra.SEGMENTS))}'}, status=400)
+    if not 2 <= points <= spectra.MAX_POINTS:
+        return JsonResponse({'error': f'points must be between 2 and {spectra.MAX_POINTS}'}, status=400)
+
+    try:
+        data_version, data_mtime = signals.data_version(set_number)
+    except FileNotFoundError:
+        return JsonResponse({'error': f'No raw signals for set {set_number}'}, status=404)
+    query = f'{data_version}:{set_number}:{segment}:{points}'
+    version = caching.ContentVersion(
+        digest=hashlib.sha256(query.encode()).hexdigest()[:32],
+        last_modified=int(data_mtime),
+        namespace='spectra',
+    )
+
+    def render_spectra(request):
+        with timed('render'):
+            try:
+                return JsonResponse(spectra.set_spectra(set_number, segment, points)), False
+            except LookupError as e:
+                return JsonResponse({'error': str(e)}, status=404), True
+            except ValueError as e:
+                return JsonResponse({'error': str(e)}, status=400), True
+
+    return _versioned_response(request, version, render_spectra)
+
+
+def cross_channel_index(request):
+    # bearings with more than one channel, whose channel pairs can be compared
+    return JsonResponse({
+        'bearings': [
+            {
+                'set': set_number,
+                'bearing': bearing,
+                'channels': channels,
+                'url': reverse('analysis:cross_channel_pairs', args=[set_number, bearing]),
+            }
+            for set_number, bearing, channels in cross_channel.multichannel_bearings()
+        ],
+        'windows': cross_channel.WINDOWS,
+        'default_window': cross_channel.DEFAULT_WINDOW,
+    })
+
+
+def cross_channel_pairs(request, set_number, bearing):
+    # e.g. /api/cross-channel/1/3?window=4096: correlation, lag, coherence and phase of channels 5 and 6
+    try:
+        window = int(request.GET.get('window', cross_channel.DEFAULT_WINDOW))
+    except ValueError:
+        return JsonResponse({'error': 'window must be an integer'}, status=400)
+    if window not in cross_channel.WINDOWS:
+        return JsonResponse({'error': f'window must be one of {", ".join(map(str, cross_channel.WINDOWS))}'}, status=400)
+    if not signals.bearings(set_number).get(bearing):
+        return JsonResponse({'error': f'Set {set_number} has no bearing {bearing}'}, status=404)
+    try:
+        data_version, data_mtime = signals.data_version(set_number)
+    except FileNotFoundError:
+        return JsonResponse({'error': f'No raw signals for set {set_number}'}, status=404)
+    query = f'{data_version}:{set_number}:{bearing}:{window}'
+    version = caching.ContentVersion(
+        digest=hashlib.sha256(query.encode()).hexdigest()[:32],
+        last_modified=int(data_mtime),
+        namespace='cross_channel',
+    )
+
+    def render_pairs(request):
+        with timed('render'):
+            try:
+                return JsonResponse(cross_channel.bearing_pairs(set_number, bearing, window)), False
+            except LookupError as e:
+                return JsonResponse({'error': str(e)}, status=404), True
+            except ValueError as e:
+                return JsonResponse({'error': str(e)}, status=400), True
+
+    return _versioned_response(request, version, render_pairs)
+
+
+def alert_list(request):
+    # e.g. /api/alerts/?level=warning for warnings and anything more severe
+    level = request.GET.get('level', alerts.LEVELS[0])
+    if level not in alerts.LEVELS:
+        return JsonResponse({'error': f'level must be one of {", ".join(alerts.LEVELS)}'}, status=400)
+    try:
+        fired = alerts.current_alerts()
+    except (OSError, ValueError):
+        return JsonResponse({'error': 'Analysis data is unavailable'}, status=503)
+    minimum = alerts.LEVELS.index(level)
+    fired = [alert for alert in fired if alerts.LEVELS.index(alert['level']) >= minimum]
+    return JsonResponse({'alerts': fired, 'count': len(fired)})
+
+
+def fleet_list(request):
+    # e.g. /fleet/?health=critical&sort=predicted_hours&page=2
+    context = {
+        'failures': fleet.failure_labels(),
+        'health_levels': fleet.HEALTH,
+        'sorts': [(f'{prefix}{sort}', f'{sort.replace("_", " ").capitalize()}, {order}')
+                  for sort in fleet.SORTS for prefix, order in [('-', 'highest first'), ('', 'lowest first')]],
+    }
+    try:
+        context['listing'] = fleet.page(fleet.parse_query(request.GET))
+    except ValueError as e:
+        context.update(error=str(e), listing={'count': 0, 'filters': {}})
+        return render(request, 'analysis/fleet.html', context, status=400)
+    return render(request, 'analysis/fleet.html', context)
+
+
+def fleet_api(request):
+    # the same listing as JSON, e.g. /api/fleet/?set=1&min_accuracy=80&sort=-predicted_hours
+    try:
+        query = fleet.parse_query(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(fleet.page(query))
+
+
+def export_index(request):
+    # what /api/export/<dataset> can stream, and in which formats here
+    return JsonResponse({
+        'datasets': {
+            dataset: {
+                'url': reverse('analysis:export_rows', args=[dataset]),
+                'columns': columns,
+                'filters': filters,
+            }
+            for dataset, (_, columns, _, filters) in export.DATASETS.items()
+        },
+        'formats': list(export.formats()),
+    })
+
+
+def export_rows(request, dataset):
+    # e.g. /api/export/degradation?format=ndjson&set=1&channel=5, streamed row by row
+    if dataset not in export.DATASETS:
+        raise Http404(f'No dataset named {dataset}')
+    formats = export.formats()
+    format_name = request.GET.get('format', 'csv')
+    if format_name not in formats:
+        return JsonResponse({'error': f'format must be one of {", ".join(formats)}'}, status=400)
+    try:
+        filters = export.parse_filters(dataset, request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    try:
+        # loaded before the response starts, so a missing artifact is still a clean error
+        columns, rows = export.rows(dataset, filters)
+    except (OSError, ValueError):
+        return JsonResponse({'error': 'Analysis data is unavailable'}, status=503)
+
+    content_type, extension, stream = formats[format_name]
+    response = StreamingHttpResponse(stream(columns, rows), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{dataset}.{extension}"'
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def rul_predictions(request):
+    # hours remaining of every bearing computed from the degradation features, e.g. ?elapsed=1:3:812.5
+    # for the hours run by set 1 bearing 3 when the feature checkpoint has no snapshot timestamps for it
+    try:
+        elapsed = rul.parse_elapsed(request.GET.getlist('elapsed'))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    try:
+        data = rul.current_predictions(elapsed)
+    except (OSError, ValueError):
+        return JsonResponse({'error': 'Analysis data is unavailable'}, status=503)
+    return JsonResponse(data)
+
+
+def correlation_matrix(request):
+    # e.g. /api/correlation/?failure=Roller&band=mid&band=high; every failure type and band by default
+    try:
+        index = correlation.current_index()
+        artifact = repository.ARTIFACTS['degradation_features']
+        mtime = os.stat(artifact.path).st_mtime
+    except (OSError, ValueError):
+        return JsonResponse({'error': 'Analysis data is unavailable'}, status=503)
+    failures = request.GET.getlist('failure') or None
+    bands = request.GET.getlist('band') or None
+    unknown = [value for value in failures or [] if value not in index.labels]
+    unknown += [value for value in bands or [] if value not in correlation.BANDS]
+    if unknown:
+        return JsonResponse({
+            'error': f'Unknown failure type or band: {", ".join(unknown)}',
+            'failures': index.labels,
+            'bands': correlation.BANDS,
+        }, status=400)
+
+    query = f'{artifact.version}:{failures}:{bands}'
+    version = caching.ContentVersion(
+        digest=hashlib.sha256(query.encode()).hexdigest()[:32],
+        last_modified=int(mtime),
+        namespace='correlation',
+    )
+
+    def render_heatmap(request):
+        with timed('render'):
+            return JsonResponse(correlation.heatmap(index, failures, bands)), False
+
+    return _versioned_response(request, version, render_heatmap)
+
+
+def healthz(request):
+    # liveness for the load balancer: the process runs views, nothing else is checked
+    response = HttpResponse('ok', content_type='text/plain')
+    patch_cache_control(response, no_store=True)
+    return response
+
+
+def readyz(request):
+    # readiness: artifacts in memory and the dashboard rendered, see analysis/health.py
+    ready, details = health.readiness()
+    response = JsonResponse(details, status=200 if ready else 503)
+    patch_cache_control(response, no_store=True)
+    return response
+
+
+def metrics_view(request):
+    # Prometheus scrape target, per process
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
+async def live_events(request):
+    # server-sent events: a snapshot of the live values, then deltas when the artifacts change
+    if isinstance(request, ASGIRequest):
+        response = StreamingHttpResponse(live.event_stream(live.broadcaster()), content_type='text/event-stream')
     else:
-        for f in raw_files:
-            content['raw'].append(f)
+        # a WSGI worker can't be held by an idle stream: send one snapshot and let the client reconnect
+        response = HttpResponse(await sync_to_async(live.single_snapshot)(), content_type='text/event-stream')
+    patch_cache_control(response, no_cache=True)
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def feature_history(request, set_number, bearing, channel, feature):
+    # e.g. /api/history/1/3/5/mid_kurtosis?start=2003-11-01T00:00:00&buckets=200
+    try:
+        start = _time_param(request, 'start')
+        end = _time_param(request, 'end')
+        buckets = int(request.GET.get('buckets', history.DEFAULT_BUCKETS))
+    except (ValueError, OverflowError):
+        return JsonResponse({'error': 'start and end must be epoch seconds or ISO 8601 times, buckets an integer'}, status=400)
+    if not 1 <= buckets <= history.MAX_BUCKETS:
+        return JsonResponse({'error': f'buckets must be between 1 and {history.MAX_BUCKETS}'}, status=400)
+    if start is not None and end is not None and end < start:
+        return JsonResponse({'error': 'end must not be before start'}, status=400)
+    if feature not in history.FEATURES:
+        return JsonResponse({'error': f'feature must be one of {", ".join(history.FEATURES)}'}, status=400)
 
-        
+    data = history.series(set_number, bearing, channel, feature, start, end, buckets)
+    data.update({'set': set_number, 'bearing': bearing, 'channel': channel})
+    return JsonResponse(data)
 
-    fft = 'analysis/templates/analysis/fft_analysis/'
-    for f in os.listdir(fft):
-        content['fft'].append(f)
 
+def _time_param(request, name):
+    value = request.GET.get(name)
+    if value in (None, ''):
+        return None
     try:
-        with open('analysis/static/analysis/data/bearing_analysis_results.json', 'r') as file:
-            bearing_analysis_results = json.load(file)
-            content['bearing_analysis_results'] = bearing_analysis_results
+        seconds = float(value)
+    except ValueError:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+        seconds = parsed.timestamp()
+    # int() raises OverflowError for infinities; the timestamp column is 64-bit
+    seconds = int(seconds)
+    if not -2 ** 63 <= seconds < 2 ** 63:
+        raise OverflowError(f'{name} is out of range')
+    return seconds
+
+
+def _float_param(request, name):
+    value = request.GET.get(name)
+    if value in (None, ''):
+        return None
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f'{name} must be finite')
+    return number
+
+
+def _versioned_response(request, version, render_page):
+    """
+    Serve a page whose content is fully determined by ``version``: answer
+    conditional requests with a 304, otherwise reuse the cached render.
+    """
+    if version is None:
+        response, degraded = render_page(request)
+        return response
+
+    # repeat visitors and monitors revalidate and get a 304 without a render
+    not_modified = get_conditional_response(request, etag=version.etag, last_modified=version.last_modified)
+    if not_modified is not None:
+        return _set_validators(not_modified, version)
+
+    with timed('cache'):
+        cached = cache.get(version.cache_key)
+    if cached is not None:
+        page, content_type = cached
+        response = HttpResponse(page, content_type=content_type)
+    else:
+        response, degraded = render_page(request)
+        if degraded:
+            return response
+        with timed('cache'):
+            cache.set(version.cache_key, (response.content, response['Content-Type']), timeout=None)
+
+    return _set_validators(response, version)
+
+
+def _cached_page(get_version):
+    """The current version from ``get_version`` and its cached render, if any."""
+    version = get_version()
+    if version is None:
+        return None, None
+    with timed('cache'):
+        return version, cache.get(version.cache_key)
+
+
+def _set_validators(response, version):
+    response['ETag'] = version.etag
+    response['Last-Modified'] = http_date(version.last_modified)
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def _render_dashboard(request):
+    return _render_content(request, {
+        'raw': plots.list_plots('raw'),
+        'fft': plots.list_plots('fft'),
+        'bearing_analysis_results': _bearing_analysis(),
+        'filtered_signals': plots.list_plots('filtered'),
+        'prediction_plots': plots.list_plots('prediction'),
+        'prediction_analysis': _prediction_analysis(),
+    })
+
+
+async def _render_dashboard_async(request):
+    loads = {
+        'raw': functools.partial(plots.list_plots, 'raw'),
+        'fft': functools.partial(plots.list_plots, 'fft'),
+        'bearing_analysis_results': _bearing_analysis,
+        'filtered_signals': functools.partial(plots.list_plots, 'filtered'),
+        'prediction_plots': functools.partial(plots.list_plots, 'prediction'),
+        'prediction_analysis': _prediction_analysis,
+    }
+    loaded = await asyncio.gather(*(sync_to_async(load, thread_sensitive=False)() for load in loads.values()))
+    content = dict(zip(loads, loaded))
+    return await sync_to_async(_render_content, thread_sensitive=False)(request, content)
+
+
+def _bearing_analysis():
+    try:
+        return repository.get_artifact('bearing_analysis_results')
     except PermissionError as e:
-        content['bearing_analysis_results'] = {'error': 'Error accessing bearing analysis data'}
+        return {'error': 'Error accessing bearing analysis data'}
     except Exception as e:
-        content['bearing_analysis_results'] = {'error': 'An error occurred while loading bearing analysis data'}
-
+        return {'error': 'An error occurred while loading bearing analysis data'}
 
 
+def _prediction_analysis():
+    # parsed and validated once per worker into results.py models, see analysis/repository.py
+    try:
+        return repository.get_artifact('prediction_analysis')
+    except Exception as e:
+        return {'error_message': 'An error occurred while loading prediction analysis data'}
 
-    filtered_signals = 'analysis/templates/analysis/filtered_signals/'
-    for f in os.listdir(filtered_signals):
-        content['filtered_signals'].append(f)
 
-    with open('analysis/static/analysis/data/prediction_analysis.json', 'r') as file:
-        prediction_analysis = json.load(file)
-        if 'model_performance' in prediction_analysis:
-            model_perf = prediction_analysis['model_performance']
-            if 'average_accuracy' in model_perf:
-                if model_perf['average_accuracy'] < 0 or model_perf['average_accuracy'] > 100:
-                    model_perf['error_message'] = 'Invalid average accuracy percentage'
-        
-        content['prediction_analysis'] = prediction_analysis
+def _render_content(request, content):
+    if not content['raw']:  # If no files are found
+        content['raw'] = [{'error': 'No raw signals found'}]
 
-    return render(request, 'analysis/dashboard.html', {'content': content})
\ No newline at end of file
+    with timed('render'):
+        response = render(request, 'analysis/dashboard.html', {'content': content})
+    # pages showing a load error must not be cached or revalidated
+    degraded = any(isinstance(raw, dict) for raw in content['raw']) or any(
+        isinstance(content[name], dict) for name in ['bearing_analysis_results', 'prediction_analysis']
+    )
+    if degraded:
+        patch_cache_control(response, no_store=True)
+    return response, degraded
@@ -2,6 +2,8 @@
 ASGI config for bearing_dashboard project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Run it with any ASGI server, e.g. ``uvicorn bearing_dashboard.asgi:application``
+or through gunicorn.conf.py with GUNICORN_ASGI=1.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -12,5 +14,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bearing_dashboard.settings')
+# serve the dashboard with its async view, see analysis/views.py
+os.environ.setdefault('DASHBOARD_ASYNC', '1')
 
 application = get_asgi_application()
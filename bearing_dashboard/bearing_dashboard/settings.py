@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,6 +44,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    # after WhiteNoise, so static files aren't timed
+    'analysis.middleware.TimingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -71,6 +74,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'bearing_dashboard.wsgi.application'
 
+# Serve / with views.dashboard_async, which loads the page's data concurrently
+# instead of blocking; asgi.py turns it on for ASGI servers
+DASHBOARD_ASYNC = os.environ.get('DASHBOARD_ASYNC', '0') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
@@ -79,10 +86,46 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # migration 0004 puts the file in WAL mode; synchronous=NORMAL is per connection and is safe with WAL
+        'OPTIONS': {
+            'init_command': 'PRAGMA synchronous=NORMAL;',
+        },
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Rendered dashboard pages are cached per content version. Local memory is the
+# default; set DASHBOARD_CACHE_DIR to share a file cache between workers.
+
+if os.environ.get('DASHBOARD_CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ['DASHBOARD_CACHE_DIR'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'bearing-dashboard',
+        }
+    }
+
+
+# Raw vibration signals as memory-mapped float32 files, built from the
+# raw_signals plots with `python manage.py convert_raw_signals`
+
+SIGNAL_STORE_DIR = os.environ.get('SIGNAL_STORE_DIR', BASE_DIR / 'signal_store')
+
+
+# Processed-snapshot manifest and feature rows for `build_features --incremental`
+
+FEATURE_CHECKPOINT_DIR = os.environ.get('FEATURE_CHECKPOINT_DIR', BASE_DIR / 'feature_checkpoint')
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -126,6 +169,10 @@ STATICFILES_DIRS = [
 
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# Files with a 12 hex digit content hash in their name (hashed static files and the
+# plot assets written by build_plot_assets) are cached for good
+WHITENOISE_IMMUTABLE_FILE_TEST = r'\.[0-9a-f]{12}\.\w+$'
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
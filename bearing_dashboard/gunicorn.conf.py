@@ -0,0 +1,58 @@
+"""
+gunicorn settings: ``gunicorn --config gunicorn.conf.py``
+
+The app is loaded in the master and the dashboard data is preloaded and
+frozen there before the workers are forked, so they share it instead of
+each loading a copy (see analysis/preload.py). Measure the difference with
+``python manage.py measure_worker_memory``.
+
+The master also renders the dashboard once, so every worker starts with the
+page in its cache, and each worker checks it is warm before it accepts
+connections; /readyz reports ready from then on (see analysis/health.py).
+A failed warm-up is logged and doesn't stop the server from booting:
+/readyz answers 503 with the error until a retry succeeds.
+
+Set GUNICORN_ASGI=1 to serve bearing_dashboard/asgi.py with uvicorn workers
+instead, which streams the live events and serves the async dashboard view.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+if os.environ.get('GUNICORN_ASGI') == '1':
+    wsgi_app = 'bearing_dashboard.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'bearing_dashboard.wsgi:application'
+preload_app = True
+
+
+def when_ready(server):
+    # runs in the master after the app is loaded and before any worker is forked
+    from django.db import connections
+
+    from analysis import health, preload
+
+    try:
+        loaded = health.warm_up()
+    except Exception:
+        # the workers still start; /readyz answers 503 with the error and retries the warm-up
+        server.log.exception('Warm-up failed, workers will start cold')
+    else:
+        server.log.info('Preloaded %s', ', '.join(f'{key} {value}' for key, value in loaded.items()))
+    # workers must open their own database connections
+    connections.close_all()
+    server.log.info('Froze %d objects', preload.freeze())
+
+
+def post_worker_init(worker):
+    # in the worker before it accepts connections: only reloads what changed since the fork
+    from analysis import health
+
+    try:
+        loaded = health.warm_up()
+    except Exception:
+        worker.log.exception('Warm-up failed, /readyz reports not ready until a retry succeeds')
+    else:
+        worker.log.info('Warmed up in %s s', loaded['seconds'])
@@ -1,3 +1,7 @@
 #!/bin/bash
 python manage.py collectstatic --noinput
-gunicorn --bind 0.0.0.0:8000 bearing_dashboard.wsgi:application
\ No newline at end of file
+python manage.py convert_raw_signals
+python manage.py build_plot_assets
+python manage.py migrate --noinput
+python manage.py load_analysis_results
+gunicorn --config gunicorn.conf.py
\ No newline at end of file